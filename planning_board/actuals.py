@@ -0,0 +1,88 @@
+# actuals.py - History of shift actual counts for intra-shift progress and run rates
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ACTUAL_FIELDS, ActualSnapshot
+
+# Progress curves are resampled to one point per this many minutes by default
+PROGRESS_INTERVAL = 60
+
+
+def record_actuals(lines, recorded_at=None):
+    """
+    Append an ActualSnapshot for every shift actual of ``lines`` that is set
+    and differs from the value the line was loaded with (all set actuals of
+    new lines), in one insert. Call it after the lines are written.
+    """
+    recorded_at = recorded_at or timezone.now()
+    snapshots = []
+    for line in lines:
+        loaded = getattr(line, '_loaded_actuals', {})
+        deferred = line.get_deferred_fields()
+        for shift, field in ACTUAL_FIELDS.items():
+            if field in deferred:
+                continue
+            actual = getattr(line, field)
+            if actual is not None and actual != loaded.get(field):
+                snapshots.append(ActualSnapshot(
+                    production_line_id=line.pk, shift=shift, recorded_at=recorded_at, actual=actual,
+                ))
+                loaded[field] = actual
+        line._loaded_actuals = loaded
+    if snapshots:
+        ActualSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
+
+
+def shift_progress(board, shifts=tuple(ACTUAL_FIELDS), line_ids=None, since=None, interval=PROGRESS_INTERVAL):
+    """
+    Intra-shift curves of a board's lines; the snapshots are read in one
+    query on the (line, shift, time) index.
+
+    Returns one entry per line and shift with history: the plan and latest
+    actual, ``points`` as ``[time, actual]`` pairs keeping the last count of
+    every ``interval``-minute bucket (aligned to midnight), and ``run_rate``
+    in units per hour between the first and last snapshot (None with fewer
+    than two).
+    """
+    lines = board.production_lines.order_by('line_number')
+    if line_ids:
+        lines = lines.filter(pk__in=line_ids)
+    lines = {line.pk: line for line in lines.only(
+        'planning_board', 'line_number', 'a_shift_plan', 'b_shift_plan', 'c_shift_plan', *ACTUAL_FIELDS.values()
+    )}
+
+    snapshots = ActualSnapshot.objects.filter(production_line_id__in=list(lines), shift__in=shifts)
+    if since is not None:
+        snapshots = snapshots.filter(recorded_at__gte=since)
+    rows = snapshots.order_by('production_line_id', 'shift', 'recorded_at').values_list(
+        'production_line_id', 'shift', 'recorded_at', 'actual'
+    )
+
+    history = {}
+    for line_id, shift, recorded_at, actual in rows:
+        history.setdefault((line_id, shift), []).append((recorded_at, actual))
+
+    bucket = timedelta(minutes=interval)
+    progress = []
+    for (line_id, shift), samples in history.items():
+        line = lines[line_id]
+        points = {}
+        for recorded_at, actual in samples:
+            midnight = recorded_at.replace(hour=0, minute=0, second=0, microsecond=0)
+            start = recorded_at - (recorded_at - midnight) % bucket
+            points[start] = actual  # samples are in time order, so the bucket keeps its last count
+        (first_at, first), (last_at, last) = samples[0], samples[-1]
+        hours = (last_at - first_at).total_seconds() / 3600
+        progress.append({
+            'line_id': line_id,
+            'line_number': line.line_number,
+            'shift': shift,
+            'plan': getattr(line, f'{shift.lower()}_shift_plan') or 0,
+            'actual': getattr(line, ACTUAL_FIELDS[shift]) or 0,
+            'points': [[start.isoformat(), actual] for start, actual in points.items()],
+            'run_rate': round((last - first) / hours, 1) if hours > 0 else None,
+        })
+    progress.sort(key=lambda entry: (entry['line_number'], entry['shift']))
+    return progress
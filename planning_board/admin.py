@@ -2,7 +2,8 @@
 from django.contrib import admin
 from .models import (
     PlanningBoard, ProductionLine, TomorrowPlan, NextDayPlan,
-    CriticalPartStatus, AFMPlan, SPDPlan, OtherInformation, ExcelUpload
+    CriticalPartStatus, AFMPlan, SPDPlan, OtherInformation, ExcelUpload,
+    DisplayDevice
 )
 
 class ProductionLineInline(admin.TabularInline):
@@ -145,4 +146,11 @@ class ExcelUploadAdmin(admin.ModelAdmin):
         # Prevent editing processed uploads
         if obj and obj.processed:
             return False
-        return super().has_change_permission(request, obj)
\ No newline at end of file
+        return super().has_change_permission(request, obj)
+
+@admin.register(DisplayDevice)
+class DisplayDeviceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'plant', 'group', 'owner', 'board', 'section', 'last_heartbeat']
+    list_filter = ['plant', 'group', 'owner']
+    search_fields = ['name', 'key', 'plant', 'group']
+    readonly_fields = ['last_heartbeat', 'state_updated_at', 'state_updated_by', 'created_at']
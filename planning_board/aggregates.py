@@ -0,0 +1,152 @@
+# aggregates.py - Section rows annotated with their statistics, computed by the database
+from datetime import timedelta
+
+from django.db.models import Case, CharField, Count, F, FloatField, Q, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def with_totals(queryset, **aggregates):
+    """
+    Annotate every row with aggregates over the whole queryset. They are SQL
+    window functions, so the rows and their statistics come back together
+    in one query and Python never loops over the rows to add them up.
+    """
+    return queryset.annotate(**{
+        name: Window(expression=aggregate) for name, aggregate in aggregates.items()
+    })
+
+
+def totals(rows, names):
+    """The with_totals aggregates of already fetched rows (zeros when there are none)"""
+    if not rows:
+        return dict.fromkeys(names, 0)
+    return {name: getattr(rows[0], name) or 0 for name in names}
+
+
+def count_where(condition):
+    """Number of rows matching a Q object, as an aggregate"""
+    return Sum(Case(When(condition, then=Value(1)), default=Value(0)))
+
+
+def quantity(field):
+    return Coalesce(F(field), Value(0))
+
+
+def efficiency(plan, actual):
+    """calculate_efficiency in SQL; NULL (shown as 0) when there is no plan"""
+    return Case(
+        When(Q(**{f'{plan}__isnull': True}) | Q(**{plan: 0}), then=Value(None, output_field=FloatField())),
+        default=Round(Cast(quantity(actual), FloatField()) / F(plan) * 100, precision=1),
+        output_field=FloatField(),
+    )
+
+
+def production_lines(queryset):
+    """today_assembly: shift efficiencies, line status and plan totals"""
+    queryset = queryset.annotate(
+        a_efficiency=efficiency('a_shift_plan', 'a_shift_actual'),
+        b_efficiency=efficiency('b_shift_plan', 'b_shift_actual'),
+        c_efficiency=efficiency('c_shift_plan', 'c_shift_actual'),
+    ).annotate(
+        avg_efficiency=(
+            Coalesce('a_efficiency', 0.0) + Coalesce('b_efficiency', 0.0) + Coalesce('c_efficiency', 0.0)
+        ) / 3,
+    ).annotate(
+        line_status=Case(
+            When(avg_efficiency__gte=95, then=Value('On Target')),
+            When(avg_efficiency__gte=85, then=Value('Behind')),
+            default=Value('Critical'),
+            output_field=CharField(),
+        ),
+    )
+    return with_totals(
+        queryset,
+        total_lines=Count('pk'),
+        total_plan=Sum(quantity('a_shift_plan') + quantity('b_shift_plan') + quantity('c_shift_plan')),
+        total_actual=Sum(quantity('a_shift_actual') + quantity('b_shift_actual') + quantity('c_shift_actual')),
+        lines_on_target=count_where(Q(avg_efficiency__gte=95)),
+        lines_behind=count_where(Q(avg_efficiency__lt=95)),
+    )
+
+
+def critical_parts(queryset, now):
+    """critical_parts: receiving status and risk against ``now``, and their counts"""
+    due_soon = now + timedelta(hours=2)
+    queryset = queryset.annotate(
+        part_status=Case(
+            When(receiving_time__isnull=True, then=Value('TBD')),
+            When(receiving_time__lte=now, then=Value('Received')),
+            When(receiving_time__lte=due_soon, then=Value('Due Soon')),
+            default=Value('Scheduled'),
+            output_field=CharField(),
+        ),
+        risk=Case(
+            When(receiving_time__isnull=True, then=Value('High')),
+            When(receiving_time__gt=now, receiving_time__lte=due_soon, then=Value('Medium')),
+            default=Value('Low'),
+            output_field=CharField(),
+        ),
+    )
+    return with_totals(
+        queryset,
+        total_parts=Count('pk'),
+        received=count_where(Q(receiving_time__lte=now)),
+        pending=count_where(Q(receiving_time__gt=now)),
+        delayed=count_where(Q(receiving_time__isnull=True)),
+        high_risk=count_where(Q(risk='High')),
+        medium_risk=count_where(Q(risk='Medium')),
+        low_risk=count_where(Q(risk='Low')),
+    )
+
+
+def shift_plans(queryset):
+    """tomorrow/next_day_assembly: per-model totals, priority and shift totals"""
+    queryset = queryset.annotate(
+        plan_total=quantity('a_shift') + quantity('b_shift') + quantity('c_shift'),
+    ).annotate(
+        priority=Case(
+            When(plan_total__gt=500, then=Value('High')),
+            When(plan_total__gt=200, then=Value('Medium')),
+            default=Value('Low'),
+            output_field=CharField(),
+        ),
+    )
+    return with_totals(
+        queryset,
+        total_models=Count('pk'),
+        total_planned=Sum('plan_total'),
+        a_shift_total=Sum(quantity('a_shift')),
+        b_shift_total=Sum(quantity('b_shift')),
+        c_shift_total=Sum(quantity('c_shift')),
+    )
+
+
+def afm_plans(queryset):
+    return with_totals(
+        queryset,
+        total_plans=Count('pk'),
+        fcin_count=count_where(Q(plan_type='FCIN')),
+        iu_count=count_where(Q(plan_type='IU')),
+        total_quantity=Sum(quantity('plan_qty')),
+    )
+
+
+def spd_plans(queryset):
+    """spd_plans: totals plus, on every row, the number of plans for its customer"""
+    queryset = queryset.annotate(
+        customer_plans=Window(expression=Count('pk'), partition_by=[F('customer')]),
+    )
+    return with_totals(
+        queryset,
+        total_plans=Count('pk'),
+        total_quantity=Sum(quantity('plan_qty')),
+    )
+
+
+def other_info(queryset, today):
+    """other_info: items due within three days (or without a date)"""
+    return with_totals(
+        queryset,
+        total_items=Count('pk'),
+        due_soon=count_where(Q(target_date__isnull=True) | Q(target_date__lte=today + timedelta(days=3))),
+    )
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PlanningBoardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "planning_board"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .events import change_bus
+        from .rollups import update_rollups
+        change_bus.subscribe(update_rollups)
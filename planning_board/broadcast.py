@@ -0,0 +1,160 @@
+# broadcast.py - One change poller per watched board, fanned out to every open stream
+import asyncio
+import logging
+
+from .events import change_bus
+from .models import PlanningBoard
+from .versions import asection_versions
+
+logger = logging.getLogger(__name__)
+
+# How often a watched board is checked when no change event arrives. Events
+# from this process wake the poller at once; polling catches other processes.
+POLL_INTERVAL = 2
+
+
+class Subscription:
+    """A stream's view of a board's changes; only the newest change is kept"""
+
+    def __init__(self, hub, board_id):
+        self.hub = hub
+        self.board_id = board_id
+        self.queue = asyncio.Queue(maxsize=1)
+
+    def push(self, change):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(change)
+
+    async def get(self, timeout=None):
+        """Wait for the next change; None when ``timeout`` passes first"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.hub.unsubscribe(self)
+
+
+class BoardHub:
+    """
+    Detects board changes once per board and pushes them to every subscriber.
+
+    A change is a new ``updated_at`` on the board or a new version of any of
+    its sections (see versions.py). Both live in shared storage, so edits made
+    by other processes are picked up as long as the cache is shared.
+
+    Change events from the in-process bus (events.py) wake the board's poller
+    immediately and their row ids are passed on with the published change.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = {}
+        self._watchers = {}
+        self._wakeups = {}
+        self._pending = {}
+        self.polls = 0  # reported by the stream metrics endpoint
+        change_bus.subscribe(self.on_change_event)
+
+    def subscribe(self, board_id):
+        """Start receiving a board's changes; use as ``async with hub.subscribe(id) as changes``"""
+        subscription = Subscription(self, board_id)
+        self._subscribers.setdefault(board_id, set()).add(subscription)
+
+        watcher = self._watchers.get(board_id)
+        if watcher is None or watcher.done() or watcher.get_loop() is not asyncio.get_running_loop():
+            self._watchers[board_id] = asyncio.create_task(self._watch(board_id))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.board_id)
+        if subscribers:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.board_id]
+
+    def subscriber_count(self, board_id=None):
+        if board_id is not None:
+            return len(self._subscribers.get(board_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def watched_boards(self):
+        return len(self._watchers)
+
+    def on_change_event(self, event):
+        """Bus callback, called from whichever thread committed the change"""
+        watcher = self._watchers.get(event['board_id'])
+        if watcher is not None and not watcher.done():
+            watcher.get_loop().call_soon_threadsafe(self._wake, event)
+
+    def _wake(self, event):
+        board_id = event['board_id']
+        self._pending.setdefault(board_id, []).append(event)
+        wakeup = self._wakeups.get(board_id)
+        if wakeup is not None:
+            wakeup.set()
+
+    def publish(self, board_id, change):
+        for subscription in list(self._subscribers.get(board_id, ())):
+            subscription.push(change)
+
+    async def _state(self, board_id):
+        updated_at = await PlanningBoard.objects.filter(pk=board_id).values_list(
+            'updated_at', flat=True
+        ).afirst()
+        versions = await asection_versions(board_id) if updated_at else {}
+        return updated_at, versions
+
+    async def _watch(self, board_id):
+        """Poll one board while anybody is subscribed to it, or as soon as an event arrives"""
+        state = None
+        wakeup = self._wakeups[board_id] = asyncio.Event()
+        while self._subscribers.get(board_id):
+            self.polls += 1
+            try:
+                updated_at, versions = await self._state(board_id)
+            except Exception as e:
+                logger.error(f"Board hub poll failed for board {board_id}: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            # The first poll is published too: an edit may have landed between a
+            # subscriber's snapshot and this poll (their trackers drop no-op rebuilds)
+            events = self._pending.pop(board_id, [])
+            if (updated_at, versions) != state:
+                previous_versions = state[1] if state else {}
+                row_ids = {}
+                for event in events:
+                    if event['section']:
+                        row_ids.setdefault(event['section'], []).extend(event['row_ids'])
+                self.publish(board_id, {
+                    'board_id': board_id,
+                    'deleted': updated_at is None,
+                    'updated_at': updated_at,
+                    'sections': [
+                        section for section, version in versions.items()
+                        if previous_versions.get(section) != version
+                    ],
+                    'row_ids': row_ids,
+                })
+            state = (updated_at, versions)
+
+            if updated_at is None:
+                break
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+
+        if self._watchers.get(board_id) is asyncio.current_task():
+            del self._watchers[board_id]
+            self._wakeups.pop(board_id, None)
+
+
+board_hub = BoardHub()
@@ -0,0 +1,284 @@
+# consumers.py - WebSocket consumers for live boards and monitor control
+import asyncio
+import random
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+
+from .broadcast import board_hub
+from .encoding import dumps
+from .devices import HEARTBEAT_TIMEOUT, aregister_device, arecord_heartbeat
+from .live import SectionDeltaTracker
+from .models import PlanningBoard
+from .monitor_queue import aack_commands, apending_commands
+from .streams import MAX_LIFETIME, stream_registry
+
+
+def board_group(board_id):
+    """Channel-layer group of every socket showing a board"""
+    return f"board_{board_id}"
+
+
+def monitor_group(device_id):
+    """Channel-layer group of the sockets of one registered monitor screen"""
+    return f"monitor_{device_id}"
+
+
+def notify_board_changed(board_id):
+    """Tell every socket showing the board to rebuild now (callable from sync code)"""
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(board_group(board_id), {
+            'type': 'board.changed',
+            'board_id': board_id,
+        })
+
+
+def send_monitor_command(device_id, command):
+    """Push a control command to a monitor screen (callable from sync code)"""
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        async_to_sync(channel_layer.group_send)(monitor_group(device_id), {
+            'type': 'monitor.command',
+            'command': command,
+        })
+
+
+class LiveSectionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Sends one board section as a snapshot followed by row deltas, the same
+    events as the SSE streams: ``{"type": "snapshot"|"delta", "section", "data"}``.
+
+    Changes come from the board hub (one poller per board for all screens)
+    and from ``board.changed`` messages on the board's group.
+    """
+
+    board_id = None
+    section = None
+    stats = None
+    reaper = None
+    # Name this socket is reported under in the stream metrics (streams.py)
+    stream_endpoint = 'ws_section'
+    # Sockets are closed after this long (plus jitter); clients reconnect on their own
+    max_lifetime = MAX_LIFETIME
+    # Close the socket when the client has sent nothing for this long (None: never)
+    idle_timeout = None
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.tracker = SectionDeltaTracker()
+        self.lock = asyncio.Lock()
+        self.watcher = None
+        self.stats = stream_registry.open('ws', self.stream_endpoint, user_id=self.user.id)
+        self.last_seen = time.monotonic()
+        await self.accept()
+        self.reaper = asyncio.create_task(self.reap())
+
+    async def disconnect(self, code):
+        if self.reaper is not None:
+            self.reaper.cancel()
+        await self.stop_watching()
+        if self.stats is not None:
+            stream_registry.close(self.stats)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        self.last_seen = time.monotonic()
+        await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
+    async def reap(self):
+        """Close the socket once it outlives max_lifetime or its client goes quiet"""
+        deadline = time.monotonic() + self.max_lifetime * random.uniform(1, 1.1)
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                reason = 'lifetime'
+            elif self.idle_timeout and now - self.last_seen > self.idle_timeout:
+                reason = 'idle'
+            else:
+                wake = deadline
+                if self.idle_timeout:
+                    wake = min(wake, self.last_seen + self.idle_timeout + 1)
+                await asyncio.sleep(wake - now)
+                continue
+            stream_registry.close(self.stats, reason)
+            await self.stop_watching()
+            await self.close(code=4000)
+            return
+
+    async def send_json(self, content, close=False):
+        await self.send_text(await self.encode_json(content), close=close)
+
+    async def send_text(self, text_data, close=False):
+        if self.stats is not None:
+            self.stats.sent(text_data)
+        await self.send(text_data=text_data, close=close)
+
+    async def watch(self, board_id, section):
+        """Switch this socket to a board section and send its snapshot"""
+        await self.stop_watching()
+        if not await PlanningBoard.objects.filter(pk=board_id, created_by=self.user).aexists():
+            await self.send_json({'type': 'error', 'error': 'Board not found'})
+            return
+
+        self.board_id = board_id
+        self.section = section
+        self.stats.board_id, self.stats.section = board_id, section
+        self.tracker = SectionDeltaTracker()
+        await self.channel_layer.group_add(board_group(board_id), self.channel_name)
+        self.watcher = asyncio.create_task(self.follow_board(board_id))
+        await self.send_section()
+
+    async def stop_watching(self):
+        if getattr(self, 'watcher', None):
+            self.watcher.cancel()
+            self.watcher = None
+        if self.board_id is not None:
+            await self.channel_layer.group_discard(board_group(self.board_id), self.channel_name)
+            self.board_id = None
+            if self.stats is not None:
+                self.stats.board_id = self.stats.section = None
+
+    async def follow_board(self, board_id):
+        async with board_hub.subscribe(board_id) as changes:
+            while True:
+                change = await changes.get()
+                if change['deleted']:
+                    await self.send_json({'type': 'error', 'error': 'Board not found'})
+                    self.watcher = None  # leaving this task; don't cancel it
+                    await self.stop_watching()
+                    return
+                await self.send_section()
+
+    async def board_changed(self, message):
+        """Group message: the board changed, rebuild the section"""
+        if message['board_id'] == self.board_id:
+            await self.send_section()
+
+    async def send_section(self, resend=False):
+        """Build the section and send whatever changed since the last event"""
+        async with self.lock:
+            if self.board_id is None:
+                return
+            if resend:
+                self.tracker = SectionDeltaTracker()
+            try:
+                with stream_registry.timing(self.stats):
+                    snapshot = await database_sync_to_async(self.build_snapshot)(self.board_id, self.section)
+            except PlanningBoard.DoesNotExist:
+                await self.send_json({'type': 'error', 'error': 'Board not found'})
+                return
+            event = self.tracker.next_event(snapshot.payload)
+            if event is None:
+                return
+            name, body = event
+            if name == 'snapshot':
+                # Every socket showing this version gets the same encoded payload
+                await self.send_text(
+                    f'{{"type": "snapshot", "section": {dumps(self.section)}, "data": {snapshot.json()}}}'
+                )
+            else:
+                await self.send_json({'type': name, 'section': self.section, 'data': body})
+
+    def build_snapshot(self, board_id, section):
+        from .views import display_snapshot
+        return display_snapshot(board_id, section, self.user)
+
+
+class BoardSectionConsumer(LiveSectionConsumer):
+    """ws/board/<board_id>/<section>/ - WebSocket counterpart of fullscreen_data_stream"""
+
+    stream_endpoint = 'ws_board'
+
+    async def connect(self):
+        await super().connect()
+        if self.user is not None and self.user.is_authenticated:
+            kwargs = self.scope['url_route']['kwargs']
+            await self.watch(int(kwargs['board_id']), kwargs['section'])
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('action') == 'refresh':
+            await self.send_section(resend=True)
+
+
+class MonitorConsumer(LiveSectionConsumer):
+    """
+    ws/monitor/?device=<key>&name=<label> - one connection per monitor screen
+    carrying both the controller's commands and the section it is showing.
+    The screen is registered under its key the first time it connects.
+
+    Client messages: ``{"action": "watch", "board_id", "section"}``,
+    ``{"action": "refresh"}``, ``{"action": "ack", "seq"}`` and
+    ``{"action": "heartbeat"}``. Server messages: section events plus
+    ``{"type": "control", "command": {..., "seq"}}``. Commands still
+    unacknowledged when the screen connects are replayed.
+    """
+
+    last_command_seq = 0
+    device = None
+    stream_endpoint = 'ws_monitor'
+    # The monitor page sends a heartbeat every 30 seconds
+    idle_timeout = HEARTBEAT_TIMEOUT
+
+    async def connect(self):
+        await super().connect()
+        if self.user is None or not self.user.is_authenticated:
+            return
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        self.device = await aregister_device(
+            self.user, params.get('device', [''])[0], params.get('name', [''])[0]
+        )
+        await arecord_heartbeat(self.device)
+        await self.channel_layer.group_add(monitor_group(self.device.pk), self.channel_name)
+        await self.send_json({'type': 'device', 'device': {
+            'id': self.device.pk, 'key': self.device.key, 'name': self.device.name,
+        }})
+        for command in await apending_commands(self.device.queue_key):
+            await self.send_command(command)
+
+    async def disconnect(self, code):
+        await super().disconnect(code)
+        if self.device is not None:
+            await self.channel_layer.group_discard(monitor_group(self.device.pk), self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        if action == 'watch':
+            try:
+                board_id = int(content.get('board_id'))
+            except (TypeError, ValueError):
+                await self.send_json({'type': 'error', 'error': 'Invalid board id'})
+                return
+            section = content.get('section') or 'today_assembly'
+            await self.watch(board_id, section)
+            if self.board_id == board_id:
+                await arecord_heartbeat(self.device, board_id, section)
+        elif action == 'refresh':
+            await self.send_section(resend=True)
+        elif action == 'heartbeat':
+            await arecord_heartbeat(self.device)
+        elif action == 'ack':
+            try:
+                await aack_commands(self.device.queue_key, int(content.get('seq')))
+            except (TypeError, ValueError):
+                pass
+
+    async def monitor_command(self, message):
+        """Group message: forward a controller command to the screen"""
+        await self.send_command(message['command'])
+
+    async def send_command(self, command):
+        # Commands are queued in order; never send one twice on this socket
+        if command['seq'] > self.last_command_seq:
+            self.last_command_seq = command['seq']
+            await self.send_json({'type': 'control', 'command': command})
+
+    def build_snapshot(self, board_id, section):
+        from .views import display_snapshot
+        return display_snapshot(board_id, section, self.user, merged=True)
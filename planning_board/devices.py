@@ -0,0 +1,84 @@
+# devices.py - Registry of monitor screens: identity, heartbeats and targeting
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import DisplayDevice
+
+# A screen that has not checked in for this long is reported offline. Sockets
+# and streams check in every 30 seconds, polling screens every few seconds.
+HEARTBEAT_TIMEOUT = 90
+# Heartbeats are written at most this often per screen; state changes always are
+HEARTBEAT_WRITE_INTERVAL = 15
+
+DEFAULT_DEVICE_KEY = 'default'
+
+
+def device_key(value):
+    """Normalise the ``?device=`` value a screen identifies itself with"""
+    return slugify(value or '')[:64] or DEFAULT_DEVICE_KEY
+
+
+def register_device(user, key, name=''):
+    """The user's screen with this key, created the first time it connects"""
+    device, _ = DisplayDevice.objects.get_or_create(
+        owner=user, key=device_key(key),
+        defaults={'name': (name or key or DEFAULT_DEVICE_KEY)[:100]},
+    )
+    return device
+
+
+def record_heartbeat(device, board_id=None, section=None):
+    """
+    Note that the screen is alive and, when given, what it is showing.
+    Plain heartbeats are throttled so 50 screens don't keep the database busy.
+    """
+    now = timezone.now()
+    fields = {}
+    if board_id is not None and (device.board_id != board_id or device.section != section):
+        fields.update(board_id=board_id, section=section or '')
+
+    if not fields and not cache.add(f"display_heartbeat_{device.pk}", 1, HEARTBEAT_WRITE_INTERVAL):
+        return device
+    fields['last_heartbeat'] = now
+    DisplayDevice.objects.filter(pk=device.pk).update(**fields)
+    for field, value in fields.items():
+        setattr(device, field, value)
+    return device
+
+
+def is_online(device, now=None):
+    if device.last_heartbeat is None:
+        return False
+    now = now or timezone.now()
+    return now - device.last_heartbeat <= timedelta(seconds=HEARTBEAT_TIMEOUT)
+
+
+def resolve_targets(user, target):
+    """
+    Screens a controller command is meant for. ``target`` is ``"all"`` (or
+    missing), ``{"device": id}``, ``{"devices": [ids]}``, ``{"group": name}``
+    or ``{"plant": name}``; unknown forms raise ValueError.
+    """
+    devices = DisplayDevice.objects.filter(owner=user)
+    if target in (None, '', 'all'):
+        return devices
+    if not isinstance(target, dict):
+        raise ValueError(f"Invalid target: {target!r}")
+
+    if 'device' in target:
+        return devices.filter(pk=target['device'])
+    if 'devices' in target:
+        return devices.filter(pk__in=list(target['devices']))
+    if 'group' in target:
+        return devices.filter(group=target['group'])
+    if 'plant' in target:
+        return devices.filter(plant=target['plant'])
+    raise ValueError(f"Invalid target: {target!r}")
+
+
+aregister_device = sync_to_async(register_device)
+arecord_heartbeat = sync_to_async(record_heartbeat)
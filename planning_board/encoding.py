@@ -0,0 +1,88 @@
+# encoding.py - JSON serialization and compact section payload encoding
+import json
+import zlib
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+
+def dumps(data):
+    """Serialize to a compact JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, separators=(',', ':'), default=str)
+
+
+def json_response(data, status=200):
+    """JsonResponse equivalent that goes through the fast serializer"""
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def wants_compact(request):
+    """True when the client asked for the compact section encoding"""
+    return request.GET.get('encoding') == 'compact'
+
+
+# Column type codes used in the compact schema
+INT, FLOAT, STRING, VALUE = 'i', 'f', 's', 'v'
+
+
+def _column_type(values):
+    """Pick the narrowest type code that fits every value of a column"""
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return INT
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return FLOAT
+    if all(isinstance(value, str) for value in values):
+        return STRING
+    return VALUE
+
+
+def encode_compact(payload, schema_id=None):
+    """
+    Re-encode a section payload column by column.
+
+    Repeated strings (models, shift timings, statuses) are stored once in
+    ``strings`` and referenced by index. The schema (headers, column types,
+    title) is omitted when the client already holds the one with ``schema_id``.
+    """
+    rows = payload.get('data', [])
+    width = max((len(row) for row in rows), default=0)
+    columns = [[row[index] if index < len(row) else None for row in rows] for index in range(width)]
+    types = [_column_type(column) for column in columns]
+
+    strings = []
+    string_index = {}
+    encoded_columns = []
+    for column, column_type in zip(columns, types):
+        if column_type == STRING:
+            codes = []
+            for value in column:
+                if value not in string_index:
+                    string_index[value] = len(strings)
+                    strings.append(value)
+                codes.append(string_index[value])
+            encoded_columns.append(codes)
+        else:
+            encoded_columns.append(column)
+
+    schema = {
+        'title': payload.get('title'),
+        'headers': payload.get('headers', []),
+        'types': types,
+    }
+    schema['id'] = format(zlib.crc32(dumps(schema).encode('utf-8')), '08x')
+
+    compact = {key: value for key, value in payload.items() if key not in ('data', 'title', 'headers')}
+    compact['encoding'] = 'compact'
+    compact['schema_id'] = schema['id']
+    if schema['id'] != schema_id:
+        compact['schema'] = schema
+    compact['strings'] = strings
+    compact['columns'] = encoded_columns
+    compact['row_count'] = len(rows)
+    return compact
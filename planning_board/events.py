@@ -0,0 +1,120 @@
+# events.py - In-process change events for boards and their sections
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .versions import bump_section_version
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """
+    Minimal publish/subscribe. Callbacks run synchronously in the publishing
+    thread, so async subscribers must hand events over to their own loop.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Change event subscriber failed")
+
+
+change_bus = EventBus()
+
+_batch = threading.local()
+
+
+def section_changed(board_id, section, row_ids=(), action='updated'):
+    """
+    Record a change to rows of a board section. Once the surrounding
+    transaction commits, the section version is bumped and an event
+    ``{board_id, section, row_ids, action, timestamp}`` is published.
+    """
+    _record({
+        'board_id': board_id,
+        'section': section,
+        'row_ids': [row_id for row_id in row_ids if row_id is not None],
+        'action': action,
+        'timestamp': time.time(),
+    })
+
+
+def board_changed(board_id, action='updated'):
+    """Record a change to the board itself (title, dates, deletion)"""
+    _record({
+        'board_id': board_id,
+        'section': None,
+        'row_ids': [],
+        'action': action,
+        'timestamp': time.time(),
+    })
+
+
+def _record(event):
+    pending = getattr(_batch, 'events', None)
+    if pending is None:
+        _dispatch(event)
+        return
+
+    key = (event['board_id'], event['section'])
+    merged = pending.get(key)
+    if merged is None:
+        pending[key] = event
+    else:
+        merged['row_ids'].extend(event['row_ids'])
+        merged['timestamp'] = event['timestamp']
+        if merged['action'] != event['action']:
+            merged['action'] = 'bulk'
+
+
+def _dispatch(event):
+    def commit():
+        # Bumped only once the rows are committed, so a reader seeing the new
+        # version can never cache a render of the old rows under it
+        if event['section']:
+            bump_section_version(event['board_id'], event['section'])
+        change_bus.publish(event)
+
+    transaction.on_commit(commit)
+
+
+@contextmanager
+def batched_changes():
+    """
+    Collect the change events of a bulk operation (ingestion, inline edits)
+    and publish one event per board section when the block ends.
+    """
+    if getattr(_batch, 'events', None) is not None:
+        yield  # already inside a batch
+        return
+
+    _batch.events = {}
+    try:
+        yield
+    finally:
+        events = _batch.events
+        _batch.events = None
+        for event in events.values():
+            _dispatch(event)
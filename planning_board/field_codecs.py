@@ -0,0 +1,194 @@
+# field_codecs.py - Typed parse/validate functions built from model metadata
+import math
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+# Values the board UI and spreadsheets use for "nothing here"
+EMPTY_VALUES = (None, '', '-')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p')
+DATETIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S',
+                    '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M')
+
+
+def _parse_int(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        # Spreadsheet numbers are binary floats, so a computed 12 may arrive as 12.000000000000002
+        number = round(value) if math.isfinite(value) else None
+        if number is None or not math.isclose(value, number, rel_tol=1e-9):
+            raise ValueError(value)
+        return number
+    number = Decimal(str(value).replace(',', '').strip())
+    if number != number.to_integral_value():
+        raise ValueError(value)
+    return int(number)
+
+
+def _strptime_parser(formats, convert):
+    def parse(value):
+        text = str(value).strip()
+        for fmt in formats:
+            try:
+                return convert(datetime.strptime(text, fmt))
+            except ValueError:
+                continue
+        raise ValueError(value)
+    return parse
+
+
+_parse_date_text = _strptime_parser(DATE_FORMATS, lambda parsed: parsed.date())
+_parse_time_text = _strptime_parser(TIME_FORMATS, lambda parsed: parsed.time())
+_parse_datetime_text = _strptime_parser(DATETIME_FORMATS, lambda parsed: parsed)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_date_text(value)
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    return _parse_time_text(value)
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return _parse_datetime_text(value)
+
+
+def _parse_text(value):
+    return str(value).strip()
+
+
+# Django field class -> (parser, description used in error messages)
+PARSERS = (
+    (models.DateTimeField, _parse_datetime, 'a date and time'),
+    (models.DateField, _parse_date, 'a date (YYYY-MM-DD)'),
+    (models.TimeField, _parse_time, 'a time (HH:MM)'),
+    (models.IntegerField, _parse_int, 'a whole number'),
+    (models.CharField, _parse_text, 'text'),
+    (models.TextField, _parse_text, 'text'),
+)
+
+
+class FieldCodec:
+    """Parse and validate raw input (JSON, form or spreadsheet values) for one model field"""
+
+    def __init__(self, field):
+        self.name = field.name
+        self.null = field.null
+        self.blank = field.blank
+        self.max_length = getattr(field, 'max_length', None)
+        self.is_text = isinstance(field, (models.CharField, models.TextField))
+        self.parser, self.expected = next(
+            (parser, expected) for field_class, parser, expected in PARSERS
+            if isinstance(field, field_class)
+        )
+        # Accept either the stored value or the human label of a choice
+        self.choices = None
+        if field.choices:
+            self.choices = {}
+            for stored, label in field.flatchoices:
+                self.choices[str(stored).upper()] = stored
+                self.choices[str(label).upper()] = stored
+
+    def parse(self, value):
+        if value in EMPTY_VALUES or (isinstance(value, str) and not value.strip()):
+            if self.is_text and self.blank:
+                return ''
+            if self.null:
+                return None
+            raise ValidationError(f"{self.name} is required", code='required')
+
+        try:
+            parsed = self.parser(value)
+        except (ValueError, TypeError, InvalidOperation):
+            raise ValidationError(f"{self.name} must be {self.expected}, got {value!r}", code='invalid')
+
+        if self.choices is not None:
+            if parsed.upper() not in self.choices:
+                raise ValidationError(f"{self.name} must be one of {sorted(set(self.choices.values()))}",
+                                      code='invalid_choice')
+            parsed = self.choices[parsed.upper()]
+        if self.max_length and len(parsed) > self.max_length:
+            raise ValidationError(f"{self.name} must be at most {self.max_length} characters",
+                                  code='max_length')
+        return parsed
+
+
+class ModelCodec:
+    """Field codecs for every editable, non-relational field of a model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = {
+            field.name: FieldCodec(field)
+            for field in model._meta.concrete_fields
+            if field.editable and not field.primary_key and not field.is_relation
+        }
+        self.required = [
+            name for name, codec in self.fields.items()
+            if not codec.null and not (codec.is_text and codec.blank)
+            and not model._meta.get_field(name).has_default()
+        ]
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def parse(self, name, value):
+        """Parse one field value, raising ValidationError on bad input"""
+        return self.fields[name].parse(value)
+
+    def parse_row(self, values, partial=True, defaults=None):
+        """
+        Parse a dict of raw values, ignoring unknown keys. With ``partial=False``
+        every required field must be present, either in ``values`` or in
+        ``defaults`` (already-typed values, or callables returning them).
+        Errors are collected per field.
+        """
+        parsed = {}
+        errors = {}
+        for name, value in values.items():
+            codec = self.fields.get(name)
+            if codec is None:
+                continue
+            try:
+                parsed[name] = codec.parse(value)
+            except ValidationError as error:
+                errors[name] = error.messages
+        for name, value in (defaults or {}).items():
+            if name not in values:
+                parsed[name] = value() if callable(value) else value
+        if not partial:
+            for name in self.required:
+                if name not in parsed and name not in errors:
+                    errors[name] = [f"{name} is required"]
+        if errors:
+            raise ValidationError(errors)
+        return parsed
+
+
+_codecs = {}
+
+
+def codec_for(model):
+    """The ModelCodec for a model, built once from its _meta"""
+    codec = _codecs.get(model)
+    if codec is None:
+        codec = _codecs[model] = ModelCodec(model)
+    return codec
@@ -187,4 +187,15 @@ OtherInformationFormSet = inlineformset_factory(
     form=OtherInformationForm, 
     extra=1, 
     can_delete=True
-)
\ No newline at end of file
+)
+
+# Sections of the edit page, loaded and saved one at a time: key -> (title, formset)
+EDIT_SECTIONS = {
+    'production': ('Production Lines', ProductionLineFormSet),
+    'tomorrow': ('Tomorrow Plan', TomorrowPlanFormSet),
+    'next_day': ('Next Day Plan', NextDayPlanFormSet),
+    'critical': ('Critical Part Status', CriticalPartStatusFormSet),
+    'afm': ('AFM Plans', AFMPlanFormSet),
+    'spd': ('SPD Plans', SPDPlanFormSet),
+    'other': ('Other Information', OtherInformationFormSet),
+}
@@ -0,0 +1,149 @@
+# kpis.py - Vectorised plan-vs-actual KPIs over the shifts of many boards
+import numpy as np
+
+from .models import ProductionLine
+
+SHIFTS = ('A', 'B', 'C')
+# Dimensions KPIs can be grouped by
+GROUPINGS = ('board', 'day', 'line', 'shift', 'model')
+
+# Columns loaded per production line: board, day and line, then per shift
+# its model, plan, actual and plan change
+LINE_FIELDS = ('planning_board_id', 'planning_board__today_date', 'line_number') + tuple(
+    f'{shift}_shift_{field}' for shift in 'abc' for field in ('model', 'plan', 'actual', 'plan_change')
+)
+SHIFT_FIELDS = 4
+
+
+class ShiftTable:
+    """
+    Every planned or reported shift of a set of production lines as parallel
+    NumPy arrays, one entry per (line, shift). Missing plan/actual/plan
+    change values are NaN; lines and models are stored as codes into
+    ``line_names`` and ``model_names``.
+    """
+
+    def __init__(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * len(LINE_FIELDS)
+        shifts = len(SHIFTS)
+
+        def per_shift(offset, dtype):
+            # (lines, shifts) laid out line by line
+            return np.array(
+                [columns[3 + i * SHIFT_FIELDS + offset] for i in range(shifts)], dtype=dtype
+            ).T.reshape(-1)
+
+        plan = per_shift(1, float)
+        actual = per_shift(2, float)
+        # Shifts with neither a plan nor an actual were never run
+        keep = ~(np.isnan(plan) & np.isnan(actual))
+
+        self.plan = plan[keep]
+        self.actual = actual[keep]
+        self.plan_change = per_shift(3, float)[keep]
+        self.board = np.repeat(np.array(columns[0], dtype=np.int64), shifts)[keep]
+        self.day = np.repeat(np.array(columns[1], dtype='datetime64[D]'), shifts)[keep]
+        self.shift = np.tile(np.arange(shifts), len(rows))[keep]
+        self.line_names, line = np.unique(np.array(columns[2], dtype=str), return_inverse=True)
+        self.line = np.repeat(line.reshape(-1), shifts)[keep]
+        models = np.array([name or '' for name in per_shift(0, object)], dtype=str)
+        self.model_names, model = np.unique(models, return_inverse=True)
+        self.model = model.reshape(-1)[keep]
+
+    @classmethod
+    def from_lines(cls, lines, day):
+        """Table of already loaded ProductionLine rows of one board day"""
+        return cls([
+            (line.planning_board_id, day) + tuple(getattr(line, field) for field in LINE_FIELDS[2:])
+            for line in lines
+        ])
+
+    def __len__(self):
+        return len(self.plan)
+
+    def _codes(self, name):
+        if name == 'day':
+            return self.day.astype(np.int64)
+        return getattr(self, name)
+
+    def _label(self, name, code):
+        if name == 'day':
+            return str(np.datetime64(int(code), 'D'))
+        if name == 'shift':
+            return SHIFTS[code]
+        if name == 'line':
+            return str(self.line_names[code])
+        if name == 'model':
+            return str(self.model_names[code])
+        return int(code)
+
+    def kpis(self, by=('line',)):
+        """
+        KPIs per group of ``by`` dimensions (see GROUPINGS), ordered by group:
+
+        - ``plan``/``actual``/``variance``: totals and actual minus plan
+        - ``efficiency``: actual as % of plan (calculate_efficiency of the totals)
+        - ``attainment``: % of planned shifts whose actual met the plan
+        - ``plan_change_rate``: % of planned shifts whose plan was changed
+        """
+        by = tuple(by)
+        if not len(self):
+            return []
+        # One integer key per shift (mixed radix over the dimensions' distinct values)
+        key = np.zeros(len(self), dtype=np.int64)
+        dimensions = []
+        for name in by:
+            values, codes = np.unique(self._codes(name), return_inverse=True)
+            key = key * len(values) + codes.reshape(-1)
+            dimensions.append((name, len(values), [self._label(name, value) for value in values.tolist()]))
+        groups, inverse = np.unique(key, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        count = len(groups)
+
+        def total(values):
+            return np.bincount(inverse, weights=values, minlength=count)
+
+        plan = np.nan_to_num(self.plan)
+        actual = np.nan_to_num(self.actual)
+        change = np.nan_to_num(self.plan_change)
+        planned = plan > 0
+
+        plan_total = total(plan)
+        actual_total = total(actual)
+        planned_shifts = total(planned)
+        met = total(planned & (actual >= plan))
+        changed = total(planned & (change != 0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            efficiency = np.where(plan_total != 0, np.round(actual_total / plan_total * 100, 1), 0)
+            attainment = np.where(planned_shifts > 0, np.round(met / planned_shifts * 100, 1), 0)
+            change_rate = np.where(planned_shifts > 0, np.round(changed / planned_shifts * 100, 1), 0)
+
+        columns = {
+            'planned_shifts': planned_shifts.astype(np.int64).tolist(),
+            'plan': plan_total.astype(np.int64).tolist(),
+            'actual': actual_total.astype(np.int64).tolist(),
+            'variance': (actual_total - plan_total).astype(np.int64).tolist(),
+            'efficiency': efficiency.tolist(),
+            'attainment': attainment.tolist(),
+            'plan_changes': total(change).astype(np.int64).tolist(),
+            'plan_change_rate': change_rate.tolist(),
+        }
+        # Group labels, column by column, from the group keys
+        for name, size, labels in reversed(dimensions):
+            groups, codes = np.divmod(groups, size)
+            columns = {name: np.array(labels, dtype=object)[codes].tolist(), **columns}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def totals(self):
+        """KPIs of the whole table"""
+        kpis = self.kpis(by=())
+        return kpis[0] if kpis else {
+            'planned_shifts': 0, 'plan': 0, 'actual': 0, 'variance': 0, 'efficiency': 0,
+            'attainment': 0, 'plan_changes': 0, 'plan_change_rate': 0,
+        }
+
+
+def load_shift_table(boards):
+    """ShiftTable of every production line on ``boards`` (a PlanningBoard queryset), in one query"""
+    return ShiftTable(list(ProductionLine.objects.filter(planning_board__in=boards).values_list(*LINE_FIELDS)))
@@ -0,0 +1,121 @@
+# live.py - Row-level delta protocol for the live section streams
+import zlib
+
+from .encoding import dumps
+
+
+def row_version(cells):
+    """Short content hash identifying one revision of a row"""
+    encoded = dumps(cells).encode('utf-8')
+    return format(zlib.crc32(encoded), '08x')
+
+
+def row_versions(payload):
+    """Version of every row of a payload; shared snapshots carry them precomputed"""
+    versions = payload.get('row_versions')
+    if versions is None:
+        versions = [row_version(cells) for cells in payload.get('data', [])]
+    return versions
+
+
+def sse_event(data, event=None, event_id=None):
+    """Format a single Server-Sent Events message"""
+    message = ''
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    if event:
+        message += f"event: {event}\n"
+    return message + f"data: {dumps(data)}\n\n"
+
+
+class SectionDeltaTracker:
+    """
+    Remembers what a stream client has already received and turns each new
+    section payload into either a full snapshot or a row-level delta.
+
+    Payloads are the dicts built by the section data helpers: ``data`` holds
+    the rows and ``row_ids`` the stable id of each row, in the same order.
+    """
+
+    # Keys that never change for a stream and are only sent with the snapshot
+    SNAPSHOT_ONLY_KEYS = ('section', 'board_id', 'board_title', 'board_date', 'title', 'headers')
+    # Per-event keys that are always forwarded with a delta
+    ALWAYS_SENT_KEYS = ('timestamp',)
+
+    def __init__(self):
+        self.versions = None
+        self.order = []
+        self.extras = {}
+
+    def next_event(self, payload):
+        """Return ``(event_name, body)`` for the payload, or None if nothing changed"""
+        if self.versions is None:
+            return 'snapshot', self.snapshot(payload)
+        delta = self.delta(payload)
+        if delta is None:
+            return None
+        return 'delta', delta
+
+    def snapshot(self, payload):
+        """Full payload plus row versions; resets the tracked state"""
+        row_ids = list(payload.get('row_ids', []))
+        rows = payload.get('data', [])
+        versions = row_versions(payload)
+
+        self.versions = dict(zip(row_ids, versions))
+        self.order = row_ids
+        self.extras = self._extras(payload)
+
+        snapshot = dict(payload)
+        snapshot['row_ids'] = row_ids
+        snapshot['row_versions'] = versions
+        return snapshot
+
+    def delta(self, payload):
+        """Inserted/updated/deleted rows since the last event, or None if unchanged"""
+        row_ids = list(payload.get('row_ids', []))
+        rows = payload.get('data', [])
+
+        inserted = []
+        updated = []
+        versions = {}
+        for row_id, cells, version in zip(row_ids, rows, row_versions(payload)):
+            versions[row_id] = version
+            previous = self.versions.get(row_id)
+            if previous is None:
+                inserted.append({'id': row_id, 'v': version, 'cells': cells})
+            elif previous != version:
+                updated.append({'id': row_id, 'v': version, 'cells': cells})
+
+        deleted = [row_id for row_id in self.order if row_id not in versions]
+
+        delta = {}
+        if inserted:
+            delta['inserted'] = inserted
+        if updated:
+            delta['updated'] = updated
+        if deleted:
+            delta['deleted'] = deleted
+        if row_ids != self.order:
+            delta['order'] = row_ids
+
+        extras = self._extras(payload)
+        for key, value in extras.items():
+            if self.extras.get(key) != value:
+                delta[key] = value
+
+        self.versions = versions
+        self.order = row_ids
+        self.extras = extras
+
+        if not delta:
+            return None
+        for key in self.ALWAYS_SENT_KEYS:
+            if key in payload:
+                delta[key] = payload[key]
+        return delta
+
+    def _extras(self, payload):
+        """Everything except rows, ids and snapshot-only metadata"""
+        skipped = set(self.SNAPSHOT_ONLY_KEYS) | set(self.ALWAYS_SENT_KEYS) | {'data', 'row_ids', 'row_versions'}
+        return {key: value for key, value in payload.items() if key not in skipped}
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planning_board.models import PlanningBoard
+from planning_board.rollups import rebuild_line_rollups, rebuild_quantity_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily rollup tables used by historical analytics from the board data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', dest='boards',
+                            help='Only rebuild this board (can be repeated)')
+        parser.add_argument('--since', help='Only rebuild boards dated on or after YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Boards aggregated per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        boards = PlanningBoard.objects.order_by('pk')
+        if options['boards']:
+            boards = boards.filter(pk__in=options['boards'])
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['since']}")
+            boards = boards.filter(today_date__gte=since)
+
+        board_ids = list(boards.values_list('pk', flat=True))
+        line_rows = quantity_rows = 0
+        for start in range(0, len(board_ids), options['chunk_size']):
+            chunk = PlanningBoard.objects.filter(pk__in=board_ids[start:start + options['chunk_size']])
+            line_rows += rebuild_line_rollups(chunk)
+            quantity_rows += rebuild_quantity_rollups(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rollups of {len(board_ids)} boards: {line_rows} line/shift rows, '
+            f'{quantity_rows} quantity rows'
+        ))
@@ -0,0 +1,97 @@
+# middleware.py - Response compression for JSON and SSE responses
+import zlib
+
+from django.middleware.gzip import GZipMiddleware, re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+# Only the API and stream payloads are compressed; pages and files are left as is
+COMPRESSED_TYPES = ("application/json", "text/event-stream")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress JSON and SSE responses with brotli when the client and server
+    support it, falling back to gzip otherwise.
+
+    Streaming responses (the SSE streams) are flushed after every chunk so
+    events still reach the display as soon as they are written.
+    """
+
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        if response.get("Content-Type", "").split(";")[0].strip() not in COMPRESSED_TYPES:
+            return response
+
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is not None and re_accepts_brotli.search(accept_encoding):
+            encoding = "br"
+        elif response.streaming and re_accepts_gzip.search(accept_encoding):
+            # Django's compress_sequence only yields once gzip's buffer fills
+            encoding = "gzip"
+        else:
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        if response.streaming:
+            compressor = brotli.Compressor(quality=self.brotli_quality) if encoding == "br" else _GzipStream()
+            if response.is_async:
+                original_iterator = response.streaming_content
+
+                async def compress_wrapper():
+                    async for chunk in original_iterator:
+                        yield compressor.process(chunk) + compressor.flush()
+                    yield compressor.finish()
+
+                response.streaming_content = compress_wrapper()
+            else:
+                response.streaming_content = self._compress_sequence(compressor, response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compress_sequence(compressor, sequence):
+        for chunk in sequence:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class _GzipStream:
+    """gzip with the process/flush/finish interface of brotli.Compressor"""
+
+    def __init__(self, level=6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, chunk):
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planning_board", "0002_alter_productionline_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="planningboard",
+            index=models.Index(
+                fields=["created_by", "-created_at", "-id"],
+                name="board_user_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planning_board", "0003_planningboard_keyset_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DisplayDevice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.SlugField(
+                        help_text="Identity the screen connects with (?device=...)",
+                        max_length=64,
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("plant", models.CharField(blank=True, max_length=100)),
+                (
+                    "group",
+                    models.CharField(
+                        blank=True,
+                        help_text="Screens in a group can be driven together",
+                        max_length=100,
+                    ),
+                ),
+                ("section", models.CharField(blank=True, max_length=50)),
+                ("config", models.JSONField(blank=True, default=dict)),
+                ("state_updated_at", models.DateTimeField(blank=True, null=True)),
+                ("state_updated_by", models.CharField(blank=True, max_length=150)),
+                ("last_heartbeat", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "board",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="display_devices",
+                        to="planning_board.planningboard",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="display_devices",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["plant", "group", "name"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "key"), name="display_device_owner_key_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
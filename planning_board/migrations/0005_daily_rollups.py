@@ -0,0 +1,115 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planning_board", "0004_display_device"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LineShiftRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("line_number", models.CharField(max_length=100)),
+                (
+                    "shift",
+                    models.CharField(
+                        choices=[("A", "A Shift"), ("B", "B Shift"), ("C", "C Shift")],
+                        max_length=1,
+                    ),
+                ),
+                ("plan", models.IntegerField(default=0)),
+                ("actual", models.IntegerField(default=0)),
+                ("plan_change", models.IntegerField(default=0)),
+                ("planned_shifts", models.IntegerField(default=0)),
+                ("met_shifts", models.IntegerField(default=0)),
+                ("changed_shifts", models.IntegerField(default=0)),
+                (
+                    "planning_board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="line_shift_rollups",
+                        to="planning_board.planningboard",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "line_number", "shift"],
+                "indexes": [
+                    models.Index(
+                        fields=["day", "line_number"], name="line_shift_rollup_day_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("planning_board", "line_number", "shift"),
+                        name="line_shift_rollup_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PlanQuantityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("spd", "SPD by customer"),
+                            ("afm", "AFM by plan type"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("category", models.CharField(max_length=20)),
+                ("plans", models.IntegerField(default=0)),
+                ("quantity", models.IntegerField(default=0)),
+                (
+                    "planning_board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="plan_quantity_rollups",
+                        to="planning_board.planningboard",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "kind", "category"],
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "day"], name="plan_quantity_rollup_day_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("planning_board", "kind", "category"),
+                        name="plan_quantity_rollup_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planning_board", "0005_daily_rollups"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="lineshiftrollup",
+            name="line_shift_rollup_uniq",
+        ),
+        migrations.AddField(
+            model_name="lineshiftrollup",
+            name="model",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="lineshiftrollup",
+            index=models.Index(
+                fields=["day", "model"], name="line_shift_rollup_model_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="lineshiftrollup",
+            constraint=models.UniqueConstraint(
+                fields=("planning_board", "line_number", "shift", "model"),
+                name="line_shift_rollup_uniq",
+            ),
+        ),
+    ]
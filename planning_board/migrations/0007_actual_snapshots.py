@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planning_board", "0006_rollup_model"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActualSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "shift",
+                    models.CharField(
+                        choices=[("A", "A Shift"), ("B", "B Shift"), ("C", "C Shift")],
+                        max_length=1,
+                    ),
+                ),
+                ("recorded_at", models.DateTimeField()),
+                ("actual", models.IntegerField()),
+                (
+                    "production_line",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="actual_snapshots",
+                        to="planning_board.productionline",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["recorded_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["production_line", "shift", "recorded_at"],
+                        name="actual_snapshot_line_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -16,10 +16,17 @@ class PlanningBoard(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's boards on (created_at, id)
+            models.Index(fields=['created_by', '-created_at', '-id'], name='board_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"Planning Board - {self.today_date}"
 
+# Shift code -> ProductionLine field holding that shift's actual count
+ACTUAL_FIELDS = {'A': 'a_shift_actual', 'B': 'b_shift_actual', 'C': 'c_shift_actual'}
+
 class ProductionLine(models.Model):
     """Production lines like CLUTCH ASSY LINE-1, PULLEY ASSY LINE-1, etc."""
     SHIFT_CHOICES = [
@@ -59,6 +66,14 @@ class ProductionLine(models.Model):
     
     def __str__(self):
         return f"{self.line_number} - {self.planning_board.today_date}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Actuals as loaded, so a later write can tell which ones changed (actuals.py)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_actuals = {field: loaded[field] for field in ACTUAL_FIELDS.values() if field in loaded}
+        return instance
 
 class TomorrowPlan(models.Model):
     """Tomorrow assembly plan"""
@@ -158,4 +173,115 @@ class ExcelUpload(models.Model):
     processed = models.BooleanField(default=False)
     
     def __str__(self):
-        return f"Excel Upload - {self.uploaded_at}"
\ No newline at end of file
+        return f"Excel Upload - {self.uploaded_at}"
+
+class DisplayDevice(models.Model):
+    """A named shop-floor screen running the monitor display"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='display_devices')
+    key = models.SlugField(max_length=64, help_text="Identity the screen connects with (?device=...)")
+    name = models.CharField(max_length=100)
+    plant = models.CharField(max_length=100, blank=True)
+    group = models.CharField(max_length=100, blank=True, help_text="Screens in a group can be driven together")
+    
+    # Display state: what the screen is showing and how it is configured
+    board = models.ForeignKey(PlanningBoard, on_delete=models.SET_NULL, null=True, blank=True, related_name='display_devices')
+    section = models.CharField(max_length=50, blank=True)
+    config = models.JSONField(default=dict, blank=True)
+    state_updated_at = models.DateTimeField(null=True, blank=True)
+    state_updated_by = models.CharField(max_length=150, blank=True)
+    
+    last_heartbeat = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['plant', 'group', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='display_device_owner_key_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"Display {self.name}"
+    
+    @property
+    def queue_key(self):
+        """Key of this screen's control-command queue (monitor_queue.py)"""
+        return f"device_{self.pk}"
+
+class LineShiftRollup(models.Model):
+    """Plan vs actual of one line, shift and model on a board's day, maintained by rollups.py"""
+    planning_board = models.ForeignKey(PlanningBoard, on_delete=models.CASCADE, related_name='line_shift_rollups')
+    day = models.DateField()
+    line_number = models.CharField(max_length=100)
+    shift = models.CharField(max_length=1, choices=ProductionLine.SHIFT_CHOICES)
+    model = models.CharField(max_length=100, blank=True)
+    
+    plan = models.IntegerField(default=0)
+    actual = models.IntegerField(default=0)
+    plan_change = models.IntegerField(default=0)
+    # Shifts with a plan, those whose actual met it and those whose plan was changed
+    planned_shifts = models.IntegerField(default=0)
+    met_shifts = models.IntegerField(default=0)
+    changed_shifts = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['day', 'line_number', 'shift']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['planning_board', 'line_number', 'shift', 'model'], name='line_shift_rollup_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'line_number'], name='line_shift_rollup_day_idx'),
+            models.Index(fields=['day', 'model'], name='line_shift_rollup_model_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.line_number} {self.shift}"
+
+class PlanQuantityRollup(models.Model):
+    """SPD quantity per customer and AFM quantity per plan type on a board's day"""
+    SPD = 'spd'
+    AFM = 'afm'
+    KIND_CHOICES = [
+        (SPD, 'SPD by customer'),
+        (AFM, 'AFM by plan type'),
+    ]
+    
+    planning_board = models.ForeignKey(PlanningBoard, on_delete=models.CASCADE, related_name='plan_quantity_rollups')
+    day = models.DateField()
+    kind = models.CharField(max_length=3, choices=KIND_CHOICES)
+    category = models.CharField(max_length=20)  # customer or plan type
+    plans = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['day', 'kind', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['planning_board', 'kind', 'category'], name='plan_quantity_rollup_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'day'], name='plan_quantity_rollup_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.kind} {self.category}"
+
+class ActualSnapshot(models.Model):
+    """
+    A shift's actual count on a production line at the moment it changed.
+    Append-only; written by actuals.py whenever an actual is saved with a new value.
+    """
+    # The (line, shift, time) index below also serves lookups by line
+    production_line = models.ForeignKey(ProductionLine, on_delete=models.CASCADE, related_name='actual_snapshots', db_index=False)
+    shift = models.CharField(max_length=1, choices=ProductionLine.SHIFT_CHOICES)
+    recorded_at = models.DateTimeField()
+    actual = models.IntegerField()
+    
+    class Meta:
+        ordering = ['recorded_at']
+        indexes = [
+            models.Index(fields=['production_line', 'shift', 'recorded_at'], name='actual_snapshot_line_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.production_line_id} {self.shift} {self.recorded_at}: {self.actual}"
@@ -0,0 +1,73 @@
+# monitor_queue.py - Ordered, acknowledged control-command queue per monitor
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+# Unacknowledged commands are kept this long (the old single-slot command used 5 minutes)
+COMMAND_TIMEOUT = 5 * 60
+# A monitor that has been away longer only gets the newest commands
+MAX_PENDING = 50
+
+
+def _seq_key(monitor_key):
+    return f"monitor_cmd_seq_{monitor_key}"
+
+
+def _ack_key(monitor_key):
+    return f"monitor_cmd_ack_{monitor_key}"
+
+
+def _command_key(monitor_key, seq):
+    return f"monitor_cmd_{monitor_key}_{seq}"
+
+
+def enqueue_command(monitor_key, command):
+    """Append a command to the monitor's queue; returns the command with its ``seq``"""
+    if cache.add(_seq_key(monitor_key), 0, None):
+        # The counter is new (or was evicted) and restarts at 1; an ack left
+        # from the old numbering would hide every new command
+        cache.delete(_ack_key(monitor_key))
+    seq = cache.incr(_seq_key(monitor_key))
+    command = dict(command, seq=seq)
+    cache.set(_command_key(monitor_key, seq), command, COMMAND_TIMEOUT)
+    return command
+
+
+def pending_commands(monitor_key, after=0):
+    """Unacknowledged commands with ``seq`` greater than ``after``, oldest first"""
+    last = cache.get(_seq_key(monitor_key), 0)
+    start = max(after, cache.get(_ack_key(monitor_key), 0), last - MAX_PENDING) + 1
+    if start > last:
+        return []
+    keys = [_command_key(monitor_key, seq) for seq in range(start, last + 1)]
+    found = cache.get_many(keys)
+    return [found[key] for key in keys if key in found]
+
+
+def pending_counts(monitor_keys):
+    """Number of pending commands per monitor key, in two cache reads for all of them"""
+    monitor_keys = list(monitor_keys)
+    marks = cache.get_many([key for monitor_key in monitor_keys
+                            for key in (_seq_key(monitor_key), _ack_key(monitor_key))])
+    keys = {}
+    for monitor_key in monitor_keys:
+        last = marks.get(_seq_key(monitor_key), 0)
+        start = max(marks.get(_ack_key(monitor_key), 0), last - MAX_PENDING) + 1
+        keys[monitor_key] = [_command_key(monitor_key, seq) for seq in range(start, last + 1)]
+    found = cache.get_many([key for command_keys in keys.values() for key in command_keys])
+    return {
+        monitor_key: sum(1 for key in command_keys if key in found)
+        for monitor_key, command_keys in keys.items()
+    }
+
+
+def ack_commands(monitor_key, seq):
+    """Mark every command up to ``seq`` as delivered; returns the acknowledged seq"""
+    acked = cache.get(_ack_key(monitor_key), 0)
+    if seq > acked:
+        cache.set(_ack_key(monitor_key), seq, None)
+        acked = seq
+    return acked
+
+
+apending_commands = sync_to_async(pending_commands)
+aack_commands = sync_to_async(ack_commands)
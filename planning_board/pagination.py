@@ -0,0 +1,108 @@
+# pagination.py - Keyset (cursor) pagination for board listings
+import base64
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TIMEOUT = 60
+
+
+def encode_cursor(board, direction):
+    """Opaque cursor pointing just past ``board`` in the given direction ('n' or 'p')"""
+    raw = f"{direction}|{board.created_at.isoformat()}|{board.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(direction, created_at, pk)`` or None for a missing/invalid cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        if direction not in ('n', 'p'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    """Read ``limit`` from the query string, clamped to MAX_PAGE_SIZE"""
+    try:
+        size = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    """One page of boards ordered newest first on (created_at, id)"""
+
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate_boards(queryset, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of ``queryset`` after/before the cursor without OFFSET,
+    so the cost of a page does not grow with the number of boards.
+    """
+    position = decode_cursor(cursor)
+
+    if position and position[0] == 'p':
+        _, created_at, pk = position
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by('created_at', 'pk')[:per_page + 1]
+        )
+        has_more_before = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        next_cursor = encode_cursor(items[-1], 'n') if items else None
+        prev_cursor = encode_cursor(items[0], 'p') if items and has_more_before else None
+        return KeysetPage(items, next_cursor, prev_cursor)
+
+    ordered = queryset.order_by('-created_at', '-pk')
+    if position:
+        _, created_at, pk = position
+        ordered = ordered.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(ordered[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1], 'n') if len(rows) > per_page else None
+    prev_cursor = encode_cursor(items[0], 'p') if items and position else None
+    return KeysetPage(items, next_cursor, prev_cursor)
+
+
+def page_url(request, cursor):
+    """Current URL with ``cursor`` replaced, keeping the other filters"""
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+def cached_count(queryset, key, timeout=COUNT_CACHE_TIMEOUT):
+    """Count a listing once and reuse it from the cache for subsequent pages"""
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
@@ -0,0 +1,104 @@
+# rollups.py - Daily pre-aggregated rows for historical analytics, kept current on board changes
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .aggregates import count_where, quantity
+from .models import AFMPlan, LineShiftRollup, PlanQuantityRollup, PlanningBoard, ProductionLine, SPDPlan
+
+# Quantity rollups: kind -> (model, field grouped by)
+QUANTITY_SOURCES = {
+    PlanQuantityRollup.SPD: (SPDPlan, 'customer'),
+    PlanQuantityRollup.AFM: (AFMPlan, 'plan_type'),
+}
+
+BATCH_SIZE = 1000
+
+
+def rebuild_line_rollups(boards):
+    """
+    Replace the LineShiftRollup rows of ``boards`` (a PlanningBoard queryset)
+    with fresh ones, one GROUP BY query per shift. Shifts without a plan or
+    an actual are left out, as in kpis.ShiftTable.
+    """
+    rollups = []
+    lines = ProductionLine.objects.filter(planning_board__in=boards)
+    for shift in 'abc':
+        plan, actual, change = f'{shift}_shift_plan', f'{shift}_shift_actual', f'{shift}_shift_plan_change'
+        planned = Q(**{f'{plan}__gt': 0})
+        rows = lines.filter(
+            Q(**{f'{plan}__isnull': False}) | Q(**{f'{actual}__isnull': False})
+        ).values(
+            'planning_board_id', 'planning_board__today_date', 'line_number', f'{shift}_shift_model'
+        ).annotate(
+            plan=Sum(quantity(plan)),
+            actual=Sum(quantity(actual)),
+            plan_change=Sum(quantity(change)),
+            planned_shifts=count_where(planned),
+            met_shifts=count_where(planned & Q(**{f'{actual}__gte': F(plan)})),
+            changed_shifts=count_where(planned & ~Q(**{change: 0}) & Q(**{f'{change}__isnull': False})),
+        ).order_by()
+        rollups.extend(
+            LineShiftRollup(
+                planning_board_id=row.pop('planning_board_id'),
+                day=row.pop('planning_board__today_date'),
+                shift=shift.upper(),
+                model=row.pop(f'{shift}_shift_model') or '',
+                **row,
+            )
+            for row in rows
+        )
+
+    with transaction.atomic():
+        LineShiftRollup.objects.filter(planning_board__in=boards).delete()
+        LineShiftRollup.objects.bulk_create(rollups, batch_size=BATCH_SIZE)
+    return len(rollups)
+
+
+def rebuild_quantity_rollups(boards, kinds=tuple(QUANTITY_SOURCES)):
+    """Replace the PlanQuantityRollup rows of ``boards`` for the given kinds"""
+    rollups = []
+    for kind in kinds:
+        model, field = QUANTITY_SOURCES[kind]
+        rows = model.objects.filter(planning_board__in=boards).values(
+            'planning_board_id', 'planning_board__today_date', field
+        ).annotate(
+            plans=Count('pk'),
+            quantity=Sum(quantity('plan_qty')),
+        ).order_by()
+        rollups.extend(
+            PlanQuantityRollup(
+                planning_board_id=row['planning_board_id'],
+                day=row['planning_board__today_date'],
+                kind=kind,
+                category=row[field] or '',
+                plans=row['plans'],
+                quantity=row['quantity'],
+            )
+            for row in rows
+        )
+
+    with transaction.atomic():
+        PlanQuantityRollup.objects.filter(planning_board__in=boards, kind__in=kinds).delete()
+        PlanQuantityRollup.objects.bulk_create(rollups, batch_size=BATCH_SIZE)
+    return len(rollups)
+
+
+def update_rollups(event):
+    """
+    Change-bus subscriber (events.py): re-aggregate the board section that
+    changed. Runs after the change commits, once per section of a batch.
+    """
+    board_id, section = event['board_id'], event['section']
+    boards = PlanningBoard.objects.filter(pk=board_id)
+    if section == 'production_lines':
+        rebuild_line_rollups(boards)
+    elif section == 'spd_plans':
+        rebuild_quantity_rollups(boards, kinds=(PlanQuantityRollup.SPD,))
+    elif section == 'afm_plans':
+        rebuild_quantity_rollups(boards, kinds=(PlanQuantityRollup.AFM,))
+    elif section is None and event['action'] != 'deleted':
+        # The board's date may have moved; deleted boards take their rollups with them
+        day = boards.values_list('today_date', flat=True).first()
+        if day is not None:
+            LineShiftRollup.objects.filter(planning_board_id=board_id).exclude(day=day).update(day=day)
+            PlanQuantityRollup.objects.filter(planning_board_id=board_id).exclude(day=day).update(day=day)
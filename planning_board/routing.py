@@ -0,0 +1,9 @@
+# routing.py - WebSocket URL routes
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/board/<int:board_id>/<str:section>/', consumers.BoardSectionConsumer.as_asgi()),
+    path('ws/monitor/', consumers.MonitorConsumer.as_asgi()),
+]
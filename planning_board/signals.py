@@ -0,0 +1,58 @@
+# signals.py - Model signal handlers
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PlanningBoard, ProductionLine, ExcelUpload
+from .stats import invalidate_user_stats
+from .actuals import record_actuals
+from .events import board_changed, section_changed
+from .versions import SECTION_MODELS
+
+
+@receiver([post_save, post_delete], sender=PlanningBoard)
+def board_saved_or_deleted(sender, instance, **kwargs):
+    """Board counts on the dashboard depend on every board the user owns"""
+    invalidate_user_stats(instance.created_by_id)
+    board_changed(instance.pk, 'deleted' if kwargs['signal'] is post_delete else 'updated')
+
+
+def board_owner_id(instance):
+    """Owner of a child row's board, without a query when the board is already loaded"""
+    if type(instance).planning_board.is_cached(instance):
+        return instance.planning_board.created_by_id
+    return PlanningBoard.objects.filter(pk=instance.planning_board_id).values_list(
+        'created_by_id', flat=True
+    ).first()
+
+
+@receiver([post_save, post_delete], sender=ProductionLine)
+def production_line_changed(sender, instance, **kwargs):
+    """The dashboard shows the number of distinct production lines"""
+    owner_id = board_owner_id(instance)
+    if owner_id:
+        invalidate_user_stats(owner_id)
+
+
+@receiver(post_save, sender=ProductionLine)
+def production_line_actuals_saved(sender, instance, raw=False, **kwargs):
+    """Append the line's changed shift actuals to its intra-shift history"""
+    if not raw:
+        record_actuals([instance])
+
+
+@receiver([post_save, post_delete], sender=ExcelUpload)
+def excel_upload_changed(sender, instance, **kwargs):
+    """The dashboard shows the number of uploads"""
+    invalidate_user_stats(instance.uploaded_by_id)
+
+
+@receiver([post_save, post_delete])
+def section_row_changed(sender, instance, **kwargs):
+    """Publish row changes: bumps the section version and wakes the live displays"""
+    section = SECTION_MODELS.get(sender)
+    if section:
+        if kwargs['signal'] is post_delete:
+            action = 'deleted'
+        else:
+            action = 'created' if kwargs.get('created') else 'updated'
+        section_changed(instance.planning_board_id, section, [instance.pk], action)
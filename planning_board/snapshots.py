@@ -0,0 +1,250 @@
+# snapshots.py - Section payloads built once per data version and shared by every screen
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .encoding import dumps, encode_compact
+from .live import row_version, sse_event
+from .models import PlanningBoard
+from .versions import section_versions
+
+# Display sections -> the board relations (see versions.py) their rows come from
+SECTION_SOURCES = {
+    'today_assembly': ('production_lines',),
+    'tomorrow_assembly': ('tomorrow_plans',),
+    'next_day_assembly': ('next_day_plans',),
+    'critical_parts': ('critical_parts',),
+    'afm_plans': ('afm_plans',),
+    'spd_plans': ('spd_plans',),
+    'other_info': ('other_info',),
+}
+# The merged monitor view of today_assembly also shows the next two days' plans
+MERGED_SOURCES = ('production_lines', 'tomorrow_plans', 'next_day_plans')
+# Sections whose payload also depends on the clock (critical part receiving
+# status, items due soon); their snapshots are rebuilt every CLOCK_SLOT seconds
+# even when no row changes
+CLOCK_SECTIONS = ('critical_parts', 'other_info')
+CLOCK_SLOT = 60
+
+# Snapshots kept in this process, and how long other processes can reuse one
+LOCAL_SNAPSHOTS = 256
+SNAPSHOT_CACHE_TIMEOUT = 10 * 60
+# Versions of each board section kept for resuming streams (Last-Event-ID);
+# a client further behind than this gets a fresh snapshot
+REPLAY_VERSIONS = 32
+
+
+class Snapshot:
+    """
+    One built section payload. It is shared between streams, so treat
+    ``payload`` as read-only; encoded forms are produced once and reused.
+    """
+
+    def __init__(self, key, payload):
+        self.key = key
+        self.kind, self.board_id, self.section, self.event_id = key
+        self.payload = payload
+        self._encoded = {}
+        self._lock = threading.RLock()  # encodings build on each other (sse -> json)
+
+    def _encode(self, name, encode):
+        encoded = self._encoded.get(name)
+        if encoded is None:
+            with self._lock:
+                encoded = self._encoded.get(name)
+                if encoded is None:
+                    encoded = self._encoded[name] = encode()
+        return encoded
+
+    def json(self):
+        """The payload as JSON text"""
+        return self._encode('json', lambda: dumps(self.payload))
+
+    def sse_snapshot(self, compact=False):
+        """The SSE ``snapshot`` event for this payload, carrying its event id"""
+        if compact:
+            return self._encode(
+                'sse_compact', lambda: sse_event(encode_compact(self.payload), 'snapshot', self.event_id)
+            )
+        return self._encode('sse', lambda: f"id: {self.event_id}\nevent: snapshot\ndata: {self.json()}\n\n")
+
+
+class SnapshotStore:
+    """
+    Single-flight memo of section payloads keyed on (kind, board, section,
+    event id). The first caller for a key builds the payload; callers
+    arriving while it builds wait for that result instead of querying too.
+    Finished payloads are also put in the shared cache for other processes.
+
+    The last REPLAY_VERSIONS snapshots of every board section are kept as the
+    replay buffer that resumed streams compute their missed delta from; a
+    snapshot evicted from the ``size`` most recent ones leaves it too.
+    """
+
+    def __init__(self, size=LOCAL_SNAPSHOTS, replay_versions=REPLAY_VERSIONS):
+        self.size = size
+        self.replay_versions = replay_versions
+        self._snapshots = OrderedDict()
+        self._history = {}
+        self._building = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, key, build):
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                self.hits += 1
+                return snapshot
+            flight = self._building.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._building[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.hits += 1
+            return flight.snapshot
+
+        try:
+            snapshot = self._load_or_build(key, build)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.snapshot = snapshot
+            if 'error' not in snapshot.payload:
+                with self._lock:
+                    self._snapshots[key] = snapshot
+                    history = self._history.setdefault(key[:3], OrderedDict())
+                    history[snapshot.event_id] = snapshot
+                    while len(history) > self.replay_versions:
+                        history.popitem(last=False)
+                    while len(self._snapshots) > self.size:
+                        self._forget(self._snapshots.popitem(last=False)[0])
+            return snapshot
+        finally:
+            with self._lock:
+                del self._building[key]
+            flight.done.set()
+
+    def _forget(self, key):
+        # Snapshots leave the replay buffer with the LRU, so both stay within ``size``
+        history = self._history.get(key[:3])
+        if history is not None:
+            history.pop(key[3], None)
+            if not history:
+                del self._history[key[:3]]
+
+    def find(self, kind, board_id, section, event_id):
+        """An earlier snapshot of the section from the replay buffer, or None"""
+        with self._lock:
+            snapshot = self._history.get((kind, board_id, section), {}).get(event_id)
+        if snapshot is None:
+            # Another process may have built it
+            key = (kind, board_id, section, event_id)
+            payload = cache.get(_cache_key(key))
+            if payload is not None:
+                snapshot = Snapshot(key, payload)
+        return snapshot
+
+    def _load_or_build(self, key, build):
+        cache_key = _cache_key(key)
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = with_row_versions(build())
+            with self._lock:
+                self.builds += 1
+            # Failed builds are returned to the waiting callers but never kept
+            if 'error' not in payload:
+                cache.set(cache_key, payload, SNAPSHOT_CACHE_TIMEOUT)
+        return Snapshot(key, payload)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._history.clear()
+
+
+def _cache_key(key):
+    return 'section_snapshot_' + '_'.join(str(part) for part in key)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+
+
+snapshot_store = SnapshotStore()
+
+
+def with_row_versions(payload):
+    """Add ``row_versions`` so stream trackers don't hash every row per screen"""
+    if 'row_versions' not in payload and 'data' in payload:
+        payload = dict(payload, row_versions=[row_version(cells) for cells in payload['data']])
+    return payload
+
+
+def section_snapshot(kind, board_id, section, user, build, sources=None):
+    """
+    The shared snapshot of a board section for ``user``. ``build()`` is only
+    called when no snapshot exists for the section's current data version
+    (and, for CLOCK_SECTIONS, clock slot); the payload's ``timestamp`` is
+    when it was built.
+    Raises PlanningBoard.DoesNotExist when the user cannot see the board.
+
+    The event id is the newest of the board's ``updated_at``, the versions
+    of the sections the payload reads and the clock slot (nanosecond
+    timestamps), so it grows with every change and identifies the payload.
+    """
+    updated_at = PlanningBoard.objects.filter(pk=board_id, created_by=user).values_list(
+        'updated_at', flat=True
+    ).first()
+    if updated_at is None:
+        raise PlanningBoard.DoesNotExist
+    versions = section_versions(board_id)
+    sources = sources or SECTION_SOURCES.get(section, ())
+    event_id = max(
+        [int(updated_at.timestamp() * 1_000_000) * 1000, clock_version(section)]
+        + [versions[source] for source in sources]
+    )
+
+    return snapshot_store.get((kind, board_id, section, event_id), build)
+
+
+def clock_version(section):
+    """
+    Start of the current CLOCK_SLOT in nanoseconds for sections that read the
+    clock, 0 for the others. It is part of the event id, so statuses that
+    change with time are never served from a snapshot more than a slot old.
+    """
+    if section not in CLOCK_SECTIONS:
+        return 0
+    now = int(timezone.now().timestamp())
+    return (now - now % CLOCK_SLOT) * 1_000_000_000
+
+
+def resume_tracker(tracker, kind, board_id, section, last_event_id):
+    """
+    Prime a stream's delta tracker with the snapshot a reconnecting client
+    last saw, so it is only sent what it missed. Returns False when that
+    version is no longer buffered and the client needs a full snapshot.
+    """
+    try:
+        event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        return False
+    snapshot = snapshot_store.find(kind, board_id, section, event_id)
+    if snapshot is None:
+        return False
+    tracker.snapshot(snapshot.payload)
+    return True
@@ -0,0 +1,198 @@
+# sqlite_cache.py - Cache backend in a local SQLite file, shared by every worker process
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# How long a writer waits for another process's write lock before failing
+BUSY_TIMEOUT = 5
+# Entry count is checked against MAX_ENTRIES once every this many writes
+CULL_CHECK_INTERVAL = 50
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache shared between the processes of one host without running a cache
+    server. LOCATION is the path of the SQLite file; it is created on first use.
+
+    Meant for the small, hot keys of this app (monitor command queues,
+    heartbeats, section versions). The file runs in WAL mode so readers never
+    block the writer. ``add`` and ``incr`` are atomic across processes, which
+    the monitor command queue relies on for its sequence numbers. Integers are
+    stored as SQL integers; everything else is pickled.
+
+    Supports the usual TIMEOUT, MAX_ENTRIES and CULL_FREQUENCY settings.
+    Expired entries are removed when read and when the cache is culled;
+    culling never removes entries stored without a timeout.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+        self._writes = 0
+
+    # Connections -------------------------------------------------------------
+
+    def _connection(self):
+        # One connection per thread, reopened in forked worker processes
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _write(self):
+        """Immediate transaction: takes the write lock up front so read-modify-write is atomic"""
+        return _Transaction(self._connection())
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests
+        pass
+
+    # Encoding ----------------------------------------------------------------
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    # BaseCache API -----------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(keys))}) "
+            'AND (expires IS NULL OR expires > ?)',
+            (*keys, time.time()),
+        ).fetchall()
+        return {keys[key]: self._decode(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires)
+            for key, value in data.items()
+        ]
+        with self._write() as connection:
+            connection.executemany('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)', rows)
+            self._maybe_cull(connection, len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, time.time()))
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (key, self._encode(value), self.get_backend_timeout(timeout)),
+            ).rowcount == 1
+            if added:
+                self._maybe_cull(connection, 1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            connection.execute('UPDATE cache SET value = ? WHERE key = ?', (self._encode(value), key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            return connection.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        with self._write() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
+
+    # Eviction ----------------------------------------------------------------
+
+    def _maybe_cull(self, connection, writes):
+        self._writes += writes
+        if self._writes < CULL_CHECK_INTERVAL:
+            return
+        self._writes = 0
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # Same policy as Django's backends: drop 1/CULL_FREQUENCY of the
+            # entries (all of them when it is 0), those expiring soonest first.
+            # Entries stored without a timeout (the monitor queues' sequence
+            # and ack counters) are never culled
+            cull = count if self._cull_frequency == 0 else count // self._cull_frequency
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache WHERE expires IS NOT NULL ORDER BY expires LIMIT ?)',
+                (cull,),
+            )
+
+
+class _Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
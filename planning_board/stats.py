@@ -0,0 +1,58 @@
+# stats.py - Cached per-user dashboard statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import PlanningBoard, ProductionLine, ExcelUpload
+
+STATS_CACHE_TIMEOUT = 60 * 60
+
+
+def stats_version(user_id):
+    """Current version of a user's cached statistics; changes on every board/upload write"""
+    version = cache.get(f"board_stats_version_{user_id}")
+    if version is None:
+        version = time.time_ns()
+        cache.set(f"board_stats_version_{user_id}", version, None)
+    return version
+
+
+def invalidate_user_stats(user_id):
+    """Drop every cached statistic/count for the user by moving to a new version"""
+    cache.set(f"board_stats_version_{user_id}", time.time_ns(), None)
+
+
+def user_cache_key(user_id, *parts):
+    """Cache key that is invalidated together with the user's statistics"""
+    suffix = '_'.join(str(part) for part in parts)
+    return f"board_stats_{user_id}_{stats_version(user_id)}_{suffix}"
+
+
+def dashboard_stats(user, today):
+    """
+    Board counts for the dashboard in one conditional-aggregate query,
+    plus the distinct line and upload counts, cached until the next write.
+    """
+    key = user_cache_key(user.id, 'dashboard', today.isoformat())
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    stats = PlanningBoard.objects.filter(created_by=user).aggregate(
+        total_boards=Count('id'),
+        today_boards_count=Count('id', filter=Q(today_date=today)),
+        week_boards_count=Count('id', filter=Q(today_date__gte=week_start)),
+        month_boards_count=Count('id', filter=Q(today_date__gte=month_start)),
+    )
+    stats['total_production_lines'] = ProductionLine.objects.filter(
+        planning_board__created_by=user
+    ).values('line_number').distinct().count()
+    stats['total_uploads'] = ExcelUpload.objects.filter(uploaded_by=user).count()
+
+    cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
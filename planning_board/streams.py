@@ -0,0 +1,343 @@
+# streams.py - Registry of open live streams (SSE and WebSocket) and their metrics
+import asyncio
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the payload generation latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Messages a stream may have waiting for a slow client before they are
+# dropped and the client is resynced with a snapshot
+SEND_BUFFER = 8
+# A client that accepts nothing for this long while messages wait is dropped
+WRITE_TIMEOUT = 60
+# Streams are ended after this long (plus up to 10% jitter); EventSource and
+# the monitor socket reconnect on their own and resume where they were
+MAX_LIFETIME = 2 * 60 * 60
+
+
+class StreamStats:
+    """Counters of one open stream; board and section change when a socket switches"""
+
+    def __init__(self, stream_id, kind, endpoint, board_id=None, section=None, user_id=None):
+        self.id = stream_id
+        self.kind = kind
+        self.endpoint = endpoint
+        self.board_id = board_id
+        self.section = section
+        self.user_id = user_id
+        self.opened_at = time.time()
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.last_build_seconds = None
+        self.last_event_at = None
+        self.dropped = 0
+        self.resyncs = 0
+
+    def sent(self, message):
+        """Count an outgoing message; returns it so streams can ``yield stats.sent(...)``"""
+        self.events_sent += 1
+        self.bytes_sent += len(message.encode('utf-8')) if isinstance(message, str) else len(message)
+        self.last_event_at = time.time()
+        return message
+
+    def as_dict(self, now=None):
+        now = now or time.time()
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'endpoint': self.endpoint,
+            'board_id': self.board_id,
+            'section': self.section,
+            'user_id': self.user_id,
+            'open_seconds': round(now - self.opened_at, 1),
+            'events_sent': self.events_sent,
+            'bytes_sent': self.bytes_sent,
+            'builds': self.builds,
+            'builds_per_minute': round(self.builds * 60 / max(now - self.opened_at, 1), 2),
+            'avg_build_ms': round(self.build_seconds * 1000 / self.builds, 2) if self.builds else None,
+            'last_build_ms': round(self.last_build_seconds * 1000, 2) if self.last_build_seconds is not None else None,
+            'dropped': self.dropped,
+            'resyncs': self.resyncs,
+        }
+
+
+class StreamRegistry:
+    """
+    Tracks the streams open in this process. Totals survive the streams that
+    produced them, so rates can be derived by scraping the metrics endpoint.
+
+    Each worker process keeps its own registry; sum them when scraping several.
+    """
+
+    def __init__(self):
+        self._streams = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.opened_total = 0
+        self.events_total = {}
+        self.bytes_total = {}
+        self.latency = {}  # (endpoint, section) -> [bucket counts..., count, sum]
+        self.closed_total = {}  # reason -> count
+
+    def open(self, kind, endpoint, board_id=None, section=None, user_id=None):
+        with self._lock:
+            stats = StreamStats(next(self._ids), kind, endpoint, board_id, section, user_id)
+            self._streams[stats.id] = stats
+            self.opened_total += 1
+        return stats
+
+    def close(self, stats, reason='disconnect'):
+        """Forget a stream; ``reason`` is disconnect, finished, lifetime, stalled or error"""
+        with self._lock:
+            if self._streams.pop(stats.id, None) is None:
+                return
+            self.closed_total[reason] = self.closed_total.get(reason, 0) + 1
+            self.events_total[stats.endpoint] = self.events_total.get(stats.endpoint, 0) + stats.events_sent
+            self.bytes_total[stats.endpoint] = self.bytes_total.get(stats.endpoint, 0) + stats.bytes_sent
+
+    @contextmanager
+    def track(self, kind, endpoint, board_id=None, section=None, user_id=None):
+        """Register a stream for the duration of the block"""
+        stats = self.open(kind, endpoint, board_id, section, user_id)
+        try:
+            yield stats
+        finally:
+            self.close(stats)
+
+    @contextmanager
+    def timing(self, stats):
+        """Time one payload build of a stream: ``with stream_registry.timing(stats): ...``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_build(stats, time.perf_counter() - started)
+
+    def record_build(self, stats, seconds):
+        stats.builds += 1
+        stats.build_seconds += seconds
+        stats.last_build_seconds = seconds
+        with self._lock:
+            histogram = self.latency.setdefault(
+                (stats.endpoint, stats.section or ''), [0] * (len(LATENCY_BUCKETS) + 2)
+            )
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def streams(self):
+        with self._lock:
+            return list(self._streams.values())
+
+    def count(self, board_id=None, section=None, user_id=None):
+        """Open streams, optionally only those showing a board / section / user"""
+        return sum(
+            1 for stats in self.streams()
+            if (board_id is None or stats.board_id == board_id)
+            and (section is None or stats.section == section)
+            and (user_id is None or stats.user_id == user_id)
+        )
+
+    def snapshot(self):
+        """Everything the JSON metrics endpoint reports"""
+        now = time.time()
+        streams = self.streams()
+        by_board = {}
+        by_user = {}
+        for stats in streams:
+            board = by_board.setdefault(str(stats.board_id), {})
+            board[stats.section or ''] = board.get(stats.section or '', 0) + 1
+            by_user[str(stats.user_id)] = by_user.get(str(stats.user_id), 0) + 1
+
+        events_total = dict(self.events_total)
+        bytes_total = dict(self.bytes_total)
+        for stats in streams:
+            events_total[stats.endpoint] = events_total.get(stats.endpoint, 0) + stats.events_sent
+            bytes_total[stats.endpoint] = bytes_total.get(stats.endpoint, 0) + stats.bytes_sent
+
+        return {
+            'open_streams': len(streams),
+            'opened_total': self.opened_total,
+            'by_kind': _count_by(streams, 'kind'),
+            'by_endpoint': _count_by(streams, 'endpoint'),
+            'by_board': by_board,
+            'by_user': by_user,
+            'events_total': events_total,
+            'bytes_total': bytes_total,
+            'closed_total': dict(self.closed_total),
+            'streams': [stats.as_dict(now) for stats in streams],
+        }
+
+    def prometheus(self, extra=None):
+        """The metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP planning_streams_open Open live streams.',
+            '# TYPE planning_streams_open gauge',
+        ]
+        open_by_label = {}
+        for stats in self.streams():
+            key = (stats.kind, stats.endpoint, stats.board_id, stats.section or '')
+            open_by_label[key] = open_by_label.get(key, 0) + 1
+        for (kind, endpoint, board_id, section), value in sorted(open_by_label.items(), key=str):
+            lines.append(
+                f'planning_streams_open{{kind="{kind}",endpoint="{endpoint}",'
+                f'board="{board_id}",section="{_label(section)}"}} {value}'
+            )
+
+        lines += [
+            '# HELP planning_streams_opened_total Live streams opened since start.',
+            '# TYPE planning_streams_opened_total counter',
+            f'planning_streams_opened_total {snapshot["opened_total"]}',
+            '# HELP planning_stream_events_total Events sent on live streams.',
+            '# TYPE planning_stream_events_total counter',
+        ]
+        for endpoint, value in sorted(snapshot['events_total'].items()):
+            lines.append(f'planning_stream_events_total{{endpoint="{endpoint}"}} {value}')
+        lines += [
+            '# HELP planning_stream_bytes_total Bytes sent on live streams.',
+            '# TYPE planning_stream_bytes_total counter',
+        ]
+        for endpoint, value in sorted(snapshot['bytes_total'].items()):
+            lines.append(f'planning_stream_bytes_total{{endpoint="{endpoint}"}} {value}')
+
+        lines += [
+            '# HELP planning_streams_closed_total Live streams closed, by reason.',
+            '# TYPE planning_streams_closed_total counter',
+        ]
+        for reason, value in sorted(snapshot['closed_total'].items()):
+            lines.append(f'planning_streams_closed_total{{reason="{reason}"}} {value}')
+
+        lines += [
+            '# HELP planning_stream_build_seconds Time spent building stream payloads.',
+            '# TYPE planning_stream_build_seconds histogram',
+        ]
+        with self._lock:
+            latency = {key: list(histogram) for key, histogram in self.latency.items()}
+        for (endpoint, section), histogram in sorted(latency.items()):
+            labels = f'endpoint="{endpoint}",section="{_label(section)}"'
+            for bound, value in zip(LATENCY_BUCKETS, histogram):
+                lines.append(f'planning_stream_build_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'planning_stream_build_seconds_bucket{{{labels},le="+Inf"}} {histogram[-2]}')
+            lines.append(f'planning_stream_build_seconds_count{{{labels}}} {histogram[-2]}')
+            lines.append(f'planning_stream_build_seconds_sum{{{labels}}} {histogram[-1]:.6f}')
+
+        for name, (kind, help_text, value) in (extra or {}).items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+class StreamConnection:
+    """
+    One SSE client. The producer (the stream's data loop) hands messages to
+    ``send``, which never blocks; ``messages`` runs the producer as a task
+    and yields what it sent, at the pace the client accepts them.
+
+    - A client that falls SEND_BUFFER messages behind loses them and the
+      producer is told to start over with a snapshot (``resync``).
+    - A client that accepts nothing for WRITE_TIMEOUT while messages wait is
+      stalled: the producer is stopped, releasing its board subscription.
+    - After MAX_LIFETIME the stream ends; the client reconnects and resumes.
+
+    The buffer and the stall check see the server pulling messages, not the
+    socket accepting them. uvicorn holds the pull until the transport drains,
+    so both track the client there; daphne buffers writes without limit and
+    keeps pulling, so behind daphne a slow client is only cut off by
+    MAX_LIFETIME.
+    """
+
+    def __init__(self, endpoint, board_id=None, section=None, user_id=None,
+                 buffer_size=SEND_BUFFER, write_timeout=WRITE_TIMEOUT, lifetime=MAX_LIFETIME):
+        self.labels = (endpoint, board_id, section, user_id)
+        self.stats = None  # registered once the response starts
+        self.queue = asyncio.Queue(buffer_size)
+        self.write_timeout = write_timeout
+        self.lifetime = lifetime * random.uniform(1, 1.1) if lifetime else None
+        self.resync = False
+        self.closed = None
+        self.last_pull = time.monotonic()
+        self.producer = None
+
+    def send(self, message):
+        """Queue a message for the client; False when it was dropped"""
+        if self.closed:
+            return False
+        if self.resync:
+            # Nothing more until the producer restarts the client with a snapshot
+            self.stats.dropped += 1
+            return False
+        if not self.queue.empty() and time.monotonic() - self.last_pull > self.write_timeout:
+            self.close('stalled')
+            return False
+        if self.queue.full():
+            self.stats.dropped += self.queue.qsize() + 1
+            self.stats.resyncs += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resync = True
+            return False
+        self.queue.put_nowait(message)
+        return True
+
+    def close(self, reason):
+        """Stop the producer and unregister; the response ends once the client catches up"""
+        if self.closed is None:
+            self.closed = reason
+            if self.producer is not None:
+                self.producer.cancel()
+            stream_registry.close(self.stats, reason)
+
+    async def messages(self, produce):
+        """Run ``produce(connection)`` and yield its messages until it ends, stalls or expires"""
+        self.stats = stream_registry.open('sse', *self.labels)
+        self.producer = asyncio.create_task(produce(self))
+        deadline = time.monotonic() + self.lifetime if self.lifetime else None
+        pull = None
+        try:
+            while not self.closed:
+                timeout = deadline - time.monotonic() if deadline else None
+                if timeout is not None and timeout <= 0:
+                    self.close('lifetime')
+                    break
+                pull = asyncio.ensure_future(self.queue.get())
+                done, _ = await asyncio.wait(
+                    {pull, self.producer}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if pull in done:
+                    self.last_pull = time.monotonic()
+                    yield self.stats.sent(pull.result())
+                    continue
+                pull.cancel()
+                if self.producer.done():
+                    # Producer finished (e.g. the board was deleted): flush what it left
+                    while not self.queue.empty():
+                        yield self.stats.sent(self.queue.get_nowait())
+                    failed = not self.producer.cancelled() and self.producer.exception() is not None
+                    self.close('error' if failed else 'finished')
+        finally:
+            if pull is not None:
+                pull.cancel()
+            self.close('disconnect')
+
+
+def _count_by(streams, attribute):
+    counts = {}
+    for stats in streams:
+        value = getattr(stats, attribute)
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+stream_registry = StreamRegistry()
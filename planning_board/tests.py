@@ -1,3 +1,1480 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import multiprocessing
+import tempfile
+import time
+import traceback
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .broadcast import BoardHub
+from .consumers import board_group
+from .devices import register_device
+from .events import change_bus
+from .field_codecs import codec_for
+from .live import SectionDeltaTracker
+from .middleware import CompressionMiddleware
+from .models import (
+    AFMPlan, ActualSnapshot, CriticalPartStatus, DisplayDevice, LineShiftRollup, NextDayPlan,
+    OtherInformation, PlanQuantityRollup, PlanningBoard, ProductionLine, SPDPlan, TomorrowPlan,
+)
+from .monitor_queue import MAX_PENDING, _seq_key, ack_commands, enqueue_command, pending_commands
+from .pagination import decode_cursor, encode_cursor, paginate_boards
+from .routing import websocket_urlpatterns
+from .snapshots import SnapshotStore, snapshot_store
+from .sqlite_cache import SQLiteCache
+from .stats import dashboard_stats
+from .streams import StreamConnection, StreamRegistry
+from .versions import bump_section_version, section_versions
+from .views import (
+    board_section_snapshot, create_section_row, display_snapshot, get_enhanced_section_data,
+    get_numeric_value, resumed_tracker, stream_message,
+)
+
+
+def section_payload(rows, timestamp='2025-01-06T08:00:00', **extras):
+    return {
+        'section': 'critical_parts', 'board_id': 1, 'title': 'Critical Parts', 'headers': ['Part', 'Qty'],
+        'row_ids': [row_id for row_id, cells in rows], 'data': [cells for row_id, cells in rows],
+        'timestamp': timestamp, **extras,
+    }
+
+
+class SectionDeltaTrackerTests(SimpleTestCase):
+    """Streams send one snapshot, then only the rows and statistics that changed"""
+
+    def setUp(self):
+        self.tracker = SectionDeltaTracker()
+        rows = [(1, ['Bolt', 10]), (2, ['Nut', 20]), (3, ['Washer', 30])]
+        self.first = self.tracker.next_event(section_payload(rows, statistics={'total': 60}))
+
+    def test_first_event_is_a_full_snapshot_with_row_versions(self):
+        name, body = self.first
+        self.assertEqual(name, 'snapshot')
+        self.assertEqual(body['title'], 'Critical Parts')
+        self.assertEqual(body['row_ids'], [1, 2, 3])
+        self.assertEqual(len(body['row_versions']), 3)
+        self.assertEqual(len(set(body['row_versions'])), 3)
+
+    def test_unchanged_payload_sends_nothing(self):
+        rows = [(1, ['Bolt', 10]), (2, ['Nut', 20]), (3, ['Washer', 30])]
+        payload = section_payload(rows, timestamp='2025-01-06T08:01:00', statistics={'total': 60})
+        self.assertIsNone(self.tracker.next_event(payload))
+
+    def test_delta_carries_only_changed_rows(self):
+        rows = [(3, ['Washer', 30]), (1, ['Bolt', 15]), (4, ['Pin', 5])]
+        name, delta = self.tracker.next_event(
+            section_payload(rows, timestamp='2025-01-06T08:01:00', statistics={'total': 60})
+        )
+        self.assertEqual(name, 'delta')
+        self.assertEqual([(row['id'], row['cells']) for row in delta['updated']], [(1, ['Bolt', 15])])
+        self.assertEqual([(row['id'], row['cells']) for row in delta['inserted']], [(4, ['Pin', 5])])
+        self.assertEqual(delta['deleted'], [2])
+        self.assertEqual(delta['order'], [3, 1, 4])
+        self.assertEqual(delta['timestamp'], '2025-01-06T08:01:00')
+        self.assertNotIn('statistics', delta)
+        self.assertNotIn('title', delta)
+
+        # the next delta is computed against the rows just sent
+        self.assertIsNone(self.tracker.next_event(section_payload(rows, statistics={'total': 60})))
+
+    def test_changed_statistics_are_sent_without_rows(self):
+        rows = [(1, ['Bolt', 10]), (2, ['Nut', 20]), (3, ['Washer', 30])]
+        name, delta = self.tracker.next_event(section_payload(rows, statistics={'total': 61}))
+        self.assertEqual(delta, {'statistics': {'total': 61}, 'timestamp': '2025-01-06T08:00:00'})
+
+
+class CompressionTests(SimpleTestCase):
+    """Only JSON and SSE responses are compressed, and streamed events are never held back"""
+
+    def respond(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip_stream_flushes_every_event(self):
+        events = [b'event: snapshot\ndata: {}\n\n', b'event: heartbeat\ndata: {}\n\n']
+        response = self.respond(StreamingHttpResponse(iter(events), content_type='text/event-stream'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = iter(response.streaming_content)
+        for event in events:
+            self.assertEqual(decompressor.decompress(next(chunks)), event)
+        decompressor.decompress(b''.join(chunks))
+        self.assertTrue(decompressor.eof)
+
+    def test_only_json_and_event_streams_are_compressed(self):
+        response = self.respond(JsonResponse({'rows': ['value'] * 100}))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        response = self.respond(HttpResponse('<p>page</p>' * 100, content_type='text/html'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+def create_board(user, title='Board', lines=3):
+    board = PlanningBoard.objects.create(
+        title=title, created_by=user,
+        today_date=date(2025, 1, 6), tomorrow_date=date(2025, 1, 7), next_day_date=date(2025, 1, 8),
+    )
+    for i in range(lines):
+        ProductionLine.objects.create(planning_board=board, line_number=f'Line {i}')
+        TomorrowPlan.objects.create(planning_board=board, model=f'Model {i}')
+        NextDayPlan.objects.create(planning_board=board, model=f'Model {i}')
+        CriticalPartStatus.objects.create(planning_board=board, part_name=f'Part {i}', supplier='Supplier',
+                                          plan_qty=10)
+        AFMPlan.objects.create(planning_board=board, part_name=f'AFM {i}', plan_qty=10)
+        SPDPlan.objects.create(planning_board=board, part_name=f'SPD {i}', plan_qty=10)
+        OtherInformation.objects.create(planning_board=board, part_name=f'Info {i}', qty=1,
+                                        target_date=date(2025, 1, 6))
+    return board
+
+
+class KeysetPaginationTests(TestCase):
+    """Board listings page newest first on (created_at, id), ties included"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lister', password='secret')
+        start = datetime(2025, 1, 6, 8)
+        # the third and fourth boards share a creation time
+        for i, minutes in enumerate((0, 10, 20, 20, 30)):
+            board = create_board(cls.user, title=f'Board {i}', lines=0)
+            PlanningBoard.objects.filter(pk=board.pk).update(created_at=start + timedelta(minutes=minutes))
+        cls.boards = PlanningBoard.objects.filter(created_by=cls.user)
+
+    def titles(self, page):
+        return [board.title for board in page]
+
+    def test_walk_forward_and_back(self):
+        first = paginate_boards(self.boards, None, 2)
+        self.assertEqual(self.titles(first), ['Board 4', 'Board 3'])
+        self.assertFalse(first.has_previous)
+
+        second = paginate_boards(self.boards, first.next_cursor, 2)
+        self.assertEqual(self.titles(second), ['Board 2', 'Board 1'])
+        self.assertTrue(second.has_previous)
+
+        last = paginate_boards(self.boards, second.next_cursor, 2)
+        self.assertEqual(self.titles(last), ['Board 0'])
+        self.assertFalse(last.has_next)
+
+        back = paginate_boards(self.boards, last.prev_cursor, 2)
+        self.assertEqual(self.titles(back), ['Board 2', 'Board 1'])
+        back = paginate_boards(self.boards, back.prev_cursor, 2)
+        self.assertEqual(self.titles(back), ['Board 4', 'Board 3'])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_exact_last_page_has_no_next_cursor(self):
+        page = paginate_boards(self.boards, None, 5)
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_invalid_cursor_falls_back_to_the_first_page(self):
+        for cursor in ('not-a-cursor', 'eHwxfDI', encode_cursor(self.boards.first(), 'n')[:-3]):
+            self.assertEqual(self.titles(paginate_boards(self.boards, cursor, 2)), ['Board 4', 'Board 3'])
+        board = self.boards.get(title='Board 2')
+        self.assertEqual(decode_cursor(encode_cursor(board, 'p')), ('p', board.created_at, board.pk))
+
+    def test_api_returns_cursors(self):
+        self.client.force_login(self.user)
+        url = reverse('planning_board:api_boards')
+        data = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual([board['title'] for board in data['boards']], ['Board 4', 'Board 3', 'Board 2'])
+        self.assertIsNone(data['prev_cursor'])
+
+        data = self.client.get(url, {'limit': 3, 'cursor': data['next_cursor']}).json()
+        self.assertEqual([board['title'] for board in data['boards']], ['Board 1', 'Board 0'])
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['total_count'], 5)
+
+
+class DashboardStatsTests(TestCase):
+    """Dashboard counts are cached per user until one of their boards, lines or uploads changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('manager', password='secret')
+        cls.today = date(2025, 1, 8)
+        create_board(cls.user, title='This week', lines=2)
+        older = create_board(cls.user, title='Last month', lines=1)
+        PlanningBoard.objects.filter(pk=older.pk).update(today_date=date(2024, 12, 30))
+        create_board(User.objects.create_user('someone', password='secret'), lines=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_are_cached_until_a_board_changes(self):
+        stats = dashboard_stats(self.user, self.today)
+        self.assertEqual(stats, {
+            'total_boards': 2, 'today_boards_count': 0, 'week_boards_count': 1, 'month_boards_count': 1,
+            'total_production_lines': 2, 'total_uploads': 0,
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard_stats(self.user, self.today), stats)
+
+        board = create_board(self.user, title='Today', lines=0)
+        board.today_date = self.today
+        board.save()
+        stats = dashboard_stats(self.user, self.today)
+        self.assertEqual((stats['total_boards'], stats['today_boards_count']), (3, 1))
+
+        ProductionLine.objects.create(planning_board=board, line_number='Line 9')
+        self.assertEqual(dashboard_stats(self.user, self.today)['total_production_lines'], 3)
+
+        board.delete()
+        stats = dashboard_stats(self.user, self.today)
+        self.assertEqual((stats['total_boards'], stats['total_production_lines']), (2, 2))
+
+    def test_other_users_changes_keep_the_cache(self):
+        dashboard_stats(self.user, self.today)
+        create_board(User.objects.get(username='someone'), lines=1)
+        with self.assertNumQueries(0):
+            dashboard_stats(self.user, self.today)
+
+
+class InlineUpdateTests(TestCase):
+    """Inline edits are written in bulk and all-or-nothing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('editor', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def post(self, board, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('planning_board:inline_update', args=[board.pk]),
+                json.dumps(payload), content_type='application/json',
+            )
+
+    def mixed_payload(self, board, rows):
+        lines = list(board.production_lines.order_by('pk'))
+        parts = list(board.critical_parts.order_by('pk'))
+        return {
+            'production_line': {
+                **{str(line.pk): {'a_shift_plan': 1200, 'a_shift_actual': i} for i, line in enumerate(lines[:rows])},
+                **{f'new_{i}': {'line_number': f'New {i}', 'b_shift_plan': 50} for i in range(rows)},
+            },
+            'critical_part': {str(part.pk): {'plan_qty': 5} for part in parts[:rows]},
+            'delete': {'production_line': [line.pk for line in lines[rows:]]},
+        }
+
+    def test_mixed_update_create_delete_query_count_does_not_grow_with_rows(self):
+        query_counts = []
+        for rows in (2, 20):
+            board = create_board(self.user, lines=rows * 2)
+            payload = self.mixed_payload(board, rows)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(board, payload)
+            query_counts.append(len(queries))
+            self.assertEqual(response.status_code, 200, response.content)
+            created = response.json()['created_ids']['production_line']
+            self.assertEqual(len(created), rows)
+
+            lines = board.production_lines.order_by('pk')
+            self.assertEqual(lines.count(), rows * 2)
+            self.assertEqual(lines.filter(a_shift_plan=1200).count(), rows)
+            self.assertEqual(set(lines.filter(b_shift_plan=50).values_list('pk', flat=True)), set(created.values()))
+            self.assertEqual(board.critical_parts.filter(plan_qty=5).count(), rows)
+        small, large = query_counts
+        self.assertEqual(small, large)
+
+    def test_failed_write_rolls_back_the_whole_batch(self):
+        board = create_board(self.user, lines=3)
+        line, other, deleted = board.production_lines.order_by('pk')
+        part = board.critical_parts.first()
+        response = self.post(board, {
+            'production_line': {str(line.pk): {'a_shift_plan': 10}, 'new_1': {'line_number': 'New'}},
+            # plan_qty is required
+            'critical_part': {str(part.pk): {'plan_qty': ''}},
+            'delete': {'production_line': [deleted.pk]},
+        })
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(board.production_lines.count(), 3)
+        self.assertEqual(board.production_lines.filter(a_shift_plan=10).count(), 0)
+        part.refresh_from_db()
+        self.assertEqual(part.plan_qty, 10)
+
+
+class FieldCodecTests(TestCase):
+    """Inline edits and spreadsheet rows are parsed by the model's field types"""
+
+    def assertInvalid(self, model, field, value, code):
+        with self.assertRaises(ValidationError) as raised:
+            codec_for(model).parse(field, value)
+        self.assertEqual(raised.exception.code, code)
+
+    def test_choices_accept_the_stored_value_or_the_label(self):
+        codec = codec_for(AFMPlan)
+        self.assertEqual(codec.parse('plan_type', 'fcin'), 'FCIN')
+        self.assertEqual(codec.parse('plan_type', 'I/U'), 'IU')
+        self.assertEqual(codec.parse('plan_type', ' fcin (mns) '), 'FCIN')
+        self.assertInvalid(AFMPlan, 'plan_type', 'OTHER', 'invalid_choice')
+
+    def test_integers(self):
+        codec = codec_for(ProductionLine)
+        self.assertEqual(codec.parse('a_shift_plan', '1,200'), 1200)
+        self.assertEqual(codec.parse('a_shift_plan', ' 40 '), 40)
+        self.assertEqual(codec.parse('a_shift_plan', '12.0'), 12)
+        self.assertEqual(codec.parse('a_shift_plan', 1.15 * 100), 115)
+        self.assertInvalid(ProductionLine, 'a_shift_plan', '12.5', 'invalid')
+        self.assertInvalid(ProductionLine, 'a_shift_plan', 12.5, 'invalid')
+        self.assertInvalid(ProductionLine, 'a_shift_plan', float('inf'), 'invalid')
+        self.assertInvalid(ProductionLine, 'a_shift_plan', 'ten', 'invalid')
+        self.assertInvalid(ProductionLine, 'a_shift_plan', True, 'invalid')
+
+    def test_empty_values(self):
+        for empty in ('-', '', '  ', None):
+            # nullable number, blank text, then a required number
+            self.assertIsNone(codec_for(ProductionLine).parse('a_shift_plan', empty))
+            self.assertEqual(codec_for(ProductionLine).parse('a_shift_remarks', empty), '')
+            self.assertInvalid(CriticalPartStatus, 'plan_qty', empty, 'required')
+
+    def test_max_length(self):
+        codec = codec_for(AFMPlan)
+        self.assertEqual(codec.parse('part_number', ' ' + 'x' * 50 + ' '), 'x' * 50)
+        self.assertInvalid(AFMPlan, 'part_number', 'x' * 51, 'max_length')
+
+    def test_row_errors_are_collected_per_field(self):
+        with self.assertRaises(ValidationError) as raised:
+            codec_for(AFMPlan).parse_row({'plan_type': 'OTHER', 'plan_qty': '1.5', 'unknown': 1}, partial=False)
+        self.assertEqual(sorted(raised.exception.message_dict), ['part_name', 'plan_qty', 'plan_type'])
+
+    def test_spreadsheet_float_quantities_are_imported(self):
+        user = User.objects.create_user('importer', password='secret')
+        board = create_board(user, lines=0)
+        worksheet = Workbook().active
+        worksheet.cell(row=1, column=1, value=1.15 * 100)
+        plan_qty = get_numeric_value(worksheet, 1, 1)
+
+        row = create_section_row(AFMPlan, board, plan_type='FCIN', part_name='Bracket', plan_qty=plan_qty)
+        self.assertIsNotNone(row)
+        row.refresh_from_db()
+        self.assertEqual(row.plan_qty, 115)
+
+    def test_inline_edit_reports_every_invalid_field(self):
+        user = User.objects.create_user('typist', password='secret')
+        board = create_board(user, lines=2)
+        line, other = board.production_lines.order_by('pk')
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('planning_board:inline_update', args=[board.pk]),
+            json.dumps({'production_line': {
+                str(line.pk): {'a_shift_plan': '1,200'},
+                str(other.pk): {'a_shift_plan': '12.5', 'line_number': 'x' * 200},
+            }}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            sorted(response.json()['errors']),
+            [f'production_line.{other.pk}.a_shift_plan', f'production_line.{other.pk}.line_number'],
+        )
+        self.assertFalse(board.production_lines.filter(a_shift_plan=1200).exists())
+
+
+class EditSectionTests(TestCase):
+    """One section of the edit page is loaded, validated and saved on its own"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author', password='secret')
+        cls.board = create_board(cls.user, lines=2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('planning_board:edit_section', args=[self.board.pk, 'critical'])
+
+    def critical_form_data(self, plan_qty):
+        kept, removed = self.board.critical_parts.order_by('pk')
+        return {
+            'critical-TOTAL_FORMS': '3', 'critical-INITIAL_FORMS': '2',
+            'critical-MIN_NUM_FORMS': '0', 'critical-MAX_NUM_FORMS': '1000',
+            'critical-0-id': kept.pk, 'critical-0-part_name': 'Part 0', 'critical-0-supplier': 'Supplier',
+            'critical-0-plan_qty': plan_qty,
+            'critical-1-id': removed.pk, 'critical-1-part_name': 'Part 1', 'critical-1-supplier': 'Supplier',
+            'critical-1-plan_qty': '10', 'critical-1-DELETE': 'on',
+            'critical-2-part_name': 'Part 2', 'critical-2-supplier': 'New Supplier', 'critical-2-plan_qty': '7',
+        }
+
+    def test_get_renders_only_the_section(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Part 1')
+        self.assertContains(response, 'name="critical-TOTAL_FORMS"')
+        self.assertNotContains(response, 'Line 0')
+
+    def test_ajax_post_saves_the_section(self):
+        response = self.client.post(self.url, self.critical_form_data('99'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(
+            list(self.board.critical_parts.order_by('part_name').values_list('part_name', 'plan_qty')),
+            [('Part 0', 99), ('Part 2', 7)],
+        )
+        # the other sections are neither validated nor touched
+        self.assertEqual(self.board.production_lines.count(), 2)
+
+    def test_invalid_ajax_post_saves_nothing(self):
+        response = self.client.post(self.url, self.critical_form_data('many'), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
+        self.assertIn('critical-0-plan_qty', response.json()['html'])
+        self.assertEqual(CriticalPartStatus.objects.filter(planning_board=self.board).count(), 2)
+        self.assertFalse(self.board.critical_parts.filter(plan_qty=99).exists())
+
+    def test_plain_post_redirects_to_the_section(self):
+        response = self.client.post(self.url, self.critical_form_data('99'))
+        self.assertRedirects(
+            response, reverse('planning_board:edit', args=[self.board.pk]) + '?section=critical',
+            fetch_redirect_response=False,
+        )
+
+    def test_unknown_section_is_not_found(self):
+        url = reverse('planning_board:edit_section', args=[self.board.pk, 'unknown'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class BoardPageQueryTests(TestCase):
+    """The detail and list pages must not issue a query per row or per section"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_detail_query_count_does_not_grow_with_rows(self):
+        # session + user + board (with creator) + one prefetch per section
+        small = create_board(self.user, lines=1)
+        large = create_board(self.user, lines=25)
+        for board in (small, large):
+            with self.assertNumQueries(10):
+                response = self.client.get(reverse('planning_board:detail', args=[board.pk]))
+            self.assertEqual(response.status_code, 200)
+
+    def test_list_query_count_does_not_grow_with_boards(self):
+        for i in range(3):
+            create_board(self.user, title=f'Board {i}', lines=2)
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('planning_board:list'))
+        self.assertContains(response, 'Board 2')
+
+        for i in range(3, 20):
+            create_board(self.user, title=f'Board {i}', lines=2)
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('planning_board:list'))
+        self.assertContains(response, 'Board 19')
+
+
+class SectionFragmentCacheTests(TestCase):
+    """Detail-page sections are rendered from the fragment cache until their section changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_detail_reuses_cached_sections_until_a_section_changes(self):
+        board = create_board(self.user, lines=5)
+        url = reverse('planning_board:detail', args=[board.pk])
+        self.client.get(url)
+
+        # session + user + board: every section comes from the fragment cache
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, 'Model 4')
+
+        line = board.production_lines.first()
+        line.line_number = 'Renamed Line'
+        with self.captureOnCommitCallbacks(execute=True):
+            line.save()
+        # the changed section and the metrics are rendered again
+        response = self.client.get(url)
+        self.assertContains(response, 'Renamed Line')
+
+
+class StreamAccessTests(TestCase):
+    """The SSE streams are only opened for the board's owner"""
+
+    STREAMS = ('api_live_stream', 'fullscreen_stream', 'monitor_data_stream')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', password='secret')
+        cls.board = create_board(cls.user, lines=1)
+
+    def test_anonymous_users_are_sent_to_log_in(self):
+        for name in self.STREAMS:
+            url = reverse(f'planning_board:{name}', args=[self.board.pk, 'today_assembly'])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302, name)
+            self.assertIn('login', response['Location'])
+
+    def test_other_users_boards_are_not_found(self):
+        self.client.force_login(User.objects.create_user('stranger', password='secret'))
+        for name in self.STREAMS:
+            url = reverse(f'planning_board:{name}', args=[self.board.pk, 'today_assembly'])
+            self.assertEqual(self.client.get(url).status_code, 404, name)
+
+
+class BoardHubTests(TestCase):
+    """One poller per watched board, however many streams subscribe to it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('broadcaster', password='secret')
+        cls.board = create_board(cls.user, lines=1)
+        cls.other = create_board(cls.user, title='Other', lines=1)
+
+    def setUp(self):
+        cache.clear()
+        self.hub = BoardHub(poll_interval=0.01)
+        self.polls = []
+        state = self.hub._state
+
+        async def counted_state(board_id):
+            self.polls.append(board_id)
+            return await state(board_id)
+        self.hub._state = counted_state
+
+    def drain(self, *subscriptions):
+        for subscription in subscriptions:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+
+    async def test_changes_fan_out_from_one_poller_per_board(self):
+        screens = [self.hub.subscribe(self.board.pk) for _ in range(3)]
+        other = self.hub.subscribe(self.other.pk)
+        self.assertEqual(set(self.hub._watchers), {self.board.pk, self.other.pk})
+        self.assertEqual(self.hub.subscriber_count(self.board.pk), 3)
+
+        await asyncio.sleep(0.1)
+        self.drain(*screens, other)
+        bump_section_version(self.board.pk, 'critical_parts')
+        for screen in screens:
+            change = await screen.get(timeout=1)
+            self.assertEqual(change['sections'], ['critical_parts'])
+            self.assertFalse(change['deleted'])
+        self.assertIsNone(await other.get(timeout=0.05))
+
+        # three subscribers cost the same polls as the other board's one
+        self.assertLessEqual(abs(self.polls.count(self.board.pk) - self.polls.count(self.other.pk)), 1)
+
+        for subscription in screens + [other]:
+            self.hub.unsubscribe(subscription)
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.hub._watchers, {})
+
+    async def test_deleted_board_is_published_and_stops_its_poller(self):
+        board = await sync_to_async(create_board)(self.user, title='Short-lived', lines=0)
+        async with self.hub.subscribe(board.pk) as changes:
+            await asyncio.sleep(0.05)
+            self.drain(changes)
+            await board.adelete()
+            change = await changes.get(timeout=1)
+            self.assertTrue(change['deleted'])
+            await asyncio.sleep(0.05)
+            self.assertNotIn(board.pk, self.hub._watchers)
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+
+class BoardSocketTests(TestCase):
+    """The board socket sends a snapshot, then deltas when the board's group is told it changed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('wall', password='secret')
+        cls.board = create_board(cls.user, lines=2)
+
+    def setUp(self):
+        cache.clear()
+
+    async def connect(self, user, board_id=None):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/board/{board_id or self.board.pk}/critical_parts/',
+        )
+        communicator.scope['user'] = user
+        connected, code = await communicator.connect()
+        return communicator, connected, code
+
+    def save_and_commit(self, row):
+        with self.captureOnCommitCallbacks(execute=True):
+            row.save()
+
+    async def test_anonymous_socket_is_closed(self):
+        communicator, connected, code = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_snapshot_then_delta_on_board_change(self):
+        communicator, connected, code = await self.connect(self.user)
+        self.assertTrue(connected)
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['type'], message['section']), ('snapshot', 'critical_parts'))
+        parts = [part async for part in self.board.critical_parts.order_by('pk')]
+        self.assertEqual(message['data']['row_ids'], [part.pk for part in parts])
+
+        parts[0].part_name = 'Changed Part'
+        await sync_to_async(self.save_and_commit)(parts[0])
+        await get_channel_layer().group_send(board_group(self.board.pk), {
+            'type': 'board.changed', 'board_id': self.board.pk,
+        })
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'delta')
+        self.assertEqual([row['id'] for row in message['data']['updated']], [parts[0].pk])
+
+        await communicator.send_json_to({'action': 'refresh'})
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'snapshot')
+        await communicator.disconnect()
+
+    async def test_other_users_board_is_not_sent(self):
+        stranger = await User.objects.acreate_user('stranger', password='secret')
+        communicator, connected, code = await self.connect(stranger)
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'error', 'error': 'Board not found'})
+        await communicator.disconnect()
+
+
+class MonitorSocketTests(TestCase):
+    """A monitor socket shows the section it is told to watch and receives controller commands"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('controller', password='secret')
+        cls.board = create_board(cls.user, lines=2)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_watch_and_control(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/monitor/?device=hall-a&name=Hall A')
+        communicator.scope['user'] = self.user
+        connected, code = await communicator.connect()
+        self.assertTrue(connected)
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['type'], message['device']['key'], message['device']['name']),
+                         ('device', 'hall-a', 'Hall A'))
+        device_id = message['device']['id']
+
+        await communicator.send_json_to({'action': 'watch', 'board_id': self.board.pk, 'section': 'critical_parts'})
+        message = await communicator.receive_json_from()
+        self.assertEqual((message['type'], message['section']), ('snapshot', 'critical_parts'))
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse('planning_board:monitor_control_api'),
+            json.dumps({'action': 'show_message', 'message': 'Shift change', 'target': {'device': device_id}}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'control')
+        self.assertEqual((message['command']['action'], message['command']['message']), ('show_message', 'Shift change'))
+        await communicator.disconnect()
+
+        # an unacknowledged command is replayed when the screen reconnects
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/monitor/?device=hall-a')
+        communicator.scope['user'] = self.user
+        await communicator.connect()
+        self.assertEqual((await communicator.receive_json_from())['type'], 'device')
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['command']['message'], 'Shift change')
+        await communicator.send_json_to({'action': 'ack', 'seq': message['command']['seq']})
+        await communicator.disconnect()
+
+
+class ChangeEventTests(TestCase):
+    """Row changes publish one event per section, and only once they commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('publisher', password='secret')
+        cls.board = create_board(cls.user, lines=3)
+
+    def setUp(self):
+        cache.clear()
+        self.events = []
+        change_bus.subscribe(self.events.append)
+        self.addCleanup(change_bus.unsubscribe, self.events.append)
+
+    def test_version_and_event_follow_the_commit(self):
+        versions = section_versions(self.board.pk)
+        part = self.board.critical_parts.first()
+        part.plan_qty = 99
+        with self.captureOnCommitCallbacks(execute=True):
+            part.save()
+            self.assertEqual(section_versions(self.board.pk), versions)
+            self.assertEqual(self.events, [])
+
+        changed = section_versions(self.board.pk)
+        self.assertNotEqual(changed['critical_parts'], versions['critical_parts'])
+        self.assertEqual(changed['production_lines'], versions['production_lines'])
+        self.assertEqual([(event['section'], event['row_ids']) for event in self.events],
+                         [('critical_parts', [part.pk])])
+
+    def test_inline_edit_publishes_one_event_per_section(self):
+        self.client.force_login(self.user)
+        lines = list(self.board.production_lines.order_by('pk'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('planning_board:inline_update', args=[self.board.pk]),
+                json.dumps({'production_line': {str(line.pk): {'a_shift_plan': 10} for line in lines}}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        section_events = [event for event in self.events if event['section']]
+        self.assertEqual(len(section_events), 1)
+        self.assertEqual(section_events[0]['section'], 'production_lines')
+        self.assertEqual(sorted(section_events[0]['row_ids']), [line.pk for line in lines])
+
+
+class MonitorQueueTests(SimpleTestCase):
+    """Commands are numbered in order and redelivered until the monitor acknowledges them"""
+
+    def setUp(self):
+        cache.clear()
+
+    def seqs(self, after=0):
+        return [command['seq'] for command in pending_commands('screen', after)]
+
+    def test_commands_are_redelivered_until_acknowledged(self):
+        for i in range(3):
+            command = enqueue_command('screen', {'action': 'show_message', 'message': f'message {i}'})
+        self.assertEqual(command['seq'], 3)
+        self.assertEqual([c['message'] for c in pending_commands('screen')], ['message 0', 'message 1', 'message 2'])
+        self.assertEqual(self.seqs(after=1), [2, 3])
+        # nothing was acknowledged, so a reconnecting monitor gets everything again
+        self.assertEqual(self.seqs(), [1, 2, 3])
+
+        self.assertEqual(ack_commands('screen', 2), 2)
+        self.assertEqual(self.seqs(), [3])
+        # acks never move backwards
+        self.assertEqual(ack_commands('screen', 1), 2)
+        self.assertEqual(self.seqs(), [3])
+        ack_commands('screen', 3)
+        self.assertEqual(self.seqs(), [])
+        self.assertEqual(pending_commands('other'), [])
+
+    def test_long_absent_monitor_only_gets_the_newest_commands(self):
+        for i in range(MAX_PENDING + 5):
+            enqueue_command('screen', {'action': 'refresh'})
+        self.assertEqual(self.seqs(), list(range(6, MAX_PENDING + 6)))
+
+    def test_lost_counter_restarts_with_a_fresh_ack(self):
+        for i in range(3):
+            enqueue_command('screen', {'action': 'refresh'})
+        ack_commands('screen', 3)
+        # the counter was evicted while the ack survived
+        cache.delete(_seq_key('screen'))
+        self.assertEqual(enqueue_command('screen', {'action': 'refresh'})['seq'], 1)
+        self.assertEqual(self.seqs(), [1])
+
+
+class MonitorStatusQueryTests(TestCase):
+    """The controller's screen list must not issue queries per screen"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('operator', password='secret')
+        cls.boards = [create_board(cls.user, title=f'Board {i}', lines=i + 1) for i in range(2)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_screens(self, count):
+        for i in range(count):
+            device = register_device(self.user, f'screen-{DisplayDevice.objects.count()}')
+            board = self.boards[i % 2]
+            DisplayDevice.objects.filter(pk=device.pk).update(
+                board=board, section='today_assembly' if i % 2 else 'critical_parts',
+            )
+            enqueue_command(device.queue_key, {'action': 'refresh'})
+
+    def test_status_query_count_does_not_grow_with_screens(self):
+        url = reverse('planning_board:monitor_status_api')
+        # session + user + screens (with boards) + one row count per shown relation
+        self.add_screens(2)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['devices']), 2)
+
+        self.add_screens(10)
+        with self.assertNumQueries(5):
+            devices = self.client.get(url).json()['devices']
+        self.assertEqual(len(devices), 12)
+        rows = {(device['board_id'], device['current_section']): device['data_rows'] for device in devices}
+        self.assertEqual(rows, {
+            (self.boards[0].pk, 'Critical Parts'): 1,
+            (self.boards[1].pk, 'Today Assembly'): 2,
+        })
+        self.assertEqual({device['pending_commands'] for device in devices}, {1})
+
+
+class StreamMetricsTests(TestCase):
+    """Open streams are reported to staff and to scrapers holding the metrics token"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='secret', is_staff=True)
+        cls.user = User.objects.create_user('viewer', password='secret')
+
+    def setUp(self):
+        self.url = reverse('planning_board:stream_metrics')
+        registry = StreamRegistry()
+        patcher = mock.patch('planning_board.views.stream_registry', registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stats = registry.open('sse', 'fullscreen', board_id=7, section='critical_parts', user_id=1)
+        stats.sent('event: snapshot\ndata: {}\n\n')
+        registry.record_build(stats, 0.02)
+        registry.close(registry.open('ws', 'ws_board'))
+
+    def test_only_staff_and_the_token_holder_get_metrics(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        with override_settings(STREAM_METRICS_TOKEN='scrape-me'):
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+
+        self.client.force_login(self.staff)
+        data = self.client.get(self.url).json()
+        self.assertEqual((data['open_streams'], data['opened_total']), (1, 2))
+        self.assertEqual(data['by_board'], {'7': {'critical_parts': 1}})
+        [stream] = data['streams']
+        self.assertEqual((stream['endpoint'], stream['events_sent'], stream['builds']), ('fullscreen', 1, 1))
+
+    def test_prometheus_text(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'format': 'prometheus'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE planning_streams_open gauge', lines)
+        self.assertIn('planning_streams_open{kind="sse",endpoint="fullscreen",board="7",section="critical_parts"} 1',
+                      lines)
+        self.assertIn('# TYPE planning_board_hub_polls_total counter', lines)
+        self.assertIn(
+            'planning_stream_build_seconds_bucket{endpoint="fullscreen",section="critical_parts",le="0.025"} 1', lines,
+        )
+        # every sample line is "name{labels} value"
+        for line in lines:
+            if line and not line.startswith('#'):
+                float(line.rsplit(' ', 1)[1])
+
+
+class SharedSnapshotTests(TestCase):
+    """Section payloads are built once per data version, and again as the clock moves on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('display', password='secret')
+        cls.board = create_board(cls.user, lines=1)
+        cls.receiving_time = (timezone.now() + timedelta(hours=1)).replace(second=0, microsecond=0)
+        CriticalPartStatus.objects.filter(planning_board=cls.board).update(receiving_time=cls.receiving_time)
+
+    def setUp(self):
+        cache.clear()
+        snapshot_store.clear()
+
+    def at(self, minutes):
+        """Pretend it is ``minutes`` after the part's receiving time"""
+        return mock.patch('django.utils.timezone.now', return_value=self.receiving_time + timedelta(minutes=minutes))
+
+    def test_screens_share_one_build_per_version(self):
+        builds = snapshot_store.builds
+        with self.at(-60):
+            first = display_snapshot(self.board.pk, 'tomorrow_assembly', self.user)
+            self.assertIs(display_snapshot(self.board.pk, 'tomorrow_assembly', self.user), first)
+        # a section that does not read the clock is reused however much time passes
+        with self.at(120):
+            self.assertIs(display_snapshot(self.board.pk, 'tomorrow_assembly', self.user), first)
+        self.assertEqual(snapshot_store.builds, builds + 1)
+
+    def test_receiving_status_follows_the_clock_without_an_edit(self):
+        with self.at(-1):
+            display = display_snapshot(self.board.pk, 'critical_parts', self.user)
+            section = board_section_snapshot(self.board.pk, 'critical_parts', self.user)
+        self.assertEqual(display.payload['data'][0][3], 'Due Soon')
+        self.assertEqual(section.payload['data'][0][4], 'Scheduled')
+
+        with self.at(1):
+            display = display_snapshot(self.board.pk, 'critical_parts', self.user)
+            section = board_section_snapshot(self.board.pk, 'critical_parts', self.user)
+        self.assertEqual(display.payload['data'][0][3], 'Received')
+        self.assertEqual(section.payload['data'][0][4], 'Received')
+        self.assertEqual(display.payload['statistics']['received'], 1)
+
+
+class StreamResumeTests(TestCase):
+    """A reconnecting stream only gets what it missed while its last version is buffered"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('screen', password='secret')
+        cls.board = create_board(cls.user, lines=3)
+
+    def setUp(self):
+        cache.clear()
+        snapshot_store.clear()
+
+    def snapshot(self):
+        return board_section_snapshot(self.board.pk, 'critical_parts', self.user)
+
+    def resumed(self, last_event_id):
+        request = RequestFactory().get('/', HTTP_LAST_EVENT_ID=last_event_id)
+        return async_to_sync(resumed_tracker)(request, 'section', self.board.pk, 'critical_parts')
+
+    def test_resume_from_a_buffered_version_sends_the_missed_rows(self):
+        seen = self.snapshot()
+        part = self.board.critical_parts.order_by('pk').first()
+        part.part_name = 'Changed Part'
+        with self.captureOnCommitCallbacks(execute=True):
+            part.save()
+        current = self.snapshot()
+        self.assertGreater(current.event_id, seen.event_id)
+
+        message = stream_message(self.resumed(str(seen.event_id)), current, compact=False)
+        self.assertTrue(message.startswith(f'id: {current.event_id}\nevent: delta\n'))
+        delta = json.loads(message.split('data: ', 1)[1])
+        self.assertEqual([row['id'] for row in delta['updated']], [part.pk])
+        self.assertNotIn('inserted', delta)
+        self.assertNotIn('deleted', delta)
+
+    def test_resume_from_an_unknown_version_sends_a_full_snapshot(self):
+        current = self.snapshot()
+        message = stream_message(self.resumed(str(current.event_id - 1)), current, compact=False)
+        self.assertEqual(message, current.sse_snapshot())
+        self.assertTrue(message.startswith(f'id: {current.event_id}\nevent: snapshot\n'))
+
+    def test_replay_buffer_is_bounded_by_the_snapshot_lru(self):
+        store = SnapshotStore(size=2)
+        for i in range(3):
+            store.get(('section', 1, f'section_{i}', i), lambda: {'data': [], 'row_ids': []})
+        self.assertEqual(list(store._history), [('section', 1, 'section_1'), ('section', 1, 'section_2')])
+        cache.clear()
+        self.assertIsNone(store.find('section', 1, 'section_0', 0))
+        self.assertIsNotNone(store.find('section', 1, 'section_2', 2))
+
+
+class StreamConnectionTests(SimpleTestCase):
+    """SSE send buffers, stall detection and stream lifetimes"""
+
+    def setUp(self):
+        self.registry = StreamRegistry()
+        patcher = mock.patch('planning_board.streams.stream_registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_client_behind_the_buffer_is_resynced_with_a_snapshot(self):
+        async def produce(connection):
+            for n in range(4):
+                connection.send(f'delta {n}')
+            self.assertTrue(connection.resync)
+            connection.resync = False
+            connection.send('snapshot')
+
+        connection = StreamConnection('fullscreen', buffer_size=2, lifetime=None)
+        received = [message async for message in connection.messages(produce)]
+        self.assertEqual(received, ['snapshot'])
+        self.assertEqual((connection.stats.dropped, connection.stats.resyncs), (4, 1))
+        self.assertEqual(connection.closed, 'finished')
+
+    async def test_client_that_stops_pulling_is_dropped(self):
+        async def produce(connection):
+            n = 0
+            while True:
+                connection.send(f'delta {n}')
+                n += 1
+                await asyncio.sleep(0.01)
+
+        connection = StreamConnection('fullscreen', buffer_size=100, write_timeout=0.05, lifetime=None)
+        stream = connection.messages(produce)
+        self.assertEqual(await anext(stream), 'delta 0')
+        await asyncio.sleep(0.2)
+        self.assertEqual(connection.closed, 'stalled')
+        self.assertTrue(connection.producer.done())
+        await stream.aclose()
+        self.assertEqual(self.registry.closed_total, {'stalled': 1})
+        self.assertEqual(self.registry.count(), 0)
+
+    async def test_stream_ends_after_its_lifetime(self):
+        async def produce(connection):
+            connection.send('snapshot')
+            await asyncio.Event().wait()
+
+        connection = StreamConnection('fullscreen', lifetime=0.05)
+        received = [message async for message in connection.messages(produce)]
+        self.assertEqual(received, ['snapshot'])
+        self.assertEqual(connection.closed, 'lifetime')
+        await asyncio.sleep(0)
+        self.assertTrue(connection.producer.cancelled())
+        self.assertEqual(self.registry.closed_total, {'lifetime': 1})
+
+
+def run_in_workers(*jobs):
+    """
+    Run each ``(function, *args)`` in its own forked process, all at once, and
+    return their results in order. Workers share this process's test database
+    as of the fork, and the cache through its file.
+    """
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+
+    def work(index, function, *args):
+        try:
+            results.put((index, True, function(*args)))
+        except BaseException:
+            results.put((index, False, traceback.format_exc()))
+
+    workers = [context.Process(target=work, args=(i, *job)) for i, job in enumerate(jobs)]
+    for worker in workers:
+        worker.start()
+    collected = dict((index, (ok, value)) for index, ok, value in (results.get(timeout=60) for _ in workers))
+    for worker in workers:
+        worker.join()
+
+    values = []
+    for index in range(len(jobs)):
+        ok, value = collected[index]
+        if not ok:
+            raise AssertionError(f'worker {index} failed:\n{value}')
+        values.append(value)
+    return values
+
+
+def send_commands(user, device_id, count, prefix='message'):
+    client = Client()
+    client.force_login(user)
+    seqs = []
+    for i in range(count):
+        response = client.post(
+            reverse('planning_board:monitor_control_api'),
+            json.dumps({'action': 'show_message', 'message': f'{prefix} {i}', 'target': {'device': device_id}}),
+            content_type='application/json',
+        )
+        seqs.append(response.json()['devices'][str(device_id)])
+    return seqs
+
+
+def poll_and_ack(user, device_key):
+    client = Client()
+    client.force_login(user)
+    url = reverse('planning_board:monitor_control_api')
+    commands = client.get(url, {'device': device_key}).json()['commands']
+    if commands:
+        client.post(
+            reverse('planning_board:monitor_control_ack'),
+            json.dumps({'device': device_key, 'seq': commands[-1]['seq']}),
+            content_type='application/json',
+        )
+    remaining = client.get(url, {'device': device_key}).json()['commands']
+    return [command['message'] for command in commands], remaining
+
+
+class MonitorMultiProcessTests(TestCase):
+    """Controllers and screens served by different worker processes share the command queues"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('controller', password='secret')
+        cls.device = register_device(cls.user, 'hall-a')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': 'planning_board.sqlite_cache.SQLiteCache',
+            'LOCATION': Path(directory.name) / 'cache.sqlite3',
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_screen_polling_another_worker_gets_commands_in_order(self):
+        [seqs] = run_in_workers((send_commands, self.user, self.device.pk, 3))
+        self.assertEqual(seqs, [1, 2, 3])
+
+        [(messages, remaining)] = run_in_workers((poll_and_ack, self.user, self.device.key))
+        self.assertEqual(messages, ['message 0', 'message 1', 'message 2'])
+        self.assertEqual(remaining, [])
+
+    def test_concurrent_controllers_never_share_a_sequence_number(self):
+        results = run_in_workers(*[
+            (send_commands, self.user, self.device.pk, 10, f'worker {i}') for i in range(4)
+        ])
+        seqs = sorted(seq for worker_seqs in results for seq in worker_seqs)
+        self.assertEqual(seqs, list(range(1, 41)))
+
+        # every command from every worker is queued, each under its own number
+        commands = pending_commands(self.device.queue_key)
+        self.assertEqual([command['seq'] for command in commands], seqs)
+        self.assertEqual(len({command['message'] for command in commands}), 40)
+
+
+class SQLiteCacheTests(TestCase):
+    """Entries of the file cache expire after their timeout"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(Path(directory.name) / 'cache.sqlite3', {})
+
+    def test_added_key_expires_and_can_be_added_again(self):
+        self.assertTrue(self.cache.add('lock', 1, 0.2))
+        self.assertFalse(self.cache.add('lock', 2, 0.2))
+        self.assertEqual(self.cache.get('lock'), 1)
+
+        time.sleep(0.3)
+        self.assertIsNone(self.cache.get('lock'))
+        self.assertFalse(self.cache.has_key('lock'))
+        self.assertTrue(self.cache.add('lock', 3, 60))
+        self.assertEqual(self.cache.get('lock'), 3)
+
+    def test_set_and_touch_use_the_timeout_from_now(self):
+        self.cache.set('heartbeat', 'alive', 0.2)
+        self.cache.set('forever', 'kept', None)
+        self.assertTrue(self.cache.touch('heartbeat', 60))
+        time.sleep(0.3)
+        self.assertEqual(self.cache.get_many(['heartbeat', 'forever']), {'heartbeat': 'alive', 'forever': 'kept'})
+
+    def test_culling_keeps_entries_without_a_timeout(self):
+        cache = SQLiteCache(self.cache.path, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 0}})
+        cache.set('queue-seq', 7, None)
+        for i in range(60):
+            cache.set(f'snapshot {i}', i, 60)
+        self.assertEqual(cache.get('queue-seq'), 7)
+        self.assertLess(len(cache.get_many([f'snapshot {i}' for i in range(60)])), 60)
+
+    def test_tests_run_against_a_temporary_cache_file(self):
+        self.assertNotEqual(Path(settings.CACHES['default']['LOCATION']), settings.BASE_DIR / 'cache.sqlite3')
+
+
+class FullscreenStatisticsTests(TestCase):
+    """Fullscreen section statistics, computed by the database (aggregates.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', password='secret')
+        cls.board = board = create_board(cls.user, lines=0)
+        ProductionLine.objects.create(planning_board=board, line_number='L1', a_shift_plan=100, a_shift_actual=100,
+                                      b_shift_plan=200, b_shift_actual=180)
+        # Actual without a plan: efficiency shows as 0%
+        ProductionLine.objects.create(planning_board=board, line_number='L2', a_shift_actual=50)
+        ProductionLine.objects.create(planning_board=board, line_number='L3', a_shift_plan=100, a_shift_actual=100,
+                                      b_shift_plan=100, b_shift_actual=100, c_shift_plan=100, c_shift_actual=96)
+
+        now = timezone.now()
+        for name, receiving_time in (('Received', now - timedelta(hours=1)), ('Soon', now + timedelta(hours=1)),
+                                     ('Later', now + timedelta(hours=5)), ('Unknown', None)):
+            CriticalPartStatus.objects.create(planning_board=board, part_name=name, supplier='Supplier', plan_qty=1,
+                                              receiving_time=receiving_time)
+
+        TomorrowPlan.objects.create(planning_board=board, model='M1', a_shift=300, b_shift=300)
+        TomorrowPlan.objects.create(planning_board=board, model='M2', a_shift=100)
+        for plan_type, plan_qty in (('FCIN', 10), ('IU', 5), ('FCIN', 0)):
+            AFMPlan.objects.create(planning_board=board, plan_type=plan_type, part_name='AFM', plan_qty=plan_qty)
+        for customer, plan_qty in (('MSIL', 10), ('MSIL', 20), ('HMSI', 5)):
+            SPDPlan.objects.create(planning_board=board, customer=customer, part_name='SPD', plan_qty=plan_qty)
+        today = timezone.now().date()
+        for days in (1, 10):
+            OtherInformation.objects.create(planning_board=board, part_name='Info', qty=1,
+                                            target_date=today + timedelta(days=days))
+
+    def section(self, section, board=None):
+        return get_enhanced_section_data((board or self.board).pk, section, self.user)
+
+    def test_today_assembly(self):
+        data = self.section('today_assembly')
+        statistics = data['statistics']
+        shifts = statistics.pop('shifts')
+        self.assertEqual(statistics, {
+            'total_lines': 3, 'total_plan': 600, 'total_actual': 626, 'overall_efficiency': 104.3,
+            'lines_on_target': 1, 'lines_behind': 2, 'lines_ahead': 0,
+        })
+        self.assertEqual([(shift['shift'], shift['plan'], shift['actual']) for shift in shifts],
+                         [('A', 200, 250), ('B', 300, 280), ('C', 100, 96)])
+        self.assertEqual([row[4] for row in data['data']], ['100.0%', '0%', '100.0%'])
+        self.assertEqual([row[-1] for row in data['data']], ['Critical', 'Critical', 'On Target'])
+
+    def test_other_sections(self):
+        self.assertEqual(self.section('critical_parts')['statistics'], {
+            'total_parts': 4, 'received': 1, 'pending': 2, 'delayed': 1,
+            'high_risk': 1, 'medium_risk': 1, 'low_risk': 2,
+        })
+        tomorrow = self.section('tomorrow_assembly')
+        self.assertEqual(tomorrow['statistics'], {
+            'total_models': 2, 'total_planned': 700, 'a_shift_total': 400, 'b_shift_total': 300, 'c_shift_total': 0,
+        })
+        self.assertEqual([row[-1] for row in tomorrow['data']], ['High', 'Low'])
+        self.assertEqual(self.section('afm_plans')['statistics'], {
+            'total_plans': 3, 'fcin_count': 2, 'iu_count': 1, 'total_quantity': 15,
+        })
+        self.assertEqual(self.section('spd_plans')['statistics'], {
+            'total_plans': 3, 'customer_breakdown': {'HMSI': 1, 'MSIL': 2}, 'total_quantity': 35,
+        })
+        self.assertEqual(self.section('other_info')['statistics'], {'total_items': 2, 'due_soon': 1})
+
+    def test_empty_sections_have_zero_statistics(self):
+        board = create_board(self.user, title='Empty', lines=0)
+        self.assertEqual(self.section('next_day_assembly')['statistics'], {
+            'total_models': 0, 'total_planned': 0, 'a_shift_total': 0, 'b_shift_total': 0, 'c_shift_total': 0,
+        })
+        self.assertEqual(self.section('today_assembly', board)['statistics'], {
+            'total_lines': 0, 'total_plan': 0, 'total_actual': 0, 'overall_efficiency': 0,
+            'lines_on_target': 0, 'lines_behind': 0, 'lines_ahead': 0, 'shifts': [],
+        })
+        self.assertEqual(self.section('critical_parts', board)['statistics'], {
+            'total_parts': 0, 'received': 0, 'pending': 0, 'delayed': 0,
+            'high_risk': 0, 'medium_risk': 0, 'low_risk': 0,
+        })
+        self.assertEqual(self.section('spd_plans', board)['statistics'], {
+            'total_plans': 0, 'customer_breakdown': {}, 'total_quantity': 0,
+        })
+
+
+class KpiApiTests(TestCase):
+    """Plan-vs-actual KPIs over the user's boards"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='secret')
+        cls.board = create_board(cls.user, lines=0)
+        ProductionLine.objects.create(planning_board=cls.board, line_number='L1',
+                                      a_shift_model='X', a_shift_plan=100, a_shift_actual=90, a_shift_plan_change=10,
+                                      b_shift_model='X', b_shift_plan=100, b_shift_actual=120)
+        ProductionLine.objects.create(planning_board=cls.board, line_number='L2',
+                                      a_shift_model='Y', a_shift_plan=50, a_shift_actual=50)
+        # Another user's board on the same day is never counted
+        other = create_board(User.objects.create_user('other', password='secret'), lines=0)
+        ProductionLine.objects.create(planning_board=other, line_number='L1', a_shift_plan=999, a_shift_actual=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def kpis(self, **params):
+        response = self.client.get(reverse('planning_board:kpi_api'),
+                                   {'start': '2025-01-01', 'end': '2025-01-31', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_kpis_by_line(self):
+        data = self.kpis()
+        self.assertEqual(data['kpis'], [
+            {'line': 'L1', 'planned_shifts': 2, 'plan': 200, 'actual': 210, 'variance': 10, 'efficiency': 105.0,
+             'attainment': 50.0, 'plan_changes': 10, 'plan_change_rate': 50.0},
+            {'line': 'L2', 'planned_shifts': 1, 'plan': 50, 'actual': 50, 'variance': 0, 'efficiency': 100.0,
+             'attainment': 100.0, 'plan_changes': 0, 'plan_change_rate': 0.0},
+        ])
+        self.assertEqual(data['totals'], {
+            'planned_shifts': 3, 'plan': 250, 'actual': 260, 'variance': 10, 'efficiency': 104.0,
+            'attainment': 66.7, 'plan_changes': 10, 'plan_change_rate': 33.3,
+        })
+
+    def test_kpis_by_several_dimensions(self):
+        data = self.kpis(by='day,shift,model', board=str(self.board.pk))
+        self.assertEqual(
+            [(row['day'], row['shift'], row['model'], row['plan'], row['actual']) for row in data['kpis']],
+            [('2025-01-06', 'A', 'X', 100, 90), ('2025-01-06', 'A', 'Y', 50, 50), ('2025-01-06', 'B', 'X', 100, 120)],
+        )
+        self.assertEqual(self.kpis(start='2025-02-01', end='2025-02-28')['kpis'], [])
+        response = self.client.get(reverse('planning_board:kpi_api'), {'by': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RollupTests(TestCase):
+    """The daily rollups follow board edits and match a full rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('historian', password='secret')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def rollups(self):
+        lines = LineShiftRollup.objects.order_by('planning_board', 'line_number', 'shift', 'model').values_list(
+            'planning_board', 'day', 'line_number', 'shift', 'model', 'plan', 'actual', 'plan_change',
+            'planned_shifts', 'met_shifts', 'changed_shifts',
+        )
+        quantities = PlanQuantityRollup.objects.order_by('planning_board', 'kind', 'category').values_list(
+            'planning_board', 'day', 'kind', 'category', 'plans', 'quantity',
+        )
+        return list(lines), list(quantities)
+
+    def test_rollups_after_an_edit_match_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            board = create_board(self.user, lines=2)
+        line = board.production_lines.order_by('pk').first()
+        spd = board.spd_plans.order_by('pk').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('planning_board:inline_update', args=[board.pk]),
+                json.dumps({
+                    'production_line': {str(line.pk): {'a_shift_model': 'X', 'a_shift_plan': 100, 'a_shift_actual': 110}},
+                    'spd_plan': {str(spd.pk): {'customer': 'HMSI', 'plan_qty': 25}},
+                }),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        lines, quantities = self.rollups()
+        self.assertEqual(lines, [(board.pk, date(2025, 1, 6), 'Line 0', 'A', 'X', 100, 110, 0, 1, 1, 0)])
+        self.assertIn((board.pk, date(2025, 1, 6), PlanQuantityRollup.SPD, 'HMSI', 1, 25), quantities)
+
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollups(), (lines, quantities))
+
+    def test_moving_the_board_date_moves_its_rollups(self):
+        board = create_board(self.user, lines=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductionLine.objects.create(planning_board=board, line_number='L1', a_shift_plan=10)
+        board.today_date = date(2025, 2, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            board.save()
+        self.assertEqual(set(LineShiftRollup.objects.values_list('day', flat=True)), {date(2025, 2, 3)})
+
+
+class TrendApiTests(TestCase):
+    """Trend series from the rollups, summed into multi-day buckets over long ranges"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='secret')
+        for day, shift, line, plan, actual in (
+            (date(2025, 1, 1), 'A', 'L1', 100, 90),
+            (date(2025, 1, 3), 'A', 'L1', 100, 110),
+            (date(2025, 1, 3), 'B', 'L2', 50, 50),
+            (date(2025, 1, 4), 'A', 'L1', 100, 100),
+            (date(2025, 1, 30), 'C', 'L1', 80, 40),
+        ):
+            board = create_board(cls.user, lines=0)
+            LineShiftRollup.objects.create(planning_board=board, day=day, shift=shift, line_number=line,
+                                           model='X', plan=plan, actual=actual)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def trend(self, **params):
+        response = self.client.get(reverse('planning_board:trend_api'),
+                                   {'start': '2025-01-01', 'end': '2025-01-30', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_daily_points_within_max_points(self):
+        data = self.trend(series='total')
+        self.assertEqual(data['bucket_days'], 1)
+        [total] = data['series']
+        self.assertEqual(total['dates'], ['2025-01-01', '2025-01-03', '2025-01-04', '2025-01-30'])
+        self.assertEqual(total['plan'], [100, 150, 100, 80])
+        self.assertEqual(total['efficiency'], [90.0, 106.7, 100.0, 50.0])
+
+    def test_long_ranges_are_summed_into_buckets_dated_by_their_first_day(self):
+        # 30 days in at most 10 points: 3-day buckets from the start date
+        data = self.trend(series='line', max_points=10)
+        self.assertEqual(data['bucket_days'], 3)
+        l1, l2 = data['series']
+        self.assertEqual(l1['name'], 'L1')
+        self.assertEqual(l1['dates'], ['2025-01-01', '2025-01-04', '2025-01-28'])
+        self.assertEqual(l1['plan'], [200, 100, 80])
+        self.assertEqual(l1['actual'], [200, 100, 40])
+        self.assertEqual((l2['dates'], l2['plan']), (['2025-01-01'], [50]))
+
+    def test_shift_interval_uses_a_third_of_the_points_per_bucket(self):
+        data = self.trend(series='total', interval='shift', max_points=10)
+        self.assertEqual(data['bucket_days'], 10)
+        [total] = data['series']
+        self.assertEqual(list(zip(total['dates'], total['shifts'], total['plan'])), [
+            ('2025-01-01', 'A', 300), ('2025-01-01', 'B', 50), ('2025-01-21', 'C', 80),
+        ])
+
+
+class ActualHistoryTests(TestCase):
+    """Every change of a shift actual is recorded once, and read back as progress curves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('supervisor', password='secret')
+        cls.board = create_board(cls.user, lines=0)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def history(self, line):
+        return list(ActualSnapshot.objects.filter(production_line=line).order_by('pk').values_list('shift', 'actual'))
+
+    def test_snapshot_per_actual_change_only(self):
+        line = ProductionLine.objects.create(planning_board=self.board, line_number='L1', a_shift_plan=100)
+        self.assertEqual(self.history(line), [])
+
+        line.a_shift_actual = 10
+        line.save()
+        line.a_shift_remarks = 'checked'
+        line.save()
+        self.assertEqual(self.history(line), [('A', 10)])
+
+        line = ProductionLine.objects.get(pk=line.pk)
+        line.line_number = 'Line 1'
+        line.save()
+        line.a_shift_actual, line.b_shift_actual = 10, 5
+        line.save()
+        self.assertEqual(self.history(line), [('A', 10), ('B', 5)])
+
+        url = reverse('planning_board:inline_update', args=[self.board.pk])
+        for updates in ({'a_shift_actual': 20}, {'a_shift_plan': 120}, {'a_shift_actual': '20'}):
+            response = self.client.post(url, json.dumps({'production_line': {str(line.pk): updates}}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.history(line), [('A', 10), ('B', 5), ('A', 20)])
+
+    def test_progress_api(self):
+        line = ProductionLine.objects.create(planning_board=self.board, line_number='L1', a_shift_plan=100,
+                                             a_shift_actual=50)
+        ActualSnapshot.objects.filter(production_line=line).delete()
+        for minute, actual in ((5, 10), (40, 30), (65, 50)):
+            ActualSnapshot.objects.create(production_line=line, shift='A', actual=actual,
+                                          recorded_at=datetime(2025, 1, 6, 8) + timedelta(minutes=minute))
+
+        response = self.client.get(reverse('planning_board:api_board_progress', args=[self.board.pk]))
+        self.assertEqual(response.status_code, 200)
+        [progress] = response.json()['lines']
+        self.assertEqual(progress['points'], [['2025-01-06T08:00:00', 30], ['2025-01-06T09:00:00', 50]])
+        self.assertEqual((progress['plan'], progress['actual'], progress['run_rate']), (100, 50, 40.0))
+
+        response = self.client.get(reverse('planning_board:api_board_progress', args=[self.board.pk]),
+                                   {'interval': 30, 'since': '2025-01-06T08:30'})
+        [progress] = response.json()['lines']
+        self.assertEqual(progress['points'], [['2025-01-06T08:30:00', 30], ['2025-01-06T09:00:00', 50]])
+        self.assertEqual(progress['run_rate'], 48.0)
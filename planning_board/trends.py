@@ -0,0 +1,71 @@
+# trends.py - Plan-vs-actual time series read from the daily rollups
+import math
+from datetime import timedelta
+
+from django.db.models import Sum
+
+from .models import LineShiftRollup
+
+# Series are split by line, by model or not at all (rollup field per choice)
+SERIES_FIELDS = {'total': None, 'line': 'line_number', 'model': 'model'}
+INTERVALS = ('day', 'shift')
+# Points per series before longer ranges are downsampled into multi-day buckets
+MAX_POINTS = 120
+
+
+def plan_actual_trend(user, start, end, lines=(), models=(), series='line', interval='day',
+                      max_points=MAX_POINTS):
+    """
+    Plan, actual and efficiency per day (or per day and shift) between
+    ``start`` and ``end`` over the user's boards, optionally limited to some
+    lines or models. Days without data are left out.
+
+    The sums come from LineShiftRollup (rollups.py), grouped in SQL. When the
+    range holds more than ``max_points`` points per series, consecutive days
+    are summed into buckets of ``bucket_days`` days dated by their first day.
+    """
+    rollups = LineShiftRollup.objects.filter(planning_board__created_by=user, day__range=(start, end))
+    if lines:
+        rollups = rollups.filter(line_number__in=lines)
+    if models:
+        rollups = rollups.filter(model__in=models)
+
+    series_field = SERIES_FIELDS[series]
+    by_shift = interval == 'shift'
+    fields = ['day'] + (['shift'] if by_shift else []) + ([series_field] if series_field else [])
+    rows = rollups.values(*fields).annotate(plan=Sum('plan'), actual=Sum('actual')).order_by(*fields)
+
+    buckets = max(1, max_points // 3 if by_shift else max_points)
+    bucket_days = max(1, math.ceil(((end - start).days + 1) / buckets))
+
+    points = {}
+    for row in rows:
+        name = row[series_field] if series_field else 'Total'
+        bucket = start + timedelta(days=(row['day'] - start).days // bucket_days * bucket_days)
+        point = points.setdefault(name, {}).setdefault((bucket, row.get('shift')), [0, 0])
+        point[0] += row['plan']
+        point[1] += row['actual']
+
+    result = []
+    for name in sorted(points):
+        keys = sorted(points[name])
+        plan = [points[name][key][0] for key in keys]
+        actual = [points[name][key][1] for key in keys]
+        entry = {'name': name, 'dates': [day.isoformat() for day, _ in keys]}
+        if by_shift:
+            entry['shifts'] = [shift for _, shift in keys]
+        entry.update({
+            'plan': plan,
+            'actual': actual,
+            'efficiency': [round(a / p * 100, 1) if p else 0 for p, a in zip(plan, actual)],
+        })
+        result.append(entry)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'interval': interval,
+        'series_by': series,
+        'bucket_days': bucket_days,
+        'series': result,
+    }
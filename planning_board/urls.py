@@ -13,6 +13,7 @@ urlpatterns = [
     path('boards/create/', views.planning_board_create, name='create'),
     path('boards/<int:pk>/', views.planning_board_detail, name='detail'),
     path('boards/<int:pk>/edit/', views.planning_board_edit, name='edit'),
+    path('boards/<int:pk>/edit/<str:section>/', views.planning_board_edit_section, name='edit_section'),
     path('boards/<int:pk>/delete/', views.planning_board_delete, name='delete'),
     
     # Excel operations
@@ -36,6 +37,7 @@ urlpatterns = [
     path('api/board/<int:board_id>/section/<str:section>/', views.get_section_data, name='api_section_data'),
     path('api/board/<int:board_id>/section/<str:section>/stream/', views.live_stream_section, name='api_live_stream'),
     path('api/board/<int:board_id>/trigger-update/', views.trigger_board_update, name='api_trigger_update'),
+    path('api/board/<int:board_id>/progress/', views.board_progress_api, name='api_board_progress'),
 
 
     # Fullscreen Display - NEW ADDITION
@@ -50,8 +52,13 @@ urlpatterns = [
     
     # Monitor API endpoints
     path('api/monitor/control/', views.monitor_control_api, name='monitor_control_api'),
+    path('api/monitor/control/ack/', views.monitor_control_ack, name='monitor_control_ack'),
     path('api/monitor/status/', views.monitor_status_api, name='monitor_status_api'),
+    path('api/monitor/devices/', views.monitor_devices_api, name='monitor_devices_api'),
     path('api/monitor/<int:board_id>/<str:section>/stream/', views.monitor_data_stream, name='monitor_data_stream'),
+    path('api/streams/metrics/', views.stream_metrics, name='stream_metrics'),
+    path('api/kpis/', views.kpi_api, name='kpi_api'),
+    path('api/trends/', views.trend_api, name='trend_api'),
 
 ]
 
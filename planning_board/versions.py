@@ -0,0 +1,79 @@
+# versions.py - Per-section data versions used to key cached board fragments
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from .models import (
+    ProductionLine, TomorrowPlan, NextDayPlan, CriticalPartStatus,
+    AFMPlan, SPDPlan, OtherInformation
+)
+
+# Section models -> the board relation (related_name) they are rendered under
+SECTION_MODELS = {
+    ProductionLine: 'production_lines',
+    TomorrowPlan: 'tomorrow_plans',
+    NextDayPlan: 'next_day_plans',
+    CriticalPartStatus: 'critical_parts',
+    AFMPlan: 'afm_plans',
+    SPDPlan: 'spd_plans',
+    OtherInformation: 'other_info',
+}
+SECTIONS = tuple(SECTION_MODELS.values())
+
+# Fragments are keyed on the version, so they only need to outlive a shift
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _version_key(board_id, section):
+    return f"board_section_version_{board_id}_{section}"
+
+
+def _merge_versions(keys, found):
+    """Versions for every section, plus fresh ones for sections not in the cache yet"""
+    versions = {}
+    missing = {}
+    for section, key in keys.items():
+        if key in found:
+            versions[section] = found[key]
+        else:
+            versions[section] = missing[key] = time.time_ns()
+    return versions, missing
+
+
+def section_versions(board_id):
+    """Current version of every section of a board, in one cache round trip"""
+    keys = {section: _version_key(board_id, section) for section in SECTIONS}
+    versions, missing = _merge_versions(keys, cache.get_many(keys.values()))
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+async def asection_versions(board_id):
+    """Async section_versions, for the stream hub"""
+    keys = {section: _version_key(board_id, section) for section in SECTIONS}
+    versions, missing = _merge_versions(keys, await cache.aget_many(keys.values()))
+    if missing:
+        await cache.aset_many(missing, None)
+    return versions
+
+
+def bump_section_version(board_id, section):
+    """Mark a section as changed; fragments cached under the old version stop matching"""
+    cache.set(_version_key(board_id, section), time.time_ns(), None)
+
+
+def section_fragment_key(board_id, section, version):
+    """Key used by ``{% cache %}`` for a section fragment in detail.html"""
+    return make_template_fragment_key('board_section', [board_id, section, version])
+
+
+def metrics_fragment_key(board_id, versions):
+    """Key used by ``{% cache %}`` for the summary metrics in detail.html"""
+    return make_template_fragment_key('board_metrics', [board_id, versions_tag(versions)])
+
+
+def versions_tag(versions):
+    """All section versions folded into one cache-key component"""
+    return '-'.join(str(versions[section]) for section in SECTIONS)
@@ -2,35 +2,98 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q, prefetch_related_objects
+from django.core.cache import cache
 
 from datetime import datetime, timedelta
 import openpyxl
 import io
 from .models import (
     PlanningBoard, ProductionLine, TomorrowPlan, NextDayPlan,
-    CriticalPartStatus, AFMPlan, SPDPlan, OtherInformation, ExcelUpload
+    CriticalPartStatus, AFMPlan, SPDPlan, OtherInformation, ExcelUpload,
+    DisplayDevice, ACTUAL_FIELDS
+)
+from .devices import (
+    arecord_heartbeat, aregister_device, is_online, record_heartbeat,
+    register_device, resolve_targets,
+)
+from .encoding import encode_compact, json_response, wants_compact
+from .field_codecs import codec_for
+from .pagination import cached_count, page_size_from, page_url, paginate_boards
+from .stats import dashboard_stats, user_cache_key
+from .broadcast import board_hub
+from .streams import StreamConnection, stream_registry
+from .snapshots import MERGED_SOURCES, resume_tracker, section_snapshot, snapshot_store
+from .events import batched_changes, section_changed
+from .monitor_queue import ack_commands, apending_commands, enqueue_command, pending_commands, pending_counts
+from .consumers import notify_board_changed, send_monitor_command
+from .live import SectionDeltaTracker, sse_event
+from . import aggregates
+from .actuals import PROGRESS_INTERVAL, record_actuals, shift_progress
+from .kpis import GROUPINGS as KPI_GROUPINGS, ShiftTable, load_shift_table
+from .trends import (
+    INTERVALS as TREND_INTERVALS, MAX_POINTS as TREND_MAX_POINTS, SERIES_FIELDS as TREND_SERIES,
+    plan_actual_trend,
+)
+from .versions import (
+    FRAGMENT_CACHE_TIMEOUT, SECTION_MODELS, SECTIONS, metrics_fragment_key,
+    section_fragment_key, section_versions, versions_tag,
 )
 from .forms import (
-    PlanningBoardForm, ExcelUploadForm, ProductionLineFormSet,
-    TomorrowPlanFormSet, NextDayPlanFormSet, CriticalPartStatusFormSet,
-    AFMPlanFormSet, SPDPlanFormSet, OtherInformationFormSet
+    PlanningBoardForm, ExcelUploadForm, ProductionLineFormSet, EDIT_SECTIONS
 )
 
 @login_required
 def planning_board_list(request):
-    """List all planning boards"""
-    boards = PlanningBoard.objects.filter(created_by=request.user).order_by('-created_at')
-    return render(request, 'planning_board/list.html', {'boards': boards})
+    """List planning boards one keyset page at a time"""
+    user_boards = PlanningBoard.objects.filter(created_by=request.user)
+    page = paginate_boards(
+        user_boards.annotate(production_line_count=Count('production_lines')),
+        request.GET.get('cursor'), page_size_from(request)
+    )
+    context = {
+        'boards': page.items,
+        'page': page,
+        'total_count': cached_count(user_boards, user_cache_key(request.user.id, 'board_count')),
+        'next_page_url': page_url(request, page.next_cursor) if page.has_next else None,
+        'prev_page_url': page_url(request, page.prev_cursor) if page.has_previous else None,
+    }
+    return render(request, 'planning_board/list.html', context)
+
+# Related sections rendered by detail.html; prefetched so the template never queries
+DETAIL_SECTIONS = SECTIONS
 
 @login_required
 def planning_board_detail(request, pk):
-    """View a specific planning board"""
-    board = get_object_or_404(PlanningBoard, pk=pk, created_by=request.user)
-    return render(request, 'planning_board/detail.html', {'board': board})
+    """View a specific planning board with every section loaded up front"""
+    board = get_object_or_404(PlanningBoard.objects.select_related('created_by'), pk=pk, created_by=request.user)
+    
+    # Sections are rendered inside {% cache %} fragments keyed on their version;
+    # only load the sections whose fragment has to be rendered again
+    versions = section_versions(board.pk)
+    fragment_keys = {
+        section: section_fragment_key(board.pk, section, versions[section]) for section in DETAIL_SECTIONS
+    }
+    metrics_key = metrics_fragment_key(board.pk, versions)
+    cached = cache.get_many(list(fragment_keys.values()) + [metrics_key])
+    to_load = [section for section, key in fragment_keys.items() if key not in cached]
+    if metrics_key not in cached:
+        to_load = DETAIL_SECTIONS
+    if to_load:
+        prefetch_related_objects([board], *to_load)
+    
+    return render(request, 'planning_board/detail.html', {
+        'board': board,
+        'versions': versions,
+        'versions_tag': versions_tag(versions),
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
+    })
 
 @login_required
 def planning_board_create(request):
@@ -54,62 +117,87 @@ def planning_board_create(request):
     
     return render(request, 'planning_board/create.html', {'form': form})
 
+def render_edit_page(request, board, form, open_section=None, open_formset=None):
+    """Edit page with every section collapsed except ``open_section``"""
+    context = {
+        'form': form,
+        'board': board,
+        'sections': [(key, title) for key, (title, formset_class) in EDIT_SECTIONS.items()],
+        'open_section': open_section,
+        'open_title': EDIT_SECTIONS[open_section][0] if open_section else None,
+        'open_formset': open_formset,
+    }
+    return render(request, 'planning_board/edit.html', context)
+
 @login_required
 def planning_board_edit(request, pk):
-    """Edit a planning board with all related data"""
+    """Edit a planning board's basic information; sections load and save on their own"""
     board = get_object_or_404(PlanningBoard, pk=pk, created_by=request.user)
     
     if request.method == 'POST':
         form = PlanningBoardForm(request.POST, instance=board)
-        production_formset = ProductionLineFormSet(request.POST, instance=board)
-        tomorrow_formset = TomorrowPlanFormSet(request.POST, instance=board)
-        next_day_formset = NextDayPlanFormSet(request.POST, instance=board)
-        critical_formset = CriticalPartStatusFormSet(request.POST, instance=board)
-        afm_formset = AFMPlanFormSet(request.POST, instance=board)
-        spd_formset = SPDPlanFormSet(request.POST, instance=board)
-        other_formset = OtherInformationFormSet(request.POST, instance=board)
-        
-        if (form.is_valid() and production_formset.is_valid() and 
-            tomorrow_formset.is_valid() and next_day_formset.is_valid() and
-            critical_formset.is_valid() and afm_formset.is_valid() and
-            spd_formset.is_valid() and other_formset.is_valid()):
-            
+        if form.is_valid():
             form.save()
-            production_formset.save()
-            tomorrow_formset.save()
-            next_day_formset.save()
-            critical_formset.save()
-            afm_formset.save()
-            spd_formset.save()
-            other_formset.save()
-            
             messages.success(request, 'Planning board updated successfully!')
             return redirect('planning_board:detail', pk=board.pk)
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
         form = PlanningBoardForm(instance=board)
-        production_formset = ProductionLineFormSet(instance=board)
-        tomorrow_formset = TomorrowPlanFormSet(instance=board)
-        next_day_formset = NextDayPlanFormSet(instance=board)
-        critical_formset = CriticalPartStatusFormSet(instance=board)
-        afm_formset = AFMPlanFormSet(instance=board)
-        spd_formset = SPDPlanFormSet(instance=board)
-        other_formset = OtherInformationFormSet(instance=board)
     
-    context = {
-        'form': form,
+    # Page mode: ?section=<key> renders that one section already open
+    open_section = request.GET.get('section')
+    open_formset = None
+    if open_section in EDIT_SECTIONS:
+        open_formset = EDIT_SECTIONS[open_section][1](instance=board, prefix=open_section)
+    else:
+        open_section = None
+    
+    return render_edit_page(request, board, form, open_section, open_formset)
+
+@login_required
+def planning_board_edit_section(request, pk, section):
+    """
+    Load (GET) or save (POST) a single section's formset. Only that section's
+    rows are queried, rendered and validated. AJAX posts get JSON back with
+    the re-rendered section; plain posts redirect to the page mode.
+    """
+    board = get_object_or_404(PlanningBoard, pk=pk, created_by=request.user)
+    if section not in EDIT_SECTIONS:
+        raise Http404(f"Unknown section: {section}")
+    title, formset_class = EDIT_SECTIONS[section]
+    is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    
+    saved = False
+    if request.method == 'POST':
+        formset = formset_class(request.POST, instance=board, prefix=section)
+        if formset.is_valid():
+            with transaction.atomic():
+                formset.save()
+                board.save(update_fields=['updated_at'])
+            saved = True
+            # Re-render from the database so new rows get their ids
+            formset = formset_class(instance=board, prefix=section)
+        
+        if not is_ajax:
+            if saved:
+                messages.success(request, f'{title} updated successfully!')
+                return redirect(f"{reverse('planning_board:edit', args=[board.pk])}?section={section}")
+            messages.error(request, 'Please correct the errors below.')
+            return render_edit_page(request, board, PlanningBoardForm(instance=board), section, formset)
+    else:
+        formset = formset_class(instance=board, prefix=section)
+    
+    html = render_to_string('planning_board/edit_section.html', {
         'board': board,
-        'production_formset': production_formset,
-        'tomorrow_formset': tomorrow_formset,
-        'next_day_formset': next_day_formset,
-        'critical_formset': critical_formset,
-        'afm_formset': afm_formset,
-        'spd_formset': spd_formset,
-        'other_formset': other_formset,
-    }
+        'section': section,
+        'title': title,
+        'formset': formset,
+    }, request=request)
     
-    return render(request, 'planning_board/edit.html', context)
+    if request.method == 'POST':
+        return JsonResponse({'success': saved, 'html': html}, status=200 if saved else 400)
+    return HttpResponse(html)
 
 @login_required
 def planning_board_delete(request, pk):
@@ -146,7 +234,9 @@ def excel_upload(request):
             
             # Process the Excel file
             try:
-                success = process_excel_file(upload.file.path, board)
+                # One change event per section instead of one per spreadsheet row
+                with batched_changes():
+                    success = process_excel_file(upload.file.path, board)
                 if success:
                     upload.processed = True
                     upload.save()
@@ -280,8 +370,8 @@ def extract_single_production_line(worksheet, board, config):
             create_production_line_entries(board, line_name, line_entries)
         else:
             # Create empty production line if no data found
-            ProductionLine.objects.create(
-                planning_board=board,
+            create_section_row(
+                ProductionLine, board,
                 line_number=line_name
             )
             
@@ -356,8 +446,8 @@ def create_production_line_entries(board, line_name, line_entries):
                 display_name = f"{line_name}" if entry_count == 1 else f"{line_name} - Entry {entry_count}"
                 
                 # Create the production line
-                production_line = ProductionLine.objects.create(
-                    planning_board=board,
+                production_line = create_section_row(
+                    ProductionLine, board,
                     line_number=display_name,
                     # A Shift
                     a_shift_model=entry_data['a_shift']['model'],
@@ -483,8 +573,8 @@ def extract_plan_with_config_fixed(worksheet, board, plan_type, config):
                 
                 # Create database entry if we have model name (quantity can be 0)
                 if plan_type == 'tomorrow':
-                    TomorrowPlan.objects.create(
-                        planning_board=board,
+                    create_section_row(
+                        TomorrowPlan, board,
                         model=model,
                         a_shift=a_shift or 0,
                         b_shift=b_shift or 0,
@@ -492,8 +582,8 @@ def extract_plan_with_config_fixed(worksheet, board, plan_type, config):
                         remarks=remarks or ''
                     )
                 else:  # next_day
-                    NextDayPlan.objects.create(
-                        planning_board=board,
+                    create_section_row(
+                        NextDayPlan, board,
                         model=model,
                         a_shift=a_shift or 0,
                         b_shift=b_shift or 0,
@@ -580,8 +670,8 @@ def extract_critical_parts_fixed(worksheet, board, start_row):
             
             # Only process real data rows
             if len(part_name.strip()) > 2:
-                CriticalPartStatus.objects.create(
-                    planning_board=board,
+                create_section_row(
+                    CriticalPartStatus, board,
                     part_name=part_name.strip(),
                     supplier=supplier.strip() if supplier else '',
                     plan_qty=plan_qty or 0,
@@ -627,8 +717,8 @@ def extract_afm_plans_fixed(worksheet, board, start_row, plan_type):
             
             # Only process real data
             if len(part_name.strip()) > 2:
-                AFMPlan.objects.create(
-                    planning_board=board,
+                create_section_row(
+                    AFMPlan, board,
                     plan_type=plan_type,
                     part_name=part_name.strip(),
                     part_number=part_number.strip() if part_number else '',
@@ -676,8 +766,8 @@ def extract_spd_plans_fixed(worksheet, board, start_row, customer):
             
             # Only process real data
             if len(part_name.strip()) > 2:
-                SPDPlan.objects.create(
-                    planning_board=board,
+                create_section_row(
+                    SPDPlan, board,
                     customer=customer,
                     part_name=part_name.strip(),
                     part_number=part_number.strip() if part_number else '',
@@ -715,8 +805,8 @@ def extract_other_information_fixed(worksheet, board, start_row):
                 # Use current date as default target date
                 target_date = timezone.now().date()
                 
-                OtherInformation.objects.create(
-                    planning_board=board,
+                create_section_row(
+                    OtherInformation, board,
                     part_name=part_name.strip(),
                     qty=qty or 0,
                     target_date=target_date,
@@ -741,6 +831,15 @@ def find_section_header(worksheet, keyword):
         print(f"Error finding section header for '{keyword}': {e}")
         return None
 
+def create_section_row(section_model, board, **values):
+    """Validate spreadsheet values with the model's field codec, then create the row"""
+    try:
+        values = codec_for(section_model).parse_row(values, partial=False)
+    except ValidationError as e:
+        print(f"Skipping invalid {section_model.__name__} row: {e.message_dict}")
+        return None
+    return section_model.objects.create(planning_board=board, **values)
+
 def get_cell_value(worksheet, row, col):
     """Get cell value as string, handling None values"""
     try:
@@ -969,42 +1068,27 @@ def planning_board_dashboard(request):
         logger.debug("No filters applied, redirecting to today's filter")
         return redirect(f"{request.path}?date_from={today}&date_to={today}&status=today")
     
-    # Order by most recent first and get the filtered results
-    filtered_boards = boards_query.order_by('-created_at')
+    # Most recent first, one keyset page at a time
+    filtered_page = paginate_boards(boards_query, request.GET.get('cursor'), page_size_from(request))
+    filtered_boards = filtered_page.items
+    if not filtered_page.has_next and not filtered_page.has_previous:
+        # The whole result fits on this page, no need to count separately
+        filtered_count = len(filtered_boards)
+    else:
+        filtered_count = cached_count(
+            boards_query,
+            user_cache_key(request.user.id, 'filtered_count', date_from, date_to, status_filter),
+        )
     
     # Get recent boards (last 5 regardless of filters for sidebar/stats)
     recent_boards = PlanningBoard.objects.filter(
         created_by=request.user
     ).order_by('-created_at')[:5]
     
-    # Calculate comprehensive statistics
-    user_boards = PlanningBoard.objects.filter(created_by=request.user)
-    
-    total_boards = user_boards.count()
-    
-    # Get total production lines for user's boards
-    total_production_lines = ProductionLine.objects.filter(
-        planning_board__created_by=request.user
-    ).values('line_number').distinct().count()
-    
-    # Today's boards count
-    today_boards_count = user_boards.filter(today_date=today).count()
-    
-    # This week's boards count
+    # Board, line and upload counts in one aggregate query, cached until the next write
+    stats = dashboard_stats(request.user, today)
     week_start = today - timedelta(days=today.weekday())
-    week_boards_count = user_boards.filter(today_date__gte=week_start).count()
-    
-    # This month's boards count
     month_start = today.replace(day=1)
-    month_boards_count = user_boards.filter(today_date__gte=month_start).count()
-    
-    # Get total uploads if ExcelUpload model exists
-    total_uploads = 0
-    try:
-        total_uploads = ExcelUpload.objects.filter(uploaded_by=request.user).count()
-    except:
-        # ExcelUpload model might not exist
-        pass
     
     # Validate date range
     date_range_valid = True
@@ -1022,13 +1106,15 @@ def planning_board_dashboard(request):
     context = {
         'filtered_boards': filtered_boards,
         'recent_boards': recent_boards,
-        'total_boards': total_boards,
-        'total_production_lines': total_production_lines,
-        'total_uploads': total_uploads,
-        'today_boards_count': today_boards_count,
-        'week_boards_count': week_boards_count,
-        'month_boards_count': month_boards_count,
-        'filtered_count': filtered_boards.count(),
+        'total_boards': stats['total_boards'],
+        'total_production_lines': stats['total_production_lines'],
+        'total_uploads': stats['total_uploads'],
+        'today_boards_count': stats['today_boards_count'],
+        'week_boards_count': stats['week_boards_count'],
+        'month_boards_count': stats['month_boards_count'],
+        'filtered_count': filtered_count,
+        'next_page_url': page_url(request, filtered_page.next_cursor) if filtered_page.has_next else None,
+        'prev_page_url': page_url(request, filtered_page.prev_cursor) if filtered_page.has_previous else None,
         
         # Filter values to maintain state
         'filter_date_from': date_from,
@@ -1041,20 +1127,9 @@ def planning_board_dashboard(request):
         'today_date': today.strftime('%Y-%m-%d'),
         'week_start_date': week_start.strftime('%Y-%m-%d'),
         'month_start_date': month_start.strftime('%Y-%m-%d'),
-        
-        # Debug info (remove in production)
-        'debug_info': {
-            'query_count': filtered_boards.count(),
-            'filters': {
-                'date_from': date_from,
-                'date_to': date_to,
-                'status': status_filter,
-            },
-            'sql_query': str(filtered_boards.query) if filtered_boards else None,
-        }
     }
     
-    logger.debug(f"Dashboard context prepared with {filtered_boards.count()} filtered boards")
+    logger.debug(f"Dashboard context prepared with {filtered_count} filtered boards")
     
     return render(request, 'planning_board/dashboard.html', context)
 
@@ -1069,6 +1144,8 @@ def planning_board_dashboard(request):
 
 # Add this to your views.py file
 import json
+from django.db import transaction
+from django.db.models.deletion import Collector
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -1089,462 +1166,155 @@ def inline_update_board(request, pk):
         data = json.loads(request.body)
         print(f"Received data: {data}")  # Debug logging
         
-        # Process board-level updates
-        if 'board' in data and 'main' in data['board']:
-            board_updates = data['board']['main']
-            for field, value in board_updates.items():
-                if hasattr(board, field):
-                    # Handle different field types
-                    if field in ['today_date', 'tomorrow_date', 'next_day_date']:
-                        if value:
-                            try:
-                                setattr(board, field, datetime.strptime(value, '%Y-%m-%d').date())
-                            except ValueError:
-                                print(f"Invalid date format for {field}: {value}")
-                                continue
-                    elif field == 'meeting_time':
-                        if value:
-                            try:
-                                setattr(board, field, datetime.strptime(value, '%H:%M').time())
-                            except ValueError:
-                                print(f"Invalid time format for {field}: {value}")
-                                continue
-                    else:
-                        setattr(board, field, value or None)
-            board.save()
-            print(f"Updated board: {board.title}")
-        
-        # Process production line updates
-        if 'production_line' in data:
-            for line_id, updates in data['production_line'].items():
-                if line_id.startswith('new_'):
-                    # Create new production line
-                    try:
-                        ProductionLine.objects.create(
-                            planning_board=board,
-                            **process_production_line_data(updates)
-                        )
-                        print(f"Created new production line with temp ID: {line_id}")
-                    except Exception as e:
-                        print(f"Error creating production line: {e}")
-                        continue
-                else:
-                    # Update existing production line
-                    try:
-                        line = ProductionLine.objects.get(id=line_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(line, field):
-                                setattr(line, field, processed_value)
-                        line.save()
-                        print(f"Updated production line ID: {line_id}")
-                    except ProductionLine.DoesNotExist:
-                        print(f"Production line not found: {line_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating production line {line_id}: {e}")
-                        continue
-        
-        # Process tomorrow plan updates
-        if 'tomorrow_plan' in data:
-            for plan_id, updates in data['tomorrow_plan'].items():
-                if plan_id.startswith('new_'):
-                    # Create new plan
-                    try:
-                        TomorrowPlan.objects.create(
-                            planning_board=board,
-                            **process_plan_data(updates)
-                        )
-                        print(f"Created new tomorrow plan with temp ID: {plan_id}")
-                    except Exception as e:
-                        print(f"Error creating tomorrow plan: {e}")
-                        continue
-                else:
-                    # Update existing plan
-                    try:
-                        plan = TomorrowPlan.objects.get(id=plan_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(plan, field):
-                                setattr(plan, field, processed_value)
-                        plan.save()
-                        print(f"Updated tomorrow plan ID: {plan_id}")
-                    except TomorrowPlan.DoesNotExist:
-                        print(f"Tomorrow plan not found: {plan_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating tomorrow plan {plan_id}: {e}")
-                        continue
-        
-        # Process next day plan updates
-        if 'next_day_plan' in data:
-            for plan_id, updates in data['next_day_plan'].items():
-                if plan_id.startswith('new_'):
-                    # Create new plan
-                    try:
-                        NextDayPlan.objects.create(
-                            planning_board=board,
-                            **process_plan_data(updates)
-                        )
-                        print(f"Created new next day plan with temp ID: {plan_id}")
-                    except Exception as e:
-                        print(f"Error creating next day plan: {e}")
-                        continue
-                else:
-                    # Update existing plan
-                    try:
-                        plan = NextDayPlan.objects.get(id=plan_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(plan, field):
-                                setattr(plan, field, processed_value)
-                        plan.save()
-                        print(f"Updated next day plan ID: {plan_id}")
-                    except NextDayPlan.DoesNotExist:
-                        print(f"Next day plan not found: {plan_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating next day plan {plan_id}: {e}")
-                        continue
-        
-        # Process critical part updates
-        if 'critical_part' in data:
-            for part_id, updates in data['critical_part'].items():
-                if part_id.startswith('new_'):
-                    # Create new critical part
-                    try:
-                        CriticalPartStatus.objects.create(
-                            planning_board=board,
-                            **process_critical_part_data(updates)
-                        )
-                        print(f"Created new critical part with temp ID: {part_id}")
-                    except Exception as e:
-                        print(f"Error creating critical part: {e}")
-                        continue
-                else:
-                    # Update existing critical part
-                    try:
-                        part = CriticalPartStatus.objects.get(id=part_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(part, field):
-                                setattr(part, field, processed_value)
-                        part.save()
-                        print(f"Updated critical part ID: {part_id}")
-                    except CriticalPartStatus.DoesNotExist:
-                        print(f"Critical part not found: {part_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating critical part {part_id}: {e}")
-                        continue
-        
-        # Process AFM plan updates
-        if 'afm_plan' in data:
-            for plan_id, updates in data['afm_plan'].items():
-                if plan_id.startswith('new_'):
-                    # Create new AFM plan
-                    try:
-                        AFMPlan.objects.create(
-                            planning_board=board,
-                            **process_afm_plan_data(updates)
-                        )
-                        print(f"Created new AFM plan with temp ID: {plan_id}")
-                    except Exception as e:
-                        print(f"Error creating AFM plan: {e}")
-                        continue
-                else:
-                    # Update existing AFM plan
-                    try:
-                        plan = AFMPlan.objects.get(id=plan_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(plan, field):
-                                setattr(plan, field, processed_value)
-                        plan.save()
-                        print(f"Updated AFM plan ID: {plan_id}")
-                    except AFMPlan.DoesNotExist:
-                        print(f"AFM plan not found: {plan_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating AFM plan {plan_id}: {e}")
-                        continue
-        
-        # Process SPD plan updates
-        if 'spd_plan' in data:
-            for plan_id, updates in data['spd_plan'].items():
-                if plan_id.startswith('new_'):
-                    # Create new SPD plan
-                    try:
-                        SPDPlan.objects.create(
-                            planning_board=board,
-                            **process_spd_plan_data(updates)
-                        )
-                        print(f"Created new SPD plan with temp ID: {plan_id}")
-                    except Exception as e:
-                        print(f"Error creating SPD plan: {e}")
-                        continue
-                else:
-                    # Update existing SPD plan
-                    try:
-                        plan = SPDPlan.objects.get(id=plan_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(plan, field):
-                                setattr(plan, field, processed_value)
-                        plan.save()
-                        print(f"Updated SPD plan ID: {plan_id}")
-                    except SPDPlan.DoesNotExist:
-                        print(f"SPD plan not found: {plan_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating SPD plan {plan_id}: {e}")
-                        continue
-        
-        # Process other information updates
-        if 'other_info' in data:
-            for info_id, updates in data['other_info'].items():
-                if info_id.startswith('new_'):
-                    # Create new other info
-                    try:
-                        OtherInformation.objects.create(
-                            planning_board=board,
-                            **process_other_info_data(updates)
-                        )
-                        print(f"Created new other info with temp ID: {info_id}")
-                    except Exception as e:
-                        print(f"Error creating other info: {e}")
-                        continue
-                else:
-                    # Update existing other info
-                    try:
-                        info = OtherInformation.objects.get(id=info_id, planning_board=board)
-                        for field, value in updates.items():
-                            processed_value = process_field_value(field, value)
-                            if hasattr(info, field):
-                                setattr(info, field, processed_value)
-                        info.save()
-                        print(f"Updated other info ID: {info_id}")
-                    except OtherInformation.DoesNotExist:
-                        print(f"Other info not found: {info_id}")
-                        continue
-                    except Exception as e:
-                        print(f"Error updating other info {info_id}: {e}")
-                        continue
-        
-        # Process deletions
-        if 'delete' in data:
-            for model_type, ids in data['delete'].items():
-                for obj_id in ids:
-                    try:
-                        if model_type == 'production_line':
-                            ProductionLine.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted production line ID: {obj_id}")
-                        elif model_type == 'tomorrow_plan':
-                            TomorrowPlan.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted tomorrow plan ID: {obj_id}")
-                        elif model_type == 'next_day_plan':
-                            NextDayPlan.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted next day plan ID: {obj_id}")
-                        elif model_type == 'critical_part':
-                            CriticalPartStatus.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted critical part ID: {obj_id}")
-                        elif model_type == 'afm_plan':
-                            AFMPlan.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted AFM plan ID: {obj_id}")
-                        elif model_type == 'spd_plan':
-                            SPDPlan.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted SPD plan ID: {obj_id}")
-                        elif model_type == 'other_info':
-                            OtherInformation.objects.get(id=obj_id, planning_board=board).delete()
-                            print(f"Deleted other info ID: {obj_id}")
-                    except Exception as e:
-                        print(f"Error deleting {model_type} ID {obj_id}: {e}")
-                        continue
+        created_ids = apply_inline_changes(board, data)
         
         return JsonResponse({
             'success': True, 
             'message': 'Changes saved successfully',
-            'board_id': board.pk
+            'board_id': board.pk,
+            'created_ids': created_ids,
         })
         
     except json.JSONDecodeError as e:
         print(f"JSON decode error: {e}")
         return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
+    except ValidationError as e:
+        print(f"Rejected inline update: {e.message_dict}")
+        return JsonResponse({'success': False, 'error': 'Invalid values', 'errors': e.message_dict}, status=400)
     except Exception as e:
         print(f"Unexpected error in inline_update_board: {e}")
         import traceback
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)})
 
-def process_field_value(field, value):
-    """Process field value based on field type"""
-    if not value or value == '-':
-        return None
-    
-    # Handle time fields
-    if 'time' in field and value:
-        try:
-            return datetime.strptime(value, '%H:%M').time()
-        except ValueError:
-            print(f"Invalid time format for {field}: {value}")
-            return None
-    
-    # Handle date fields
-    if 'date' in field and value:
-        try:
-            return datetime.strptime(value, '%Y-%m-%d').date()
-        except ValueError:
-            print(f"Invalid date format for {field}: {value}")
-            return None
-    
-    # Handle datetime fields
-    if field == 'receiving_time' and value:
-        try:
-            return datetime.strptime(value, '%Y-%m-%dT%H:%M')
-        except ValueError:
-            print(f"Invalid datetime format for {field}: {value}")
-            return None
-    
-    # Handle numeric fields
-    numeric_fields = [
-        'plan', 'actual', 'plan_change', 'plan_qty', 'qty',
-        'a_shift_plan', 'a_shift_actual', 'a_shift_plan_change',
-        'b_shift_plan', 'b_shift_actual', 'b_shift_plan_change',
-        'c_shift_plan', 'c_shift_actual', 'c_shift_plan_change',
-        'a_shift', 'b_shift', 'c_shift'
-    ]
+@transaction.atomic
+@batched_changes()
+def apply_inline_changes(board, data):
+    """
+    Apply an inline edit payload in one transaction: per section one in_bulk
+    load, one bulk_update, one bulk_create and one filtered delete.
+    Every value is parsed by the model's field codec first; if anything is
+    invalid nothing is written and a ValidationError lists the bad fields as ``section.row_id.field``.
+    Returns ``{section: {temp_id: new_id}}`` for the rows that were created.
+    """
+    errors = {}
     
-    if field in numeric_fields and value:
+    # Parse everything up front so bad input never reaches the database
+    board_updates = {}
+    if 'board' in data and 'main' in data['board']:
         try:
-            # Try integer first, then float
-            if '.' in str(value):
-                return float(value)
-            else:
-                return int(value)
-        except (ValueError, TypeError):
-            print(f"Invalid numeric value for {field}: {value}")
-            return 0
-    
-    # Return string value for everything else
-    return str(value).strip() if value else ''
-
-def process_production_line_data(data):
-    """Process production line data for creation"""
-    processed = {}
-    for field, value in data.items():
-        processed[field] = process_field_value(field, value)
-    
-    # Ensure required fields have default values
-    if 'line_number' not in processed or not processed['line_number']:
-        processed['line_number'] = 'New Line'
-    
-    return processed
-
-def process_plan_data(data):
-    """Process plan data for creation (tomorrow/next day plans)"""
-    processed = {}
-    for field, value in data.items():
-        if field in ['a_shift', 'b_shift', 'c_shift'] and value:
+            board_updates = codec_for(PlanningBoard).parse_row(data['board']['main'])
+        except ValidationError as e:
+            errors.update({f"board.{field}": messages for field, messages in e.message_dict.items()})
+    
+    parsed_sections = {}
+    for section_key, (model, new_row_defaults) in INLINE_SECTIONS.items():
+        changes = data.get(section_key) or {}
+        if not changes:
+            continue
+        codec = codec_for(model)
+        updates_by_id = {}
+        new_rows = {}
+        for row_id, updates in changes.items():
             try:
-                processed[field] = int(value) if str(value).isdigit() else float(value)
-            except (ValueError, TypeError):
-                processed[field] = 0
-        else:
-            processed[field] = str(value).strip() if value else ''
-    
-    # Ensure required fields have default values
-    if 'model' not in processed or not processed['model']:
-        processed['model'] = 'New Model'
-    
-    return processed
-
-def process_critical_part_data(data):
-    """Process critical part data for creation"""
-    processed = {}
-    for field, value in data.items():
-        if field == 'plan_qty' and value:
-            try:
-                processed[field] = int(value) if str(value).isdigit() else float(value)
-            except (ValueError, TypeError):
-                processed[field] = 0
-        elif field == 'receiving_time' and value:
-            try:
-                processed[field] = datetime.strptime(value, '%Y-%m-%dT%H:%M')
+                if row_id.startswith('new_'):
+                    new_rows[row_id] = codec.parse_row(updates, partial=False, defaults=new_row_defaults)
+                else:
+                    updates_by_id[int(row_id)] = codec.parse_row(updates)
             except ValueError:
-                processed[field] = None
-        else:
-            processed[field] = str(value).strip() if value else ''
+                errors[f"{section_key}.{row_id}"] = ['Invalid row id']
+            except ValidationError as e:
+                errors.update({
+                    f"{section_key}.{row_id}.{field}": messages
+                    for field, messages in e.message_dict.items()
+                })
+        parsed_sections[section_key] = (model, updates_by_id, new_rows)
     
-    # Ensure required fields have default values
-    if 'part_name' not in processed or not processed['part_name']:
-        processed['part_name'] = 'New Critical Part'
+    if errors:
+        raise ValidationError(errors)
     
-    return processed
-
-def process_afm_plan_data(data):
-    """Process AFM plan data for creation"""
-    processed = {}
-    for field, value in data.items():
-        if field == 'plan_qty' and value:
-            try:
-                processed[field] = int(value) if str(value).isdigit() else float(value)
-            except (ValueError, TypeError):
-                processed[field] = 0
-        else:
-            processed[field] = str(value).strip() if value else ''
+    board_saved = False
+    if board_updates:
+        for field, value in board_updates.items():
+            setattr(board, field, value)
+        board.save()
+        board_saved = True
+        print(f"Updated board: {board.title}")
+    
+    created_ids = {}
+    rows_changed = False
+    
+    for section_key, (model, updates_by_id, new_rows) in parsed_sections.items():
+        # Existing rows: one in_bulk query, then a single bulk_update
+        rows = model.objects.filter(planning_board=board).in_bulk(list(updates_by_id))
+        updated_rows = []
+        updated_fields = set()
+        for row_id, updates in updates_by_id.items():
+            row = rows.get(row_id)
+            if row is None:
+                print(f"{model.__name__} not found: {row_id}")
+                continue
+            for field, value in updates.items():
+                setattr(row, field, value)
+                updated_fields.add(field)
+            updated_rows.append(row)
+        
+        if updated_rows and updated_fields:
+            model.objects.bulk_update(updated_rows, sorted(updated_fields))
+            # bulk_update sends no signals, so publish the change explicitly
+            section_changed(board.pk, SECTION_MODELS[model], [row.pk for row in updated_rows])
+            if model is ProductionLine:
+                record_actuals(updated_rows)
+            rows_changed = True
+        
+        # New rows: a single bulk_create, returning the server-assigned ids
+        if new_rows:
+            created = [model(planning_board=board, **values) for values in new_rows.values()]
+            model.objects.bulk_create(created)
+            section_changed(board.pk, SECTION_MODELS[model], [row.pk for row in created], 'created')
+            if model is ProductionLine:
+                record_actuals(created)
+            created_ids[section_key] = {
+                temp_id: row.pk for temp_id, row in zip(new_rows, created)
+            }
+            rows_changed = True
+        
+        print(f"{section_key}: updated {len(updated_rows)}, created {len(new_rows)}")
     
-    # Ensure required fields have default values
-    if 'part_name' not in processed or not processed['part_name']:
-        processed['part_name'] = 'New AFM Part'
-    if 'plan_type' not in processed or not processed['plan_type']:
-        processed['plan_type'] = 'FCIN'
+    # Process deletions with one load and one collected delete per section
+    if 'delete' in data:
+        for model_type, ids in data['delete'].items():
+            if model_type not in INLINE_SECTIONS or not ids:
+                continue
+            model = INLINE_SECTIONS[model_type][0]
+            ids = [obj_id for obj_id in ids if str(obj_id).isdigit()]
+            rows = list(model.objects.filter(planning_board=board, pk__in=ids))
+            for row in rows:
+                row.planning_board = board  # the delete signals read the owner without a query per row
+            collector = Collector(using=model.objects.db)
+            collector.collect(rows)
+            deleted, _ = collector.delete()
+            rows_changed = rows_changed or bool(deleted)
+            print(f"Deleted {deleted} {model_type} rows")
+    
+    # Child rows were written in bulk, so bump the board so live displays notice
+    if rows_changed and not board_saved:
+        board.save(update_fields=['updated_at'])
     
-    return processed
+    return created_ids
 
-def process_spd_plan_data(data):
-    """Process SPD plan data for creation"""
-    processed = {}
-    for field, value in data.items():
-        if field == 'plan_qty' and value:
-            try:
-                processed[field] = int(value) if str(value).isdigit() else float(value)
-            except (ValueError, TypeError):
-                processed[field] = 0
-        else:
-            processed[field] = str(value).strip() if value else ''
-    
-    # Ensure required fields have default values
-    if 'part_name' not in processed or not processed['part_name']:
-        processed['part_name'] = 'New SPD Part'
-    if 'customer' not in processed or not processed['customer']:
-        processed['customer'] = 'MSIL'
-    
-    return processed
-
-def process_other_info_data(data):
-    """Process other information data for creation"""
-    processed = {}
-    for field, value in data.items():
-        if field == 'qty' and value:
-            try:
-                processed[field] = int(value) if str(value).isdigit() else float(value)
-            except (ValueError, TypeError):
-                processed[field] = 0
-        elif field == 'target_date' and value:
-            try:
-                processed[field] = datetime.strptime(value, '%Y-%m-%d').date()
-            except ValueError:
-                processed[field] = timezone.now().date()
-        else:
-            processed[field] = str(value).strip() if value else ''
-    
-    # Ensure required fields have default values
-    if 'part_name' not in processed or not processed['part_name']:
-        processed['part_name'] = 'New Information'
-    if 'target_date' not in processed:
-        processed['target_date'] = timezone.now().date()
-    
-    return processed
+# Inline-editable sections: payload key -> (model, defaults for new rows)
+INLINE_SECTIONS = {
+    'production_line': (ProductionLine, {'line_number': 'New Line'}),
+    'tomorrow_plan': (TomorrowPlan, {'model': 'New Model'}),
+    'next_day_plan': (NextDayPlan, {'model': 'New Model'}),
+    'critical_part': (CriticalPartStatus, {'part_name': 'New Critical Part', 'supplier': '', 'plan_qty': 0}),
+    'afm_plan': (AFMPlan, {'part_name': 'New AFM Part', 'plan_type': 'FCIN', 'plan_qty': 0}),
+    'spd_plan': (SPDPlan, {'part_name': 'New SPD Part', 'customer': 'MSIL', 'plan_qty': 0}),
+    'other_info': (OtherInformation, {
+        'part_name': 'New Information', 'qty': 0, 'target_date': lambda: timezone.now().date(),
+    }),
+}
 
     
 
@@ -1564,8 +1334,12 @@ def process_other_info_data(data):
 
 
 import json
+import asyncio
 import time
-from django.shortcuts import render, get_object_or_404
+import random
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, StreamingHttpResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -1668,13 +1442,24 @@ def get_board_sections_summary(request, board_id):
 @never_cache
 def get_section_data(request, board_id, section):
     """Get detailed data for a specific section"""
-    board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
-    
+    try:
+        snapshot = board_section_snapshot(board_id, section, request.user)
+    except PlanningBoard.DoesNotExist:
+        raise Http404("No PlanningBoard matches the given query.")
+    if wants_compact(request):
+        data = {key: value for key, value in snapshot.payload.items() if key != 'row_versions'}
+        return json_response(encode_compact(data, schema_id=request.GET.get('schema_id')))
+    # Polling screens showing the same section share one build and its encoded JSON
+    return HttpResponse(snapshot.json(), content_type='application/json')
+
+def build_section_data(board, section):
+    """Build the section payload; ``row_ids`` lists the primary key of each row in ``data``"""
     data = {
         'section': section,
         'board_id': board.pk,
         'timestamp': timezone.now().isoformat(),
-        'data': []
+        'data': [],
+        'row_ids': [],
     }
     
     if section == 'today_assembly':
@@ -1687,6 +1472,7 @@ def get_section_data(request, board_id, section):
         ]
         
         for line in production_lines:
+            data['row_ids'].append(line.pk)
             data['data'].append([
                 line.line_number or '',
                 line.a_shift_model or '',
@@ -1716,6 +1502,7 @@ def get_section_data(request, board_id, section):
         
         for plan in tomorrow_plans:
             total = (plan.a_shift or 0) + (plan.b_shift or 0) + (plan.c_shift or 0)
+            data['row_ids'].append(plan.pk)
             data['data'].append([
                 plan.model or '',
                 plan.a_shift or 0,
@@ -1732,6 +1519,7 @@ def get_section_data(request, board_id, section):
         
         for plan in next_day_plans:
             total = (plan.a_shift or 0) + (plan.b_shift or 0) + (plan.c_shift or 0)
+            data['row_ids'].append(plan.pk)
             data['data'].append([
                 plan.model or '',
                 plan.a_shift or 0,
@@ -1755,6 +1543,7 @@ def get_section_data(request, board_id, section):
                 else:
                     status = 'Scheduled'
             
+            data['row_ids'].append(part.pk)
             data['data'].append([
                 part.part_name or '',
                 part.supplier or '',
@@ -1770,6 +1559,7 @@ def get_section_data(request, board_id, section):
         data['headers'] = ['Type', 'Part Name', 'Part Number', 'Plan Qty', 'Remarks']
         
         for plan in afm_plans:
+            data['row_ids'].append(plan.pk)
             data['data'].append([
                 plan.plan_type or '',
                 plan.part_name or '',
@@ -1784,6 +1574,7 @@ def get_section_data(request, board_id, section):
         data['headers'] = ['Customer', 'Part Name', 'Part Number', 'Plan Qty', 'Remarks']
         
         for plan in spd_plans:
+            data['row_ids'].append(plan.pk)
             data['data'].append([
                 plan.customer or '',
                 plan.part_name or '',
@@ -1798,6 +1589,7 @@ def get_section_data(request, board_id, section):
         data['headers'] = ['Part Name', 'Quantity', 'Target Date', 'Remarks']
         
         for info in other_info:
+            data['row_ids'].append(info.pk)
             data['data'].append([
                 info.part_name or '',
                 info.qty or 0,
@@ -1805,62 +1597,133 @@ def get_section_data(request, board_id, section):
                 (info.remarks or '')[:100]
             ])
     
-    return JsonResponse(data)
+    return data
    
 
 
 
 @login_required
 @never_cache
-def live_stream_section(request, board_id, section):
-    """Server-Sent Events stream for real-time updates"""
-    
-    def event_stream():
-        """Generator function for SSE stream"""
-        board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
-        last_update = timezone.now()
-        
-        while True:
-            try:
-                # Check if board has been updated
-                current_board = PlanningBoard.objects.get(pk=board_id, created_by=request.user)
-                
-                if current_board.updated_at > last_update:
-                    # Get fresh data
-                    response = get_section_data(request, board_id, section)
-                    data = json.loads(response.content.decode('utf-8'))
+async def live_stream_section(request, board_id, section):
+    """Server-Sent Events stream for real-time updates (async, served through asgi.py)"""
+    compact = wants_compact(request)
+    user = await request.auser()
+    await aget_object_or_404(PlanningBoard, pk=board_id, created_by=user)
+    
+    async def produce(connection):
+        """Data loop of the SSE stream; runs as a task and hands messages to the connection"""
+        tracker = await resumed_tracker(request, 'section', board_id, section)
+        refresh = True
+        
+        connection.send(reconnect_retry())
+        # The board hub polls each board once for all streams and wakes us on changes
+        async with board_hub.subscribe(board_id) as changes:
+            while True:
+                try:
+                    if connection.resync:
+                        # The client fell behind and lost queued events: start over with a snapshot
+                        tracker, refresh, connection.resync = SectionDeltaTracker(), True, False
+                    if refresh:
+                        # First event is a full snapshot, later ones only carry changed rows
+                        with stream_registry.timing(connection.stats):
+                            snapshot = await database_sync_to_async(board_section_snapshot)(board_id, section, user)
+                        message = stream_message(tracker, snapshot, compact)
+                        if message:
+                            connection.send(message)
+                        refresh = False
                     
-                    # Send SSE event
-                    yield f"data: {json.dumps(data)}\n\n"
+                    change = await changes.get(timeout=5)
+                    if change is None:
+                        # Nothing changed: send a heartbeat
+                        connection.send(f"event: heartbeat\ndata: {json.dumps({'timestamp': timezone.now().isoformat()})}\n\n")
+                    elif change['deleted']:
+                        raise PlanningBoard.DoesNotExist
+                    else:
+                        refresh = True
                     
-                    last_update = current_board.updated_at
-                
-                # Send heartbeat every 30 seconds
-                yield f"event: heartbeat\ndata: {json.dumps({'timestamp': timezone.now().isoformat()})}\n\n"
-                
-                time.sleep(5)  # Check for updates every 5 seconds
-                
-            except PlanningBoard.DoesNotExist:
-                yield f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n"
-                break
-            except Exception as e:
-                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(10)  # Wait longer on error
-    
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+                except PlanningBoard.DoesNotExist:
+                    connection.send(f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n")
+                    break
+                except Exception as e:
+                    connection.send(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n")
+                    await asyncio.sleep(10)  # Wait longer on error
+    
+    response = StreamingHttpResponse(
+        StreamConnection('live_section', board_id, section, user.id).messages(produce), content_type='text/event-stream'
+    )
     response['Cache-Control'] = 'no-cache'
     response['Access-Control-Allow-Origin'] = '*'
     response['Access-Control-Allow-Headers'] = 'Cache-Control'
     
     return response
 
+def encode_stream_event(event, compact):
+    """Return ``(body, event_name)`` for sse_event, compacting snapshots on request"""
+    name, body = event
+    if compact and name == 'snapshot':
+        body = encode_compact(body)
+    return body, name
+
+def stream_message(tracker, snapshot, compact):
+    """Next SSE message for a stream client; snapshots reuse the shared encoded bytes"""
+    event = tracker.next_event(snapshot.payload)
+    if event is None:
+        return None
+    if event[0] == 'snapshot':
+        return snapshot.sse_snapshot(compact)
+    return sse_event(*encode_stream_event(event, compact), event_id=snapshot.event_id)
+
+async def resumed_tracker(request, kind, board_id, section):
+    """
+    Delta tracker for a new stream connection. A reconnecting EventSource sends
+    Last-Event-ID (``?last_event_id=`` after a manual reconnect); while that
+    version is still in the replay buffer the client only gets what it missed
+    instead of a full snapshot.
+    """
+    tracker = SectionDeltaTracker()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id:
+        await sync_to_async(resume_tracker)(tracker, kind, board_id, section, last_event_id)
+    return tracker
+
+def reconnect_retry():
+    """SSE ``retry`` field with jitter, so screens dropped together don't reconnect together"""
+    return f"retry: {random.randint(2000, 8000)}\n\n"
+
+def display_snapshot_kind(section, merged=False):
+    return 'merged' if merged and section == 'today_assembly' else 'enhanced'
+
+def display_snapshot(board_id, section, user, merged=False):
+    """
+    Shared snapshot of get_enhanced_section_data (or, with ``merged``, of
+    get_merged_assembly_data for today_assembly); built once per data version
+    however many screens show the section.
+    """
+    if display_snapshot_kind(section, merged) == 'merged':
+        return section_snapshot(
+            'merged', board_id, section, user,
+            lambda: get_merged_assembly_data(board_id, user), sources=MERGED_SOURCES,
+        )
+    return section_snapshot(
+        'enhanced', board_id, section, user,
+        lambda: get_enhanced_section_data(board_id, section, user),
+    )
+
+def board_section_snapshot(board_id, section, user):
+    """Shared snapshot of build_section_data, used by the live section stream"""
+    return section_snapshot(
+        'section', board_id, section, user,
+        lambda: build_section_data(PlanningBoard.objects.get(pk=board_id), section),
+    )
+
 @login_required
 def get_user_planning_boards(request):
-    """Get list of planning boards for the current user"""
-    boards = PlanningBoard.objects.filter(created_by=request.user).order_by('-created_at')[:20]
+    """Get one keyset page of planning boards for the current user"""
+    user_boards = PlanningBoard.objects.filter(created_by=request.user)
+    page = paginate_boards(user_boards, request.GET.get('cursor'), page_size_from(request, default=20))
     
     boards_data = []
-    for board in boards:
+    for board in page:
         boards_data.append({
             'id': board.pk,
             'title': board.title,
@@ -1871,7 +1734,9 @@ def get_user_planning_boards(request):
     
     return JsonResponse({
         'boards': boards_data,
-        'total_count': boards.count()
+        'total_count': cached_count(user_boards, user_cache_key(request.user.id, 'board_count')),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
     })
 
 @login_required
@@ -1882,6 +1747,7 @@ def trigger_board_update(request, board_id):
         board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
         board.updated_at = timezone.now()
         board.save(update_fields=['updated_at'])
+        notify_board_changed(board.pk)
         
         return JsonResponse({
             'success': True,
@@ -2002,50 +1868,62 @@ def get_section_display_config(section):
     
     return configs.get(section, configs['today_assembly'])
 
+@login_required
 @never_cache
-def fullscreen_data_stream(request, board_id, section):
-    """Enhanced streaming endpoint for fullscreen display with additional metadata"""
-    
-    def event_stream():
-        board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
-        last_update = timezone.now()
-        
-        while True:
-            try:
-                # Check if board has been updated
-                current_board = PlanningBoard.objects.get(pk=board_id, created_by=request.user)
-                
-                if current_board.updated_at > last_update:
-                    # Get enhanced data with statistics
-                    data = get_enhanced_section_data(board_id, section, request.user)
+async def fullscreen_data_stream(request, board_id, section):
+    """Enhanced streaming endpoint for fullscreen display with additional metadata (async)"""
+    compact = wants_compact(request)
+    user = await request.auser()
+    await aget_object_or_404(PlanningBoard, pk=board_id, created_by=user)
+    
+    async def produce(connection):
+        tracker = await resumed_tracker(request, 'enhanced', board_id, section)
+        refresh = True
+        
+        connection.send(reconnect_retry())
+        # The board hub polls each board once for all streams and wakes us on changes
+        async with board_hub.subscribe(board_id) as changes:
+            while True:
+                try:
+                    if connection.resync:
+                        # The client fell behind and lost queued events: start over with a snapshot
+                        tracker, refresh, connection.resync = SectionDeltaTracker(), True, False
+                    if refresh:
+                        # Get enhanced data with statistics, sent as snapshot then row deltas
+                        with stream_registry.timing(connection.stats):
+                            snapshot = await database_sync_to_async(display_snapshot)(board_id, section, user)
+                        message = stream_message(tracker, snapshot, compact)
+                        if message:
+                            connection.send(message)
+                        refresh = False
                     
-                    # Send SSE event
-                    yield f"data: {json.dumps(data)}\n\n"
+                    change = await changes.get(timeout=3)
+                    if change is None:
+                        # Send heartbeat with system status
+                        system_status = {
+                            'timestamp': timezone.now().isoformat(),
+                            'board_id': board_id,
+                            'section': section,
+                            'connection_count': stream_registry.count(board_id=board_id, section=section),
+                            'server_time': timezone.now().strftime('%H:%M:%S'),
+                            'server_date': timezone.now().strftime('%Y-%m-%d'),
+                        }
+                        connection.send(f"event: heartbeat\ndata: {json.dumps(system_status)}\n\n")
+                    elif change['deleted']:
+                        raise PlanningBoard.DoesNotExist
+                    else:
+                        refresh = True
                     
-                    last_update = current_board.updated_at
-                
-                # Send heartbeat with system status
-                system_status = {
-                    'timestamp': timezone.now().isoformat(),
-                    'board_id': board_id,
-                    'section': section,
-                    'connection_count': 1,  # Could track multiple connections
-                    'server_time': timezone.now().strftime('%H:%M:%S'),
-                    'server_date': timezone.now().strftime('%Y-%m-%d'),
-                }
-                
-                yield f"event: heartbeat\ndata: {json.dumps(system_status)}\n\n"
-                
-                time.sleep(3)  # More frequent updates for fullscreen display
-                
-            except PlanningBoard.DoesNotExist:
-                yield f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n"
-                break
-            except Exception as e:
-                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(5)
-    
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+                except PlanningBoard.DoesNotExist:
+                    connection.send(f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n")
+                    break
+                except Exception as e:
+                    connection.send(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n")
+                    await asyncio.sleep(5)
+    
+    response = StreamingHttpResponse(
+        StreamConnection('fullscreen', board_id, section, user.id).messages(produce), content_type='text/event-stream'
+    )
     response['Cache-Control'] = 'no-cache'
     response['Connection'] = 'keep-alive'
     response['Access-Control-Allow-Origin'] = '*'
@@ -2064,13 +1942,15 @@ def get_enhanced_section_data(board_id, section, user):
         'timestamp': timezone.now().isoformat(),
         'last_updated': board.updated_at.isoformat(),
         'data': [],
+        'row_ids': [],
         'statistics': {},
         'alerts': [],
         'status': 'active'
     }
     
+    # Statistics come from the same query as the rows (see aggregates.py)
     if section == 'today_assembly':
-        production_lines = board.production_lines.all().order_by('line_number')
+        production_lines = list(aggregates.production_lines(board.production_lines.order_by('line_number')))
         base_data['title'] = 'Today Assembly Plan'
         base_data['headers'] = [
             'Line', 'A Shift Model', 'A Plan', 'A Actual', 'A %',
@@ -2078,100 +1958,57 @@ def get_enhanced_section_data(board_id, section, user):
             'C Shift Model', 'C Plan', 'C Actual', 'C %', 'Status'
         ]
         
-        total_plan = 0
-        total_actual = 0
-        line_statuses = {'on_target': 0, 'behind': 0, 'ahead': 0}
-        
         for line in production_lines:
-            # Calculate efficiency percentages
-            a_efficiency = calculate_efficiency(line.a_shift_plan, line.a_shift_actual)
-            b_efficiency = calculate_efficiency(line.b_shift_plan, line.b_shift_actual)
-            c_efficiency = calculate_efficiency(line.c_shift_plan, line.c_shift_actual)
-            
-            # Determine line status
-            avg_efficiency = (a_efficiency + b_efficiency + c_efficiency) / 3 if any([a_efficiency, b_efficiency, c_efficiency]) else 0
-            if avg_efficiency >= 95:
-                status = 'On Target'
-                line_statuses['on_target'] += 1
-            elif avg_efficiency >= 85:
-                status = 'Behind'
-                line_statuses['behind'] += 1
-            else:
-                status = 'Critical'
-                line_statuses['behind'] += 1
-                
             # Add alert for critical lines
-            if avg_efficiency < 85 and avg_efficiency > 0:
+            if 0 < line.avg_efficiency < 85:
                 base_data['alerts'].append({
                     'type': 'warning',
                     'message': f'{line.line_number}: Production below 85%',
-                    'efficiency': avg_efficiency
+                    'efficiency': line.avg_efficiency
                 })
             
-            total_plan += (line.a_shift_plan or 0) + (line.b_shift_plan or 0) + (line.c_shift_plan or 0)
-            total_actual += (line.a_shift_actual or 0) + (line.b_shift_actual or 0) + (line.c_shift_actual or 0)
-            
+            base_data['row_ids'].append(line.pk)
             base_data['data'].append([
                 line.line_number or '',
                 line.a_shift_model or '-',
                 line.a_shift_plan or 0,
                 line.a_shift_actual or 0,
-                f"{a_efficiency}%",
+                format_efficiency(line.a_efficiency),
                 line.b_shift_model or '-',
                 line.b_shift_plan or 0,
                 line.b_shift_actual or 0,
-                f"{b_efficiency}%",
+                format_efficiency(line.b_efficiency),
                 line.c_shift_model or '-',
                 line.c_shift_plan or 0,
                 line.c_shift_actual or 0,
-                f"{c_efficiency}%",
-                status
+                format_efficiency(line.c_efficiency),
+                line.line_status
             ])
         
+        statistics = aggregates.totals(production_lines, (
+            'total_lines', 'total_plan', 'total_actual', 'lines_on_target', 'lines_behind',
+        ))
         base_data['statistics'] = {
-            'total_lines': production_lines.count(),
-            'total_plan': total_plan,
-            'total_actual': total_actual,
-            'overall_efficiency': calculate_efficiency(total_plan, total_actual),
-            'lines_on_target': line_statuses['on_target'],
-            'lines_behind': line_statuses['behind'],
-            'lines_ahead': line_statuses['ahead'],
+            'total_lines': statistics['total_lines'],
+            'total_plan': statistics['total_plan'],
+            'total_actual': statistics['total_actual'],
+            'overall_efficiency': calculate_efficiency(statistics['total_plan'], statistics['total_actual']),
+            'lines_on_target': statistics['lines_on_target'],
+            'lines_behind': statistics['lines_behind'],
+            'lines_ahead': 0,
+            'shifts': ShiftTable.from_lines(production_lines, board.today_date).kpis(by=('shift',)),
         }
     
     elif section == 'critical_parts':
-        critical_parts = board.critical_parts.all().order_by('part_name')
+        critical_parts = list(aggregates.critical_parts(board.critical_parts.order_by('part_name'), timezone.now()))
         base_data['title'] = 'Critical Parts Status'
         base_data['headers'] = ['Part Name', 'Supplier', 'Plan Qty', 'Status', 'ETA', 'Risk Level']
         
-        status_counts = {'received': 0, 'pending': 0, 'delayed': 0}
-        risk_counts = {'low': 0, 'medium': 0, 'high': 0}
-        
         for part in critical_parts:
-            # Determine status and risk
             if part.receiving_time:
-                if part.receiving_time <= timezone.now():
-                    status = 'Received'
-                    status_counts['received'] += 1
-                    risk = 'Low'
-                    risk_counts['low'] += 1
-                elif part.receiving_time <= timezone.now() + timedelta(hours=2):
-                    status = 'Due Soon'
-                    status_counts['pending'] += 1
-                    risk = 'Medium'
-                    risk_counts['medium'] += 1
-                else:
-                    status = 'Scheduled'
-                    status_counts['pending'] += 1
-                    risk = 'Low'
-                    risk_counts['low'] += 1
-                    
                 eta = part.receiving_time.strftime('%H:%M')
             else:
-                status = 'TBD'
                 eta = 'TBD'
-                risk = 'High'
-                status_counts['delayed'] += 1
-                risk_counts['high'] += 1
                 
                 # Add alert for TBD parts
                 base_data['alerts'].append({
@@ -2180,87 +2017,54 @@ def get_enhanced_section_data(board_id, section, user):
                     'supplier': part.supplier
                 })
             
+            base_data['row_ids'].append(part.pk)
             base_data['data'].append([
                 part.part_name or '',
                 part.supplier or '',
                 part.plan_qty or 0,
-                status,
+                part.part_status,
                 eta,
-                risk
+                part.risk
             ])
         
-        base_data['statistics'] = {
-            'total_parts': critical_parts.count(),
-            'received': status_counts['received'],
-            'pending': status_counts['pending'],
-            'delayed': status_counts['delayed'],
-            'high_risk': risk_counts['high'],
-            'medium_risk': risk_counts['medium'],
-            'low_risk': risk_counts['low'],
-        }
+        base_data['statistics'] = aggregates.totals(critical_parts, (
+            'total_parts', 'received', 'pending', 'delayed', 'high_risk', 'medium_risk', 'low_risk',
+        ))
     
     # Add similar enhanced processing for other sections
     elif section in ['tomorrow_assembly', 'next_day_assembly']:
         if section == 'tomorrow_assembly':
-            plans = board.tomorrow_plans.all().order_by('model')
+            plans = board.tomorrow_plans.order_by('model')
             base_data['title'] = 'Tomorrow Assembly Plan'
         else:
-            plans = board.next_day_plans.all().order_by('model')
+            plans = board.next_day_plans.order_by('model')
             base_data['title'] = 'Next Day Assembly Plan'
+        plans = list(aggregates.shift_plans(plans))
             
         base_data['headers'] = ['Model', 'A Shift', 'B Shift', 'C Shift', 'Total', 'Priority']
         
-        total_planned = 0
-        shift_totals = {'a': 0, 'b': 0, 'c': 0}
-        
         for plan in plans:
-            a_shift = plan.a_shift or 0
-            b_shift = plan.b_shift or 0
-            c_shift = plan.c_shift or 0
-            total = a_shift + b_shift + c_shift
-            
-            # Determine priority based on total quantity
-            if total > 500:
-                priority = 'High'
-            elif total > 200:
-                priority = 'Medium'
-            else:
-                priority = 'Low'
-            
-            shift_totals['a'] += a_shift
-            shift_totals['b'] += b_shift
-            shift_totals['c'] += c_shift
-            total_planned += total
-            
+            base_data['row_ids'].append(plan.pk)
             base_data['data'].append([
                 plan.model or '',
-                a_shift,
-                b_shift,
-                c_shift,
-                total,
-                priority
+                plan.a_shift or 0,
+                plan.b_shift or 0,
+                plan.c_shift or 0,
+                plan.plan_total,
+                plan.priority
             ])
         
-        base_data['statistics'] = {
-            'total_models': plans.count(),
-            'total_planned': total_planned,
-            'a_shift_total': shift_totals['a'],
-            'b_shift_total': shift_totals['b'],
-            'c_shift_total': shift_totals['c'],
-        }
+        base_data['statistics'] = aggregates.totals(plans, (
+            'total_models', 'total_planned', 'a_shift_total', 'b_shift_total', 'c_shift_total',
+        ))
     
     elif section == 'afm_plans':
-        afm_plans = board.afm_plans.all().order_by('plan_type', 'part_name')
+        afm_plans = list(aggregates.afm_plans(board.afm_plans.order_by('plan_type', 'part_name')))
         base_data['title'] = 'AFM Plans'
         base_data['headers'] = ['Type', 'Part Name', 'Part Number', 'Plan Qty', 'Remarks']
         
-        type_counts = {'FCIN': 0, 'IU': 0}
-        total_qty = 0
-        
         for plan in afm_plans:
-            type_counts[plan.plan_type] = type_counts.get(plan.plan_type, 0) + 1
-            total_qty += plan.plan_qty or 0
-            
+            base_data['row_ids'].append(plan.pk)
             base_data['data'].append([
                 plan.plan_type or '',
                 plan.part_name or '',
@@ -2269,25 +2073,21 @@ def get_enhanced_section_data(board_id, section, user):
                 (plan.remarks or '')[:50]
             ])
         
-        base_data['statistics'] = {
-            'total_plans': afm_plans.count(),
-            'fcin_count': type_counts.get('FCIN', 0),
-            'iu_count': type_counts.get('IU', 0),
-            'total_quantity': total_qty,
-        }
+        base_data['statistics'] = aggregates.totals(afm_plans, (
+            'total_plans', 'fcin_count', 'iu_count', 'total_quantity',
+        ))
     
     elif section == 'spd_plans':
-        spd_plans = board.spd_plans.all().order_by('customer', 'part_name')
+        spd_plans = list(aggregates.spd_plans(board.spd_plans.order_by('customer', 'part_name')))
         base_data['title'] = 'SPD Plans (Customer-wise)'
         base_data['headers'] = ['Customer', 'Part Name', 'Part Number', 'Plan Qty', 'Remarks']
         
         customer_counts = {}
-        total_qty = 0
         
         for plan in spd_plans:
-            customer_counts[plan.customer] = customer_counts.get(plan.customer, 0) + 1
-            total_qty += plan.plan_qty or 0
+            customer_counts[plan.customer] = plan.customer_plans
             
+            base_data['row_ids'].append(plan.pk)
             base_data['data'].append([
                 plan.customer or '',
                 plan.part_name or '',
@@ -2296,38 +2096,30 @@ def get_enhanced_section_data(board_id, section, user):
                 (plan.remarks or '')[:50]
             ])
         
+        statistics = aggregates.totals(spd_plans, ('total_plans', 'total_quantity'))
         base_data['statistics'] = {
-            'total_plans': spd_plans.count(),
+            'total_plans': statistics['total_plans'],
             'customer_breakdown': customer_counts,
-            'total_quantity': total_qty,
+            'total_quantity': statistics['total_quantity'],
         }
     
     elif section == 'other_info':
-        other_info = board.other_info.all().order_by('target_date', 'part_name')
+        today = timezone.now().date()
+        other_info = list(aggregates.other_info(board.other_info.order_by('target_date', 'part_name'), today))
         base_data['title'] = 'Other Information'
         base_data['headers'] = ['Part Name', 'Quantity', 'Target Date', 'Days Left', 'Remarks']
         
-        total_items = 0
-        due_soon = 0
-        
         for info in other_info:
-            days_left = (info.target_date - timezone.now().date()).days if info.target_date else 0
-            if days_left <= 3:
-                due_soon += 1
-            total_items += 1
-            
+            base_data['row_ids'].append(info.pk)
             base_data['data'].append([
                 info.part_name or '',
                 info.qty or 0,
                 info.target_date.strftime('%Y-%m-%d') if info.target_date else '',
-                days_left,
+                (info.target_date - today).days if info.target_date else 0,
                 (info.remarks or '')[:50]
             ])
         
-        base_data['statistics'] = {
-            'total_items': total_items,
-            'due_soon': due_soon,
-        }
+        base_data['statistics'] = aggregates.totals(other_info, ('total_items', 'due_soon'))
     
     return base_data
 
@@ -2337,6 +2129,10 @@ def calculate_efficiency(plan, actual):
         return 0
     return round((actual or 0) / plan * 100, 1)
 
+def format_efficiency(efficiency):
+    """Efficiency column text; sections without a plan show 0%"""
+    return f"{0 if efficiency is None else efficiency}%"
+
 
 
 
@@ -2345,11 +2141,13 @@ def calculate_efficiency(plan, actual):
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.core.cache import cache
 import json
 import time
@@ -2360,12 +2158,15 @@ logger = logging.getLogger(__name__)
 @login_required
 def monitor_display(request):
     """
-    Fullscreen monitor display page - this goes on the production monitor
+    Fullscreen monitor display page - this goes on the production monitor.
+    Each screen opens it with its own ``?device=<key>`` (e.g. ``?device=line-3-tv``).
     """
+    device = register_device(request.user, request.GET.get('device'), request.GET.get('name', ''))
     context = {
         'page_title': 'Production Monitor Display',
         'auto_start': True,
         'current_time': timezone.now(),
+        'device': device,
     }
     return render(request, 'planning_board/monitor_display.html', context)
 
@@ -2380,19 +2181,30 @@ def monitor_controller(request):
     }
     return render(request, 'planning_board/monitor_controller.html', context)
 
+def requesting_device(request, data=None):
+    """The registered screen a monitor request comes from (``device`` param)"""
+    key = (data or {}).get('device') or request.GET.get('device')
+    return register_device(request.user, key)
+
 @csrf_exempt
 @login_required
 def monitor_control_api(request):
     """
-    API endpoint for controlling the monitor display
+    API endpoint for controlling the monitor displays.
+
+    POST sends a command to the screens picked by ``target`` (see
+    devices.resolve_targets; all of the user's screens by default). GET is
+    the polling fallback of one screen (``?device=<key>``).
     """
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             action = data.get('action')
             
-            # Store control commands in cache for the monitor to pick up
-            control_key = f"monitor_control_{request.user.id}"
+            try:
+                devices = list(resolve_targets(request.user, data.get('target')))
+            except ValueError:
+                return JsonResponse({'success': False, 'error': 'Invalid target'}, status=400)
             
             command = {
                 'action': action,
@@ -2406,14 +2218,15 @@ def monitor_control_api(request):
                     'section': data.get('section'),
                 })
                 
-                # Also store current display state
-                display_state = {
-                    'board_id': data.get('board_id'),
-                    'section': data.get('section'),
-                    'updated_at': timezone.now().isoformat(),
-                    'updated_by': request.user.username,
-                }
-                cache.set(f"monitor_display_state_{request.user.id}", display_state, 3600)
+                # Also store the targeted screens' display state
+                if not PlanningBoard.objects.filter(pk=data.get('board_id'), created_by=request.user).exists():
+                    return JsonResponse({'success': False, 'error': 'Board not found'}, status=404)
+                DisplayDevice.objects.filter(pk__in=[device.pk for device in devices]).update(
+                    board_id=data.get('board_id'),
+                    section=data.get('section') or '',
+                    state_updated_at=timezone.now(),
+                    state_updated_by=request.user.username,
+                )
                 
             elif action == 'show_message':
                 command.update({
@@ -2425,13 +2238,24 @@ def monitor_control_api(request):
                 command.update({
                     'config': data.get('config', {}),
                 })
+                DisplayDevice.objects.filter(pk__in=[device.pk for device in devices]).update(
+                    config=data.get('config', {}),
+                    state_updated_at=timezone.now(),
+                    state_updated_by=request.user.username,
+                )
             
-            # Store the command for the monitor to pick up
-            cache.set(control_key, command, 300)  # 5 minute expiry
+            # Queue the command in order on every targeted screen; each gets it pushed
+            # over its socket or stream and acknowledges it, so nothing is overwritten
+            sent = {}
+            for device in devices:
+                queued = enqueue_command(device.queue_key, command)
+                send_monitor_command(device.pk, queued)
+                sent[device.pk] = queued['seq']
             
             return JsonResponse({
                 'success': True,
-                'message': f'Command {action} sent successfully',
+                'message': f'Command {action} sent to {len(sent)} screen(s)',
+                'devices': sent,
                 'timestamp': timezone.now().isoformat()
             })
             
@@ -2442,69 +2266,135 @@ def monitor_control_api(request):
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
     
     elif request.method == 'GET':
-        # Return any pending commands for the monitor
-        control_key = f"monitor_control_{request.user.id}"
-        command = cache.get(control_key)
-        
-        if command:
-            # Clear the command after retrieving it
-            cache.delete(control_key)
-            return JsonResponse({'command': command})
-        else:
-            return JsonResponse({'command': None})
+        # Polling fallback: unacknowledged commands after ?after=<seq>, oldest first.
+        # The poll doubles as the screen's heartbeat and reports what it shows.
+        device = requesting_device(request)
+        try:
+            after = int(request.GET.get('after', 0))
+            board_id = int(request.GET['board_id']) if request.GET.get('board_id') else None
+        except ValueError:
+            after, board_id = 0, None
+        record_heartbeat(device, board_id, request.GET.get('section'))
+        return JsonResponse({'commands': pending_commands(device.queue_key, after)})
     
     return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
 
+@csrf_exempt
 @login_required
-def monitor_status_api(request):
+def monitor_control_ack(request):
+    """Acknowledge a screen's control commands up to a sequence number"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
+    try:
+        data = json.loads(request.body)
+        seq = int(data.get('seq'))
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Invalid sequence number'}, status=400)
+    device = requesting_device(request, data)
+    return JsonResponse({'success': True, 'acked': ack_commands(device.queue_key, seq)})
+
+# Monitor sections -> the board relation whose rows they show
+MONITOR_SECTION_ROWS = {
+    'today_assembly': 'production_lines',
+    'tomorrow_assembly': 'tomorrow_plans',
+    'next_day_assembly': 'next_day_plans',
+    'critical_parts': 'critical_parts',
+    'afm_plans': 'afm_plans',
+    'spd_plans': 'spd_plans',
+    'other_info': 'other_info',
+}
+
+def device_statuses(devices, now=None):
     """
-    API endpoint to get current monitor status
+    Status of each screen as reported to the controller. Shown row counts
+    take one grouped query per section relation and the command queues two
+    cache reads, however many screens there are; load ``devices`` with
+    select_related('board').
     """
-    try:
-        display_state = cache.get(f"monitor_display_state_{request.user.id}", {})
-        
-        # Get current board info if available
+    devices = list(devices)
+    boards_by_relation = {}
+    for device in devices:
+        relation = MONITOR_SECTION_ROWS.get(device.section)
+        if device.board_id is not None and relation:
+            boards_by_relation.setdefault(relation, set()).add(device.board_id)
+
+    row_counts = {}
+    for relation, board_ids in boards_by_relation.items():
+        model = PlanningBoard._meta.get_field(relation).related_model
+        rows = model.objects.filter(planning_board_id__in=board_ids).values(
+            'planning_board_id'
+        ).annotate(rows=Count('pk')).order_by()
+        row_counts.update(((relation, row['planning_board_id']), row['rows']) for row in rows)
+
+    pending = pending_counts(device.queue_key for device in devices)
+    statuses = []
+    for device in devices:
         current_board = None
-        current_section = None
         data_rows = 0
-        
-        if display_state.get('board_id'):
-            try:
-                board = PlanningBoard.objects.get(
-                    pk=display_state['board_id'], 
-                    created_by=request.user
-                )
-                current_board = f"{board.title} - {board.today_date}"
-                current_section = display_state.get('section', '').replace('_', ' ').title()
-                
-                # Get data count for current section
-                if display_state.get('section') == 'today_assembly':
-                    data_rows = board.production_lines.count()
-                elif display_state.get('section') == 'tomorrow_assembly':
-                    data_rows = board.tomorrow_plans.count()
-                elif display_state.get('section') == 'next_day_assembly':
-                    data_rows = board.next_day_plans.count()
-                elif display_state.get('section') == 'critical_parts':
-                    data_rows = board.critical_parts.count()
-                elif display_state.get('section') == 'afm_plans':
-                    data_rows = board.afm_plans.count()
-                elif display_state.get('section') == 'spd_plans':
-                    data_rows = board.spd_plans.count()
-                elif display_state.get('section') == 'other_info':
-                    data_rows = board.other_info.count()
-                    
-            except PlanningBoard.DoesNotExist:
-                pass
-        
-        status = {
-            'connected': True,
+        if device.board is not None:
+            current_board = f"{device.board.title} - {device.board.today_date}"
+            data_rows = row_counts.get((MONITOR_SECTION_ROWS.get(device.section), device.board_id), 0)
+
+        statuses.append({
+            'id': device.pk,
+            'key': device.key,
+            'name': device.name,
+            'plant': device.plant,
+            'group': device.group,
+            'connected': is_online(device, now),
+            'last_heartbeat': device.last_heartbeat.isoformat() if device.last_heartbeat else None,
+            'board_id': device.board_id,
             'current_board': current_board,
-            'current_section': current_section,
-            'last_update': display_state.get('updated_at'),
-            'updated_by': display_state.get('updated_by'),
+            'current_section': device.section.replace('_', ' ').title() or None,
+            'last_update': device.state_updated_at.isoformat() if device.state_updated_at else None,
+            'updated_by': device.state_updated_by or None,
             'data_rows': data_rows,
-            'timestamp': timezone.now().isoformat(),
+            'pending_commands': pending[device.queue_key],
+        })
+    return statuses
+
+def device_status(device, now=None):
+    """Status of one screen as reported to the controller"""
+    return device_statuses([device], now)[0]
+
+@login_required
+def monitor_status_api(request):
+    """
+    API endpoint to get the status of the user's monitor screens.
+
+    ``devices`` lists every registered screen; a screen is connected when it
+    sent a heartbeat recently. The top-level fields describe the screen picked
+    with ``?device=<id>``, else the one that checked in last.
+    """
+    try:
+        now = timezone.now()
+        devices = list(
+            DisplayDevice.objects.filter(owner=request.user).select_related('board')
+        )
+        statuses = device_statuses(devices, now)
+        
+        selected = None
+        if request.GET.get('device'):
+            selected = next((s for s in statuses if str(s['id']) == request.GET['device']), None)
+        elif statuses:
+            selected = max(statuses, key=lambda s: s['last_heartbeat'] or '')
+        
+        status = {
+            'connected': False,
+            'current_board': None,
+            'current_section': None,
+            'last_update': None,
+            'updated_by': None,
+            'data_rows': 0,
         }
+        status.update(selected or {})
+        status.update({
+            'devices': statuses,
+            'online_count': sum(1 for s in statuses if s['connected']),
+            'groups': sorted({device.group for device in devices if device.group}),
+            'plants': sorted({device.plant for device in devices if device.plant}),
+            'timestamp': now.isoformat(),
+        })
         
         return JsonResponse(status)
         
@@ -2516,69 +2406,244 @@ def monitor_status_api(request):
             'timestamp': timezone.now().isoformat(),
         })
 
+@csrf_exempt
+@login_required
+def monitor_devices_api(request):
+    """
+    GET lists the user's screens; POST ``{"id", "name"?, "plant"?, "group"?}``
+    renames or regroups one, and ``{"id", "delete": true}`` removes it.
+    """
+    if request.method == 'GET':
+        devices = DisplayDevice.objects.filter(owner=request.user).select_related('board')
+        now = timezone.now()
+        return JsonResponse({'devices': device_statuses(devices, now)})
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
+    try:
+        data = json.loads(request.body)
+        device = DisplayDevice.objects.get(pk=data.get('id'), owner=request.user)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    except (DisplayDevice.DoesNotExist, ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Device not found'}, status=404)
+    
+    if data.get('delete'):
+        device.delete()
+        return JsonResponse({'success': True})
+    
+    for field in ('name', 'plant', 'group'):
+        if field in data:
+            setattr(device, field, str(data[field] or '').strip()[:100])
+    if not device.name:
+        device.name = device.key
+    device.save(update_fields=['name', 'plant', 'group'])
+    return JsonResponse({'success': True, 'device': device_status(device)})
+
+@login_required
+def kpi_api(request):
+    """
+    Plan-vs-actual KPIs over the user's boards, computed by kpis.ShiftTable.
+
+    ``?start=&end=`` (YYYY-MM-DD) select boards by date, this month so far by
+    default; ``?board=<id>`` (repeatable or comma-separated) narrows to given
+    boards and ``?by=`` lists the dimensions to group by (board, day, line,
+    shift, model; line by default).
+    """
+    today = timezone.now().date()
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else today.replace(day=1)
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else today
+        board_ids = [int(pk) for value in request.GET.getlist('board') for pk in value.split(',') if pk]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date or board id'}, status=400)
+    by = [name for name in request.GET.get('by', 'line').split(',') if name]
+    if any(name not in KPI_GROUPINGS for name in by):
+        return JsonResponse(
+            {'success': False, 'error': f"by must be a list of {', '.join(KPI_GROUPINGS)}"}, status=400
+        )
+    
+    boards = PlanningBoard.objects.filter(created_by=request.user, today_date__range=(start, end))
+    if board_ids:
+        boards = boards.filter(pk__in=board_ids)
+    table = load_shift_table(boards)
+    return json_response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'by': by,
+        'totals': table.totals(),
+        'kpis': table.kpis(by),
+    })
+
+@login_required
+def trend_api(request):
+    """
+    Plan/actual/efficiency time series from the daily rollups (trends.py).
+
+    ``?start=&end=`` (YYYY-MM-DD, the last 30 days by default), ``?line=`` and
+    ``?model=`` (repeatable or comma-separated), ``?series=total|line|model``,
+    ``?interval=day|shift`` and ``?max_points=`` (points per series before
+    long ranges are summed into multi-day buckets).
+    """
+    today = timezone.now().date()
+    try:
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else today
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else end - timedelta(days=29)
+        max_points = min(max(int(request.GET.get('max_points', TREND_MAX_POINTS)), 10), 1000)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date or max_points'}, status=400)
+    series = request.GET.get('series', 'line')
+    interval = request.GET.get('interval', 'day')
+    if start > end or series not in TREND_SERIES or interval not in TREND_INTERVALS:
+        return JsonResponse({'success': False, 'error': 'Invalid range, series or interval'}, status=400)
+    
+    def listed(name):
+        return [value for values in request.GET.getlist(name) for value in values.split(',') if value]
+    
+    return json_response(plan_actual_trend(
+        request.user, start, end, lines=listed('line'), models=listed('model'),
+        series=series, interval=interval, max_points=max_points,
+    ))
+
+@login_required
+def board_progress_api(request, board_id):
+    """
+    Intra-shift progress of a board's lines from the actual-count history
+    (actuals.py): curves and run rates for run-rate displays.
+
+    ``?shift=A|B|C`` (repeatable), ``?line=<id>`` (repeatable or
+    comma-separated), ``?since=<ISO time>`` and ``?interval=<minutes>``
+    (60 by default) narrow and resample the curves.
+    """
+    board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
+    shifts = request.GET.getlist('shift') or list(ACTUAL_FIELDS)
+    try:
+        line_ids = [int(pk) for value in request.GET.getlist('line') for pk in value.split(',') if pk]
+        since = datetime.fromisoformat(request.GET['since']) if request.GET.get('since') else None
+        interval = min(max(int(request.GET.get('interval', PROGRESS_INTERVAL)), 1), 24 * 60)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid line id, since or interval'}, status=400)
+    if any(shift not in ACTUAL_FIELDS for shift in shifts):
+        return JsonResponse({'success': False, 'error': 'Invalid shift'}, status=400)
+    
+    return json_response({
+        'board_id': board.pk,
+        'interval': interval,
+        'timestamp': timezone.now().isoformat(),
+        'lines': shift_progress(board, shifts, line_ids, since, interval),
+    })
+
+@never_cache
+def stream_metrics(request):
+    """
+    Open live streams of this process and what they cost: JSON by default,
+    Prometheus text with ``?format=prometheus``. Staff only, or a scraper
+    sending ``Authorization: Bearer <STREAM_METRICS_TOKEN>``.
+    """
+    token = getattr(settings, 'STREAM_METRICS_TOKEN', '')
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if not authorized and token:
+        authorized = constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}")
+    if not authorized:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    
+    hub = {
+        'watched_boards': board_hub.watched_boards(),
+        'subscribers': board_hub.subscriber_count(),
+        'polls_total': board_hub.polls,
+    }
+    if request.GET.get('format') == 'prometheus':
+        body = stream_registry.prometheus(extra={
+            'planning_board_hub_watched_boards': ('gauge', 'Boards polled by the board hub.', hub['watched_boards']),
+            'planning_board_hub_subscribers': ('gauge', 'Streams subscribed to the board hub.', hub['subscribers']),
+            'planning_board_hub_polls_total': ('counter', 'Board hub change polls.', hub['polls_total']),
+            'planning_snapshot_builds_total': ('counter', 'Section payloads built.', snapshot_store.builds),
+            'planning_snapshot_hits_total': ('counter', 'Section payloads served from a shared snapshot.', snapshot_store.hits),
+        })
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+    
+    metrics = stream_registry.snapshot()
+    metrics['board_hub'] = hub
+    metrics['snapshots'] = {'builds': snapshot_store.builds, 'hits': snapshot_store.hits}
+    metrics['timestamp'] = timezone.now().isoformat()
+    return JsonResponse(metrics)
+
 @never_cache
 @login_required
-def monitor_data_stream(request, board_id, section):
+async def monitor_data_stream(request, board_id, section):
     """
-    Enhanced streaming endpoint for monitor display with real-time updates
+    Enhanced streaming endpoint for monitor display with real-time updates.
+    Async, so an open monitor only costs a coroutine rather than a worker thread.
     """
-    def event_stream():
-        board = get_object_or_404(PlanningBoard, pk=board_id, created_by=request.user)
-        last_update = timezone.now()
+    compact = wants_compact(request)
+    user = await request.auser()
+    await aget_object_or_404(PlanningBoard, pk=board_id, created_by=user)
+    device = await aregister_device(user, request.GET.get('device'))
+    await arecord_heartbeat(device, board_id, section)
+    
+    async def produce(connection):
+        tracker = await resumed_tracker(request, display_snapshot_kind(section, merged=True), board_id, section)
+        refresh = True
         heartbeat_counter = 0
-        
-        while True:
-            try:
-                # Check for control commands
-                control_key = f"monitor_control_{request.user.id}"
-                command = cache.get(control_key)
-                
-                if command:
-                    # Send control command to monitor
-                    yield f"event: control\ndata: {json.dumps(command)}\n\n"
-                    cache.delete(control_key)
-                
-                # Check if board has been updated
-                current_board = PlanningBoard.objects.get(pk=board_id, created_by=request.user)
-                
-                if current_board.updated_at > last_update:
-                    # Get data for the specified section
-                    if section == 'today_assembly':
-                        # Get merged assembly data
-                        data = get_merged_assembly_data(board_id, request.user)
-                    else:
-                        # Get single section data
-                        data = get_enhanced_section_data(board_id, section, request.user)
+        last_command_seq = 0
+        
+        connection.send(reconnect_retry())
+        # The board hub polls each board once for all streams and wakes us on changes
+        async with board_hub.subscribe(board_id) as changes:
+            while True:
+                try:
+                    if connection.resync:
+                        # The client fell behind and lost queued events: start over with a snapshot
+                        tracker, refresh, connection.resync = SectionDeltaTracker(), True, False
+                        last_command_seq = 0  # resend the unacknowledged commands too
+                    # Deliver queued control commands in order; the monitor acknowledges them
+                    for command in await apending_commands(device.queue_key, last_command_seq):
+                        connection.send(f"event: control\ndata: {json.dumps(command)}\n\n")
+                        last_command_seq = command['seq']
                     
-                    # Send data update
-                    yield f"data: {json.dumps(data)}\n\n"
+                    if refresh:
+                        # Get data for the specified section (merged assembly data for today)
+                        with stream_registry.timing(connection.stats):
+                            snapshot = await database_sync_to_async(display_snapshot)(board_id, section, user, merged=True)
+                        
+                        # Send snapshot first, then only the rows that changed
+                        message = stream_message(tracker, snapshot, compact)
+                        if message:
+                            connection.send(message)
+                        refresh = False
                     
-                    last_update = current_board.updated_at
-                
-                # Send heartbeat every 10 cycles (about 30 seconds)
-                heartbeat_counter += 1
-                if heartbeat_counter >= 10:
-                    heartbeat_data = {
-                        'type': 'heartbeat',
-                        'timestamp': timezone.now().isoformat(),
-                        'board_id': board_id,
-                        'section': section,
-                        'server_time': timezone.now().strftime('%H:%M:%S'),
-                    }
-                    yield f"event: heartbeat\ndata: {json.dumps(heartbeat_data)}\n\n"
-                    heartbeat_counter = 0
-                
-                time.sleep(3)  # Check every 3 seconds
-                
-            except PlanningBoard.DoesNotExist:
-                yield f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n"
-                break
-            except Exception as e:
-                logger.error(f"Monitor stream error: {str(e)}")
-                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
-                time.sleep(5)
-    
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+                    # Send heartbeat every 10 cycles (about 30 seconds)
+                    heartbeat_counter += 1
+                    if heartbeat_counter >= 10:
+                        heartbeat_data = {
+                            'type': 'heartbeat',
+                            'timestamp': timezone.now().isoformat(),
+                            'board_id': board_id,
+                            'section': section,
+                            'server_time': timezone.now().strftime('%H:%M:%S'),
+                        }
+                        connection.send(f"event: heartbeat\ndata: {json.dumps(heartbeat_data)}\n\n")
+                        heartbeat_counter = 0
+                        await arecord_heartbeat(device)
+                    
+                    # Wait up to 3 seconds for a board change, then check commands again
+                    change = await changes.get(timeout=3)
+                    if change is not None:
+                        if change['deleted']:
+                            raise PlanningBoard.DoesNotExist
+                        refresh = True
+                    
+                except PlanningBoard.DoesNotExist:
+                    connection.send(f"event: error\ndata: {json.dumps({'error': 'Board not found'})}\n\n")
+                    break
+                except Exception as e:
+                    logger.error(f"Monitor stream error: {str(e)}")
+                    connection.send(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n")
+                    await asyncio.sleep(5)
+    
+    response = StreamingHttpResponse(
+        StreamConnection('monitor', board_id, section, user.id).messages(produce), content_type='text/event-stream'
+    )
     response['Cache-Control'] = 'no-cache'
     response['Connection'] = 'keep-alive'
     response['Access-Control-Allow-Origin'] = '*'
@@ -2595,7 +2660,9 @@ def get_merged_assembly_data(board_id, user):
         # Get today's production lines with remarks
         production_lines = board.production_lines.all().order_by('line_number')
         today_data = []
+        today_ids = []
         for line in production_lines:
+            today_ids.append(line.pk)
             today_data.append([
                 line.line_number or '',
                 line.a_shift_model or '', line.a_shift_plan or 0, line.a_shift_actual or 0, 
@@ -2612,7 +2679,9 @@ def get_merged_assembly_data(board_id, user):
         # Get tomorrow's plans
         tomorrow_plans = board.tomorrow_plans.all().order_by('model')
         tomorrow_data = []
+        tomorrow_ids = []
         for plan in tomorrow_plans:
+            tomorrow_ids.append(plan.pk)
             tomorrow_data.append([
                 plan.model or '',
                 plan.a_shift or 0,
@@ -2623,7 +2692,9 @@ def get_merged_assembly_data(board_id, user):
         # Get next day plans
         next_day_plans = board.next_day_plans.all().order_by('model')
         next_day_data = []
+        next_day_ids = []
         for plan in next_day_plans:
+            next_day_ids.append(plan.pk)
             next_day_data.append([
                 plan.model or '',
                 plan.a_shift or 0,
@@ -2642,6 +2713,7 @@ def get_merged_assembly_data(board_id, user):
         ]
         
         merged_data = []
+        merged_ids = []
         max_rows = max(len(today_data), len(tomorrow_data), len(next_day_data))
         
         for i in range(max_rows):
@@ -2660,6 +2732,11 @@ def get_merged_assembly_data(board_id, user):
             )
             
             merged_data.append(merged_row)
+            # A merged row is identified by the three source rows it was built from
+            merged_ids.append(':'.join(
+                str(ids[i]) if i < len(ids) else ''
+                for ids in (today_ids, tomorrow_ids, next_day_ids)
+            ))
         return {
             'section': 'today_assembly',
             'title': 'Assembly Plans - Today, Tomorrow & Next Day',
@@ -2667,6 +2744,7 @@ def get_merged_assembly_data(board_id, user):
             'board_id': board.pk,
             'headers': headers,
             'data': merged_data,
+            'row_ids': merged_ids,
             'timestamp': timezone.now().isoformat(),
             'last_updated': board.updated_at.isoformat(),
             'statistics': {
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,6 +32,9 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
+    # Must come first: makes runserver serve ASGI_APPLICATION, so the async
+    # SSE streams and WebSockets also work in development
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -44,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "planning_board.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -72,6 +77,56 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "planning_board_project.wsgi.application"
 
+# The SSE streams are async views and the live updates use WebSockets, so the
+# app must be served through asgi.py, e.g.
+#   daphne -b 0.0.0.0 -p 8000 planning_board_project.asgi:application
+# (or uvicorn/gunicorn with uvicorn workers). A WSGI server cannot keep the
+# streams open and only serves the regular pages. uvicorn applies transport
+# backpressure to the streams, so their send buffers and write timeouts
+# (planning_board/streams.py) track slow clients; daphne buffers writes
+# itself and only MAX_LIFETIME bounds what a stalled client holds there.
+ASGI_APPLICATION = "planning_board_project.asgi.application"
+
+# Channel layer for the WebSocket consumers. The in-memory layer only reaches
+# sockets in the same process; set CHANNEL_REDIS_URL (install requirements-redis.txt)
+# to share board/monitor groups between worker processes.
+if os.environ.get("CHANNEL_REDIS_URL"):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [os.environ["CHANNEL_REDIS_URL"]]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+
+# Cache shared by every worker process on this host (monitor command queues,
+# heartbeats, section versions and snapshots). The default per-process
+# LocMemCache would leave the controller and the screens talking to different
+# processes. PLANNING_CACHE_PATH moves the SQLite file, e.g. onto local disk.
+CACHES = {
+    "default": {
+        "BACKEND": "planning_board.sqlite_cache.SQLiteCache",
+        "LOCATION": os.environ.get("PLANNING_CACHE_PATH", BASE_DIR / "cache.sqlite3"),
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+            "CULL_FREQUENCY": 4,
+        },
+    }
+}
+
+# Runs the tests against a throwaway copy of the cache file above
+TEST_RUNNER = "planning_board_project.test_runner.PlanningTestRunner"
+
+# Bearer token that lets a Prometheus scraper read /planning/api/streams/metrics/
+# without a staff login; unset means staff users only.
+STREAM_METRICS_TOKEN = os.environ.get("STREAM_METRICS_TOKEN", "")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -0,0 +1,31 @@
+"""
+Test runner for planning_board_project.
+
+The default cache is a SQLite file next to the project. Tests write to and
+clear the cache, so the runner moves it into a temporary directory for the
+run and leaves the development cache alone.
+"""
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class PlanningTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_directory = tempfile.TemporaryDirectory()
+        caches = {
+            alias: {**config, 'LOCATION': Path(self._cache_directory.name) / f'{alias}.sqlite3'}
+            if config['BACKEND'] == 'planning_board.sqlite_cache.SQLiteCache' else config
+            for alias, config in settings.CACHES.items()
+        }
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        self._cache_directory.cleanup()
+        super().teardown_test_environment(**kwargs)